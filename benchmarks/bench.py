@@ -0,0 +1,203 @@
+"""Offline benchmarks for the MarketMantra hot paths.
+
+    python -m benchmarks.bench --out bench_results.json
+    python -m benchmarks.bench --sizes 1000 100000 5000000 --compare baseline.json
+
+Every input comes from the seeded synthetic generator, and the ROI benchmarks
+read from the synthetic data provider, so runs are reproducible and need no network.
+Results are written as JSON; --compare prints the ratio to a saved baseline
+and exits non-zero when any benchmark slowed down by more than --tolerance.
+"""
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from marketmantra import (
+    FEATURE_COLUMNS, SyntheticProvider, add_features, add_features_panel, analyze_portfolio,
+    backtest_signals, build_budget_models, build_models, calculate_advanced_roi, compute_bollinger_bands, compute_indicators,
+    compute_macd, compute_rsi, compute_stochastic, evaluate_walk_forward, predict_up_probability,
+    project_growth, train_ensemble,
+)
+from marketmantra.backtest import DEFAULT_THRESHOLDS
+from marketmantra.render import render_png, thin
+from marketmantra.synthetic import synthetic_ohlcv, synthetic_panel
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_MODEL_SIZES = [1_000, 10_000]
+
+def timeit(func, repeats):
+    """Best and median wall time of func over repeats runs, after one untimed
+    warm-up run that pays for lazy imports, JIT/BLAS initialization and
+    first-touch allocations."""
+    func()
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"min_s": min(times), "median_s": float(np.median(times)), "repeats": repeats}
+
+def _repeats(n_rows, repeats):
+    # Keep multi-million-row runs to a single pass.
+    return 1 if n_rows >= 1_000_000 else repeats
+
+def bench_indicators(sizes, repeats):
+    for n in sizes:
+        df = synthetic_ohlcv(n, seed=1)
+        r = _repeats(n, repeats)
+        yield f"compute_rsi/{n}", timeit(lambda: compute_rsi(df), r)
+        yield f"compute_macd/{n}", timeit(lambda: compute_macd(df), r)
+        yield f"compute_stochastic/{n}", timeit(lambda: compute_stochastic(df), r)
+        yield f"compute_bollinger_bands/{n}", timeit(lambda: compute_bollinger_bands(df), r)
+        yield f"compute_indicators/{n}", timeit(lambda: compute_indicators(df), r)
+        yield f"add_features/{n}", timeit(lambda: add_features(df), r)
+
+def bench_panel(n_symbols, n_rows, repeats):
+    panel = synthetic_panel(n_symbols, n_rows, seed=2)
+    yield (f"add_features_per_symbol/{n_symbols}x{n_rows}",
+           timeit(lambda: [add_features(frame) for frame in panel.values()], repeats))
+    yield (f"add_features_panel/{n_symbols}x{n_rows}",
+           timeit(lambda: add_features_panel(panel), repeats))
+
+def bench_backtest(n_symbols, n_rows, repeats):
+    rng = np.random.default_rng(6)
+    index = pd.bdate_range("2015-01-01", periods=n_rows)
+    signals = {f"SYM{i:04d}": pd.DataFrame({"Prob": rng.uniform(0.3, 0.7, n_rows),
+                                            "Return": rng.normal(0.0003, 0.015, n_rows)}, index=index)
+               for i in range(n_symbols)}
+    yield (f"backtest_signals/{n_symbols}x{n_rows}x{len(DEFAULT_THRESHOLDS)}",
+           timeit(lambda: backtest_signals(signals), repeats))
+
+def _draw_close(ax, close):
+    ax.plot(thin(close, ax))
+
+def bench_render(sizes, repeats):
+    for n in sizes:
+        close = synthetic_ohlcv(n, seed=7)["Close"]
+        r = _repeats(n, repeats)
+        yield f"lttb/{n}", timeit(lambda: thin(close, n_out=1200), r)
+        yield f"render_png/{n}", timeit(lambda: render_png(_draw_close, close, cache=False), r)
+
+def bench_models(sizes, repeats):
+    for n in sizes:
+        df_ml = add_features(synthetic_ohlcv(n + 60, seed=3))
+        X, y = df_ml[FEATURE_COLUMNS].to_numpy(), df_ml["Target"].to_numpy()
+        for name, model in build_models().items():
+            yield f"fit/{name}/{n}", timeit(lambda: model.fit(X, y), repeats)
+            yield f"predict_proba/{name}/{n}", timeit(lambda: model.predict_proba(X), repeats)
+
+def bench_pipeline(sizes, repeats):
+    for n in sizes:
+        df_ml = add_features(synthetic_ohlcv(n + 60, seed=4))
+        features, target = df_ml[FEATURE_COLUMNS], df_ml["Target"]
+
+        def pipeline(budget_s=None):
+            models = build_models() if budget_s is None else build_budget_models()
+            trained = train_ensemble(models, features, target, budget_s=budget_s)
+            evaluate_walk_forward(trained, target)
+            predict_up_probability(trained, features)
+
+        yield f"predictions_tab/{n}", timeit(pipeline, repeats)
+        yield f"predictions_tab/budget20/{n}", timeit(lambda: pipeline(20), repeats)
+
+def bench_roi(repeats):
+    provider = SyntheticProvider(seed=5)
+    start = pd.Timestamp.today().normalize() - pd.DateOffset(years=10)
+    yield "calculate_advanced_roi/10y", timeit(
+        lambda: calculate_advanced_roi("STOCK", start, 100_000, provider=provider), repeats)
+    holdings = [f"HOLD{i:02d}" for i in range(20)]
+    yield "analyze_portfolio/20x10y", timeit(
+        lambda: analyze_portfolio(holdings, start, 100_000, provider=provider), repeats)
+
+def bench_montecarlo(repeats):
+    provider = SyntheticProvider(seed=5)
+    start = pd.Timestamp.today().normalize() - pd.DateOffset(years=10)
+    returns = analyze_portfolio(["STOCK"], start, 100_000, provider=provider)["values"]["Portfolio"].pct_change().dropna()
+    # The app's default projection (target: about a second) and its largest one
+    for method in ("bootstrap", "parametric"):
+        for paths, years in ((100_000, 10), (500_000, 30)):
+            yield f"project_growth/{method}/{paths // 1000}kx{years}y", timeit(
+                lambda: project_growth(returns, 100_000, years=years, n_paths=paths, method=method, seed=0), repeats)
+
+def compare(results, baseline, tolerance):
+    """Print each benchmark's ratio to the baseline; return the regressions."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:55s} {result['min_s'] * 1000:10.2f} ms   (new)")
+            continue
+        ratio = result["min_s"] / base["min_s"] if base["min_s"] else float("inf")
+        flag = "  REGRESSION" if ratio > tolerance else ""
+        print(f"{name:55s} {result['min_s'] * 1000:10.2f} ms  x{ratio:5.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="rows for the indicator/feature benchmarks (up to 5000000)")
+    parser.add_argument("--model-sizes", type=int, nargs="+", default=DEFAULT_MODEL_SIZES,
+                        help="rows for the model fit/predict benchmarks")
+    parser.add_argument("--pipeline-sizes", type=int, nargs="+", default=[2_000],
+                        help="rows for the full Predictions tab pipeline")
+    parser.add_argument("--panel", type=int, nargs=2, default=[50, 5_000], metavar=("SYMBOLS", "ROWS"),
+                        help="multi-symbol panel shape (default: 50 5000)")
+    parser.add_argument("--backtest", type=int, nargs=2, default=[500, 2_000], metavar=("SYMBOLS", "ROWS"),
+                        help="signal panel shape for the threshold sweep (default: 500 2000)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=["indicators", "panel", "backtest", "render", "models", "pipeline", "roi",
+                                          "montecarlo"],
+                        help="run only these groups")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="slowdown ratio reported as a regression (default: 1.25)")
+    args = parser.parse_args(argv)
+
+    groups = {
+        "indicators": lambda: bench_indicators(args.sizes, args.repeats),
+        "panel": lambda: bench_panel(args.panel[0], args.panel[1], args.repeats),
+        "backtest": lambda: bench_backtest(args.backtest[0], args.backtest[1], args.repeats),
+        "render": lambda: bench_render(args.sizes, args.repeats),
+        "models": lambda: bench_models(args.model_sizes, args.repeats),
+        "pipeline": lambda: bench_pipeline(args.pipeline_sizes, 1),
+        "roi": lambda: bench_roi(args.repeats),
+        "montecarlo": lambda: bench_montecarlo(args.repeats),
+    }
+    results = {}
+    for group, run in groups.items():
+        if args.only and group not in args.only:
+            continue
+        for name, result in run():
+            results[name] = result
+            print(f"{name:55s} {result['min_s'] * 1000:10.2f} ms", flush=True)
+
+    report = {"meta": {"created": datetime.now().isoformat(timespec="seconds"),
+                       "python": platform.python_version(),
+                       "numpy": np.__version__,
+                       "machine": platform.machine(),
+                       "argv": sys.argv[1:]},
+              "results": results}
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        print(f"\ncompared with {args.compare}:")
+        return 1 if compare(results, baseline, args.tolerance) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,29 @@
 # =========================
 # IMPORTS 
 # =========================
-import requests
+import uuid
+import functools
 import numpy as np
 import pandas as pd
-import xgboost as xgb
-import yfinance as yf
 import streamlit as st
 from datetime import datetime
-import matplotlib.pyplot as plt
 from PIL import Image
-from bs4 import BeautifulSoup
-from googlesearch import search
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split, TimeSeriesSplit
-from sklearn.metrics import accuracy_score, confusion_matrix
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.tree import DecisionTreeClassifier
+
+# Heavy modules (matplotlib, yfinance, scipy, sklearn, xgboost) load on first
+# use, so the header and stock selector paint before the ML stack is imported.
+from marketmantra.lazy import import_report
+from marketmantra.instrument import StageRecorder, set_recorder, stage, frame_stats
+from marketmantra.render import render_png, thin, get_render_cache
+from marketmantra import (
+    get_provider, get_ohlcv_cache, get_model_store, get_tuning_store, load_ohlcv, load_ohlcv_many,
+    compute_rsi, compute_bollinger_bands, compute_volumetric_data,
+    FEATURE_COLUMNS, load_or_train, evaluate_walk_forward,
+    predict_up_probability, analyze_portfolio, project_growth, optimize_portfolio,
+    FeatureCache, oof_signals, backtest_signals, Prefetcher, screen, paginate,
+)
+from marketmantra.models import REFIT_EVERY
+from marketmantra.roi import RISK_FREE_RATE, TRADING_DAYS
+from marketmantra.screener import UNIVERSES, PRESET_CONDITIONS
 
 # =========================
 # SESSION STATE
@@ -27,200 +34,225 @@ if 'portfolio' not in st.session_state:
 if 'watchlist' not in st.session_state:
     st.session_state['watchlist'] = []
 
+if 'client_id' not in st.session_state:
+    st.session_state['client_id'] = uuid.uuid4().hex
+
+# Every rerun gets a fresh recorder; the debug panel shows its stages.
+recorder = set_recorder(StageRecorder())
+
 # =========================
 # DATA FETCH 
 # =========================
 def get_stock_data(stock_symbol, start_date, end_date):  #Download stock data with error handling.
     try:
-        df = yf.download(stock_symbol, start=start_date, end=end_date)
-        if 'Adj Close' in df.columns:
-            df.drop(columns=['Adj Close'], inplace=True)
+        with stage("load_ohlcv", symbol=stock_symbol) as record:
+            df = load_ohlcv(stock_symbol, start_date, end_date)
+            record.update(frame_stats(df))
         return df
     except Exception as e:
         st.error(f"Error fetching stock data: {e}")
         return pd.DataFrame()
 
 # =========================
-# INDICATOR FUNCTIONS
+# INDICATOR CHARTS
 # =========================
-def compute_rsi(df, window=14):
-    delta = df['Close'].diff()
-    gain = delta.where(delta > 0, 0.0).rolling(window).mean()
-    loss = (-delta.where(delta < 0, 0.0)).rolling(window).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-def plot_rsi(df, window=14):
-    df_plot = df.copy()
-    df_plot['RSI'] = compute_rsi(df_plot, window)
-    fig, ax = plt.subplots(figsize=(15, 5))
-    ax.plot(df_plot.index, df_plot['RSI'], label="RSI", color="blue")
+def show_chart(chart, draw, *data, figsize=(15, 5), **options):  # rendered once per distinct input, timed as a "render" stage
+    with stage("render", chart=chart) as record:
+        png, record["cached"] = render_png(draw, *data, figsize=figsize, **options)
+        st.image(png, width="stretch")
+
+# Draw functions get everything they show as arguments: the rendered image
+# is cached on their code and arguments, and long series are thinned to the
+# chart's width in pixels.
+def draw_series(ax, series, label, color, title, ylabel='Price'):
+    ax.plot(thin(series, ax), label=label, color=color)
+    ax.set_title(title, fontsize=15)
+    ax.set_ylabel(ylabel, fontsize=12)
+    ax.set_xlabel('Date', fontsize=12)
+    ax.legend(loc='best')
+
+def draw_close(ax, close, symbol):
+    ax.plot(thin(close, ax), label='Close Price', color='blue')
+    ax.set_title(f"{symbol} - Closing Price History", fontsize=15)
+    ax.set_ylabel('Price', fontsize=12)
+    ax.set_xlabel('Date', fontsize=12)
+    ax.grid(True)
+    ax.legend()
+
+def draw_macd(ax, macd, symbol):
+    macd = thin(macd, ax)
+    ax.plot(macd['MACD'], label="MACD", color='blue')
+    ax.plot(macd['MACD_signal'], label="Signal Line", color='orange')
+    ax.set_title(f"{symbol} - MACD", fontsize=15)
+    ax.set_ylabel('Value', fontsize=12)
+    ax.set_xlabel('Date', fontsize=12)
+    ax.legend(loc='best')
+
+def draw_stochastic(ax, stochastic, symbol):
+    ax.plot(thin(stochastic, ax), label="Stochastic Oscillator", color='green')
+    ax.axhline(80, linestyle='--', color='red')
+    ax.axhline(20, linestyle='--', color='blue')
+    ax.set_title(f"{symbol} - Stochastic Oscillator", fontsize=15)
+    ax.set_ylabel('Stochastic Value', fontsize=12)
+    ax.set_xlabel('Date', fontsize=12)
+    ax.legend(loc='best')
+
+def draw_rsi(ax, rsi):
+    ax.plot(thin(rsi, ax), label="RSI", color="blue")
     ax.axhline(70, color='red', linestyle='--', label="Overbought (70)")
     ax.axhline(30, color='green', linestyle='--', label="Oversold (30)")
     ax.set_title('Relative Strength Index (RSI)', fontsize=15)
     ax.set_xlabel('Date')
     ax.set_ylabel('RSI Value')
     ax.legend(loc="upper left")
-    st.pyplot(fig)
-
-def compute_macd(df, fast=12, slow=26, signal=9):
-    macd_line = df['Close'].ewm(span=fast, adjust=False).mean() - \
-                df['Close'].ewm(span=slow, adjust=False).mean()
-    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
-    return macd_line, signal_line
-
-def compute_stochastic(df, window=14):
-    low_min = df['Low'].rolling(window=window).min()
-    high_max = df['High'].rolling(window=window).max()
-    stochastic = 100 * (df['Close'] - low_min) / (high_max - low_min)
-    return stochastic
-
-def compute_bollinger_bands(df, window=20):
-    df = df.copy()
-    df['Middle_BB'] = df['Close'].rolling(window=window).mean()
-    df['Std_Dev'] = df['Close'].rolling(window=window).std()
-    df['Upper_BB'] = df['Middle_BB'] + (df['Std_Dev'] * 2)
-    df['Lower_BB'] = df['Middle_BB'] - (df['Std_Dev'] * 2)
-    return df
-
-def plot_bollinger_bands(df, window=20):
-    df_plot = compute_bollinger_bands(df, window)
-    fig, ax = plt.subplots(figsize=(15, 5))
-    ax.plot(df_plot.index, df_plot['Close'], label='Close Price', color='blue')
-    ax.plot(df_plot.index, df_plot['Upper_BB'], label='Upper Bollinger Band', color='red', linestyle='--')
-    ax.plot(df_plot.index, df_plot['Middle_BB'], label='Middle Bollinger Band (SMA)', color='orange', linestyle='--')
-    ax.plot(df_plot.index, df_plot['Lower_BB'], label='Lower Bollinger Band', color='green', linestyle='--')
-    ax.fill_between(df_plot.index, df_plot['Upper_BB'], df_plot['Lower_BB'], color='gray', alpha=0.2)
+
+def draw_bollinger_bands(ax, bands):
+    bands = thin(bands, ax)
+    ax.plot(bands['Close'], label='Close Price', color='blue')
+    ax.plot(bands['Upper_BB'], label='Upper Bollinger Band', color='red', linestyle='--')
+    ax.plot(bands['Middle_BB'], label='Middle Bollinger Band (SMA)', color='orange', linestyle='--')
+    ax.plot(bands['Lower_BB'], label='Lower Bollinger Band', color='green', linestyle='--')
+    ax.fill_between(bands.index, bands['Upper_BB'], bands['Lower_BB'], color='gray', alpha=0.2)
     ax.set_title('Bollinger Bands', fontsize=15)
     ax.set_xlabel('Date')
     ax.set_ylabel('Price')
     ax.legend(loc='upper left')
-    st.pyplot(fig)
-
-def compute_volumetric_data(df):
-    df = df.copy()
-    df['Buy_Volume'] = df['Volume'].where(df['Close'] > df['Open'], 0)
-    df['Sell_Volume'] = df['Volume'].where(df['Close'] <= df['Open'], 0)
-    return df
 
-def plot_volumetric_chart(df):
-    st.write("Volume chart tracks the number of shares/contracts traded.")
-    st.write("High volume: Confirms price trends (up or down).")
-    st.write("Low volume: Signals lack of interest or indecision.")
-    df_vol = compute_volumetric_data(df)
-    fig, ax = plt.subplots(figsize=(15, 7))
-    ax.bar(df_vol.index, df_vol['Buy_Volume'], color='green', alpha=0.6, label='Buying Pressure')
-    ax.bar(df_vol.index, df_vol['Sell_Volume'], color='red', alpha=0.6, label='Selling Pressure')
+def draw_volume(ax, volume):
+    # Bars keep each pixel's busiest and quietest days, so spikes survive thinning
+    volume = volume.loc[thin(volume.sum(axis=1), ax, method="minmax").index]
+    ax.bar(volume.index, volume['Buy_Volume'], color='green', alpha=0.6, label='Buying Pressure')
+    ax.bar(volume.index, volume['Sell_Volume'], color='red', alpha=0.6, label='Selling Pressure')
     ax.set_title('Volumetric Chart: Buying vs Selling Pressure', fontsize=15)
     ax.set_xlabel('Date')
     ax.set_ylabel('Volume')
     ax.legend(loc='upper left')
-    st.pyplot(fig)
-
-# =========================
-# FEATURE ENGINEERING (for ML)
-# =========================
-def add_features(df):
-    """Add technical features and target for the model (ML‑ready)."""
-    df = df.copy()
-    df['Return']     = df['Close'].pct_change()
-    df['SMA_10']     = df['Close'].rolling(10).mean()
-    df['SMA_50']     = df['Close'].rolling(50).mean()
-    df['EMA_10']     = df['Close'].ewm(span=10).mean()
-    df['Volatility'] = df['Close'].rolling(10).std()
-    df['Momentum']   = df['Close'] - df['Close'].shift(5)
-    df['Lag1']       = df['Close'].shift(1)
-    df['Lag2']       = df['Close'].shift(2)
-    df['Lag3']       = df['Close'].shift(3)
-
-    # RSI
-    delta = df['Close'].diff()
-    gain  = delta.where(delta > 0, 0.0).rolling(14).mean()
-    loss  = (-delta.where(delta < 0, 0.0)).rolling(14).mean()
-    df['RSI'] = 100 - (100 / (1 + gain / loss))
-
-    # MACD signal gap
-    macd   = df['Close'].ewm(span=12).mean() - df['Close'].ewm(span=26).mean()
-    signal = macd.ewm(span=9).mean()
-    df['MACD_gap'] = macd - signal
-
-    # Bollinger Band position (0 = lower band, 1 = upper band)
-    mid = df['Close'].rolling(20).mean()
-    std = df['Close'].rolling(20).std()
-    df['BB_position'] = (df['Close'] - (mid - 2*std)) / (4 * std)
-
-    # Stochastic
-    low14  = df['Low'].rolling(14).min()
-    high14 = df['High'].rolling(14).max()
-    df['Stoch'] = 100 * (df['Close'] - low14) / (high14 - low14)
-
-    # SMA crossover signal
-    df['SMA_cross'] = df['SMA_10'] - df['SMA_50']
-
-    df['Target'] = (df['Close'].shift(-1) > df['Close']).astype(int)
-    df.dropna(inplace=True)
-    return df
 
-# =========================
-# ROI CALCULATOR
-# =========================
-def calculate_advanced_roi(ticker, start_date, investment):
-    df = yf.download(ticker, start=start_date, auto_adjust=True)
-    benchmark = yf.download("^BSESN", start=start_date, auto_adjust=True)
-
-    if df.empty or benchmark.empty:
-        return None
-
-    # 🔥 UNIVERSAL CLOSE PRICE EXTRACTOR
-    def get_close_series(data):
-        close = data['Close']
-
-        # Case 1: already Series → OK
-        if isinstance(close, pd.Series):
-            return close.dropna()
-
-        # Case 2: DataFrame with 1 column → squeeze to Series
-        if isinstance(close, pd.DataFrame):
-            return close.squeeze().dropna()
-
-        # fallback safety
-        return pd.Series(close).dropna()
-
-    close_prices = get_close_series(df)
-    bench_close = get_close_series(benchmark)
-
-    # Convert to floats safely
-    start_price = float(close_prices.iloc[0])
-    current_price = float(close_prices.iloc[-1])
+def draw_confusion_matrix(ax, cm):
+    cax = ax.imshow(cm, interpolation='nearest', cmap='Blues')
+    ax.figure.colorbar(cax)
+    classes = ['Down', 'Up']
+    ax.set(xticks=np.arange(len(classes)), yticks=np.arange(len(classes)),
+           xticklabels=classes, yticklabels=classes,
+           title="Confusion Matrix", ylabel="True Value", xlabel="Predicted Value")
+    for i in range(2):
+        for j in range(2):
+            ax.text(j, i, format(cm[i, j], 'd'), ha="center", va="center", color="black")
+
+def draw_importances(ax, importances):
+    importances.plot(kind='bar', ax=ax, color='steelblue')
+    ax.set_title("Top 8 features driving predictions (Random Forest)", fontsize=13)
+    ax.set_ylabel("Importance score")
+    ax.set_xlabel("")
+    ax.tick_params(axis='x', labelrotation=30)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+
+def draw_equity(ax, strategy, buy_hold, label):
+    ax.plot(thin(strategy, ax), label=label, linewidth=2)
+    ax.plot(thin(buy_hold, ax), label="Buy & Hold", alpha=0.6)
+    ax.set_ylabel("Growth of ₹1")
+    ax.set_title("Walk-forward equity curve (out-of-fold predictions only)")
+    ax.legend()
+
+def draw_growth(ax, value, label, benchmark=None, linewidth=None):
+    ax.plot(thin(value, ax), label=label, linewidth=linewidth)
+    if benchmark is not None:
+        ax.plot(thin(benchmark, ax), label="Sensex (same investment)", alpha=0.6)
+    ax.set_ylabel("Portfolio Value (₹)")
+    ax.legend()
+
+def draw_projection(ax, bands, investment):
+    ax.fill_between(bands.index, bands["P5"], bands["P95"], alpha=0.2, label="5th–95th percentile")
+    ax.fill_between(bands.index, bands["P25"], bands["P75"], alpha=0.4, label="25th–75th percentile")
+    ax.plot(bands.index, bands["P50"], linewidth=2, label="Median")
+    ax.axhline(investment, color="grey", linestyle="--", linewidth=1, label="Investment")
+    ax.set_xlabel("Years ahead")
+    ax.set_ylabel("Portfolio Value (₹)")
+    ax.legend(loc="upper left")
 
-    # ===== ROI =====
-    shares = investment / start_price
-    final_value = shares * current_price
-    total_return_pct = (final_value - investment) / investment * 100
+def draw_frontier(ax, frontier, assets, best, safest):
+    ax.plot(frontier["Volatility %"], frontier["Return %"], linewidth=2, label="Efficient Frontier")
+    ax.scatter(assets["Volatility %"], assets["Return %"], s=12, alpha=0.6, label="Holdings")
+    ax.scatter(*best, marker="*", s=250, label="Max Sharpe")
+    ax.scatter(*safest, marker="*", s=250, label="Min Volatility")
+    ax.set_xlabel("Annualized Volatility (%)")
+    ax.set_ylabel("Annualized Return (%)")
+    ax.legend()
+
+def plot_rsi(df, window=14, indicators=None):
+    if indicators is not None and window == 14:
+        rsi = indicators['RSI']
+    else:
+        rsi = compute_rsi(df, window)
+    show_chart("rsi", draw_rsi, rsi)
 
-    # ===== CAGR =====
-    days = (close_prices.index[-1] - close_prices.index[0]).days
-    years = days / 365
-    cagr = ((final_value / investment) ** (1 / years) - 1) * 100
+def plot_bollinger_bands(df, window=20, indicators=None):
+    bands = indicators if indicators is not None and window == 20 else compute_bollinger_bands(df, window)
+    bands = pd.DataFrame({'Close': df['Close'], 'Upper_BB': bands['Upper_BB'],
+                          'Middle_BB': bands['Middle_BB'], 'Lower_BB': bands['Lower_BB']}, index=df.index)
+    show_chart("bollinger_bands", draw_bollinger_bands, bands)
 
-    # ===== Volatility =====
-    returns = close_prices.pct_change().dropna()
-    volatility = returns.std() * np.sqrt(252) * 100
+def plot_volumetric_chart(df, indicators=None):
+    st.write("Volume chart tracks the number of shares/contracts traded.")
+    st.write("High volume: Confirms price trends (up or down).")
+    st.write("Low volume: Signals lack of interest or indecision.")
+    df_vol = indicators if indicators is not None else compute_volumetric_data(df)
+    show_chart("volume", draw_volume, df_vol[['Buy_Volume', 'Sell_Volume']], figsize=(15, 7))
 
-    # ===== Sharpe =====
-    risk_free_rate = 0.06
-    sharpe = (cagr/100 - risk_free_rate) / (volatility/100)
+# =========================
+# CACHED STAGES
+# =========================
+# Streamlit reruns the whole script on every interaction; these keep each
+# stage's result until its inputs change. The indicator and feature stages
+# live in one FeatureCache shared by every session and the prefetch pool,
+# sized for everything the prefetcher keeps warm plus room for the symbols
+# being viewed; otherwise warming would evict them.
+PREFETCH_MAX_SYMBOLS = 48
+STAGE_CACHE_ENTRIES = PREFETCH_MAX_SYMBOLS + 16
+
+@st.cache_resource
+def get_stage_cache():
+    return FeatureCache(max_entries=STAGE_CACHE_ENTRIES)
+
+def load_indicators(df_raw):
+    return get_stage_cache().indicators(df_raw)
+
+def load_features(df_raw):
+    return get_stage_cache().features(df_raw)
+
+@st.cache_data(ttl=900, max_entries=32, show_spinner="Screening...")
+def load_screen(symbols, conditions, match, descending):
+    results = screen(list(symbols), list(conditions), match=match, ascending=not descending)
+    return results, results.attrs["missing"]
+
+@st.cache_data(ttl=900, max_entries=16, show_spinner="Simulating paths...")
+def run_projection(tickers, start_date, investment, weights, years, n_paths, method):
+    analysis = analyze_portfolio(list(tickers), start_date, investment, weights=weights)
+    if analysis is None:
+        return None
+    returns = analysis["values"]["Portfolio"].pct_change().dropna()
+    return project_growth(returns, investment, years=years, n_paths=n_paths, method=method)
 
-    # ===== Benchmark =====
-    bench_return = (bench_close.iloc[-1] - bench_close.iloc[0]) / bench_close.iloc[0] * 100
+# =========================
+# BACKGROUND PREFETCH
+# =========================
+# Portfolio and watchlist symbols are downloaded and feature-engineered in
+# the background, into the OHLCV cache and the stage cache above, so
+# switching to one renders from them.
+def warm_symbols(stage_cache, symbols, start, end):
+    # Runs on the prefetch pool, which has no script context: no st.* calls
+    failed = {}
+    for symbol, df in load_ohlcv_many(symbols, start, end).items():
+        if df.empty:
+            failed[symbol] = "no data"
+        else:
+            stage_cache.features(df)
+    return failed
 
-    return {"Final Value": float(final_value),
-            "Total Return %": float(total_return_pct),
-            "CAGR %": float(cagr),
-            "Volatility %": float(volatility),
-            "Sharpe Ratio": float(sharpe),
-            "Sensex Return %": float(bench_return)}
+@st.cache_resource
+def get_prefetcher():
+    return Prefetcher(functools.partial(warm_symbols, get_stage_cache()), max_keys=PREFETCH_MAX_SYMBOLS)
 
 # =========================
 # STREAMLIT UI
@@ -272,7 +304,8 @@ rsi_ind = "Relative Strength Index (RSI)" in selected_indicators
 volume_ind = "Volume Chart" in selected_indicators
 
 # ---- Fetch raw data ----
-df_raw = get_stock_data(stock_symbol, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+range_args = (start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+df_raw = get_stock_data(stock_symbol, *range_args)
 if df_raw.empty:
     st.warning("No data found for the selected stock or date range. Model needs at least 5 days to predict results.")
     st.stop()
@@ -282,16 +315,16 @@ with st.expander("Data Visualization"):
      st.subheader(f"Stock Data for {stock_symbol}")
      st.write(f"Historical data for {stock_symbol} from {start_date} to {end_date}, in its listed currency")
      st.dataframe(df_raw.tail())
+     provider = get_provider()
+     if provider.cache_namespace is None:
+         st.caption(f"Data source: {provider!r}")
+     else:
+         cache_stats = get_ohlcv_cache(provider.cache_namespace).stats()
+         st.caption(f"Data source: {provider.name}. Cache: {cache_stats['hits']} hits, "
+                    f"{cache_stats['partial_hits']} partial, {cache_stats['misses']} misses")
 
      st.subheader("Closing Price Over Time")
-     fig, ax = plt.subplots(figsize=(15, 5))
-     ax.plot(df_raw['Close'], label='Close Price', color='blue')
-     ax.set_title(f"{stock_symbol} - Closing Price History", fontsize=15)
-     ax.set_ylabel('Price', fontsize=12)
-     ax.set_xlabel('Date', fontsize=12)
-     ax.grid(True)
-     plt.legend()
-     st.pyplot(fig)
+     show_chart("close_price", draw_close, df_raw['Close'], stock_symbol)
 
 # ---- Portfolio & Watchlist buttons ----
 st.header("Portfolio & Watchlist")
@@ -315,11 +348,20 @@ if watchlist_add:
     else:
         st.warning(f"{stock_symbol} is already in your Watchlist.")
 
-# ---- Feature engineering for ML ----
-df_ml = add_features(df_raw)  # adds all new features + target, drops NA
+# ---- Background prefetch of saved symbols for this date range ----
+saved_symbols = [s for s in dict.fromkeys(st.session_state['portfolio'] + st.session_state['watchlist'])
+                 if s != stock_symbol]
+prefetcher = get_prefetcher()
+prefetcher.request(st.session_state['client_id'], saved_symbols, *range_args)
+prefetch_status = prefetcher.status(saved_symbols, *range_args)
+PREFETCH_LABELS = {"warm": "ready", "warming": "loading in background", "failed": "prefetch failed"}
 
 # ---- Tabs ----
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["Portfolio", "Watchlist", "Technical Indicators", "Predictions", "Calculate ROI"])
+# Only the selected tab's heavy content runs (tabN.open), so chart-only users
+# never pay for feature engineering, training or ROI downloads.
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Portfolio", "Watchlist", "Technical Indicators", "Predictions",
+                                              "Calculate ROI", "Screener"],
+                                             key="main_tabs", on_change="rerun")
 
 # ---------- Tab 1: Portfolio ----------
 with tab1:
@@ -329,6 +371,8 @@ with tab1:
             col_a, col_b = st.columns([3, 1])
             with col_a:
                 st.write(f"**{stock}**")
+                if prefetch_status.get(stock) in PREFETCH_LABELS:
+                    st.caption(PREFETCH_LABELS[prefetch_status[stock]])
             with col_b:
                 if st.button(f"Remove {stock}", key=f"remove_port_{stock}"):
                     st.session_state['portfolio'].remove(stock)
@@ -336,6 +380,43 @@ with tab1:
     else:
         st.write("No Stocks in your portfolio yet.")
 
+    # ---- Mean-variance optimizer over the saved holdings ----
+    if len(st.session_state['portfolio']) >= 2:
+        st.subheader("Optimize Portfolio")
+        opt_start = st.date_input("History From", pd.Timestamp.today() - pd.DateOffset(years=3), key="opt_start")
+        if st.button("Find Efficient Frontier"):
+            holdings = st.session_state['portfolio']
+            warm = st.session_state.get('frontier_warm')
+            warm = warm[1] if warm is not None and warm[0] == tuple(holdings) else None
+            try:
+                optimized = optimize_portfolio(holdings, opt_start, warm_start=warm)
+            except ValueError as e:
+                st.error(str(e))
+                optimized = None
+            if optimized:
+                best, safest = optimized["max_sharpe"], optimized["min_volatility"]
+                if not optimized["missing"]:
+                    st.session_state['frontier_warm'] = (tuple(holdings), best["weights"].to_numpy())
+                col1, col2 = st.columns(2)
+                for col, label, pick in ((col1, "Max Sharpe", best), (col2, "Min Volatility", safest)):
+                    col.metric(f"{label} Return", f"{pick['Return %']:.2f}%")
+                    col.metric(f"{label} Volatility", f"{pick['Volatility %']:.2f}%")
+                    col.metric(f"{label} Sharpe Ratio", f"{pick['Sharpe Ratio']:.2f}")
+
+                frontier, assets = optimized["frontier"], optimized["assets"]
+                show_chart("efficient_frontier", draw_frontier, frontier, assets,
+                           (best["Volatility %"], best["Return %"]),
+                           (safest["Volatility %"], safest["Return %"]), figsize=(12,5))
+
+                weights = pd.DataFrame({"Max Sharpe %": best["weights"] * 100,
+                                        "Min Volatility %": safest["weights"] * 100})
+                weights = weights[(weights > 0.01).any(axis=1)].sort_values("Max Sharpe %", ascending=False)
+                st.dataframe(weights.style.format("{:.2f}"))
+                st.caption(f"Annualized over {TRADING_DAYS} trading days with a {RISK_FREE_RATE:.0%} risk-free rate; "
+                           f"covariance shrunk {optimized['shrinkage']:.0%} towards its average variance.")
+                if optimized["missing"]:
+                    st.warning(f"No data for {', '.join(optimized['missing'])}; left out of the optimization.")
+
 # ---------- Tab 2: Watchlist ----------
 with tab2:
     st.subheader("Manage Your Watchlist")
@@ -344,6 +425,8 @@ with tab2:
             col_a, col_b = st.columns([3, 1])
             with col_a:
                 st.write(f"**{stock}**")
+                if prefetch_status.get(stock) in PREFETCH_LABELS:
+                    st.caption(PREFETCH_LABELS[prefetch_status[stock]])
             with col_b:
                 if st.button(f"Remove {stock}", key=f"remove_watch_{stock}"):
                     st.session_state['watchlist'].remove(stock)
@@ -353,283 +436,360 @@ with tab2:
 
 # ---------- Tab 3: Technical Indicators ----------
 with tab3:
-    st.subheader("Technical Indicators")
-    if sma_50:
-        st.header("Simple Moving Average (SMA) of 50 Days")
-        st.write("The **50-day** SMA looks at the average price over the last 50 days (last 50 days shown).")
-        df_raw['SMA_50'] = df_raw['Close'].rolling(window=50).mean()
-        # Plot only the last 50 days where SMA is defined
-        sma50_plot = df_raw['SMA_50'].dropna().iloc[-50:]  # last 50 valid points
-        fig, ax = plt.subplots(figsize=(15, 5))
-        ax.plot(sma50_plot.index, sma50_plot, label="50-Day SMA", color='orange')
-        ax.set_title(f"{stock_symbol} - 50-Day Simple Moving Average", fontsize=15)
-        ax.set_ylabel('Price', fontsize=12)
-        ax.set_xlabel('Date', fontsize=12)
-        ax.legend(loc='best')
-        st.pyplot(fig)
-
-    if sma_200:
-        st.header("Simple Moving Average (SMA) of 200 Days")
-        st.write("The **200-day** SMA looks at the average price over the last 200 days (last 200 days shown).")
-        df_raw['SMA_200'] = df_raw['Close'].rolling(window=200).mean()
-        sma200_plot = df_raw['SMA_200'].dropna().iloc[-200:]  # last 200 valid points
-        fig, ax = plt.subplots(figsize=(15, 5))
-        ax.plot(sma200_plot.index, sma200_plot, label="200-Day SMA", color='green')
-        ax.set_title(f"{stock_symbol} - 200-Day Simple Moving Average", fontsize=15)
-        ax.set_ylabel('Price', fontsize=12)
-        ax.set_xlabel('Date', fontsize=12)
-        ax.legend(loc='best')
-        st.pyplot(fig)
-
-    if macd_ind:
-        st.header("MACD (Moving Average Convergence Divergence)")
-        st.write("If the **MACD line** is higher than the **signal line**, the asset price could go **up**.")
-        st.write("If the **MACD line** is lower than the **signal line**, the asset price could go **down**.")
-        macd_line, signal_line = compute_macd(df_raw)
-        fig, ax = plt.subplots(figsize=(15, 5))
-        ax.plot(macd_line, label="MACD", color='blue')
-        ax.plot(signal_line, label="Signal Line", color='orange')
-        ax.set_title(f"{stock_symbol} - MACD", fontsize=15)
-        ax.set_ylabel('Value', fontsize=12)
-        ax.set_xlabel('Date', fontsize=12)
-        ax.legend(loc='best')
-        st.pyplot(fig)
-
-    if stochastic_ind:
-        st.header("Stochastic Oscillator")
-        st.write("Above **80** → might be overbought (could come down). Below **20** → might be oversold (could go up).")
-        stochastic_oscillator = compute_stochastic(df_raw)
-        fig, ax = plt.subplots(figsize=(15, 5))
-        ax.plot(stochastic_oscillator, label="Stochastic Oscillator", color='green')
-        ax.axhline(80, linestyle='--', color='red')
-        ax.axhline(20, linestyle='--', color='blue')
-        ax.set_title(f"{stock_symbol} - Stochastic Oscillator", fontsize=15)
-        ax.set_ylabel('Stochastic Value', fontsize=12)
-        ax.set_xlabel('Date', fontsize=12)
-        ax.legend(loc='best')
-        st.pyplot(fig)
-
-    if bollinger_ind:
-        st.subheader("Bollinger Bands")
-        st.write("If price hits/exceeds the **upper band**, potential **sell**. If it drops below the **lower band**, potential **buy**.")
-        plot_bollinger_bands(df_raw)
-
-    if rsi_ind:
-        st.subheader("Relative Strength Index (RSI)")
-        st.write("RSI above **70** → overbought (sell). RSI below **30** → oversold (buy).")
-        plot_rsi(df_raw)
-
-    if volume_ind:
-        st.subheader("Volume Chart")
-        plot_volumetric_chart(df_raw)
+    if tab3.open:
+        indicators = load_indicators(df_raw)
+        st.subheader("Technical Indicators")
+        if sma_50:
+            st.header("Simple Moving Average (SMA) of 50 Days")
+            st.write("The **50-day** SMA looks at the average price over the last 50 days (last 50 days shown).")
+            # Plot only the last 50 days where SMA is defined
+            sma50_plot = indicators['SMA_50'].dropna().iloc[-50:]  # last 50 valid points
+            show_chart("sma_50", draw_series, sma50_plot, "50-Day SMA", 'orange',
+                       f"{stock_symbol} - 50-Day Simple Moving Average")
+
+        if sma_200:
+            st.header("Simple Moving Average (SMA) of 200 Days")
+            st.write("The **200-day** SMA looks at the average price over the last 200 days (last 200 days shown).")
+            sma200_plot = indicators['SMA_200'].dropna().iloc[-200:]  # last 200 valid points
+            show_chart("sma_200", draw_series, sma200_plot, "200-Day SMA", 'green',
+                       f"{stock_symbol} - 200-Day Simple Moving Average")
+
+        if macd_ind:
+            st.header("MACD (Moving Average Convergence Divergence)")
+            st.write("If the **MACD line** is higher than the **signal line**, the asset price could go **up**.")
+            st.write("If the **MACD line** is lower than the **signal line**, the asset price could go **down**.")
+            show_chart("macd", draw_macd, indicators[['MACD', 'MACD_signal']], stock_symbol)
+
+        if stochastic_ind:
+            st.header("Stochastic Oscillator")
+            st.write("Above **80** → might be overbought (could come down). Below **20** → might be oversold (could go up).")
+            show_chart("stochastic", draw_stochastic, indicators['Stoch'], stock_symbol)
+
+        if bollinger_ind:
+            st.subheader("Bollinger Bands")
+            st.write("If price hits/exceeds the **upper band**, potential **sell**. If it drops below the **lower band**, potential **buy**.")
+            plot_bollinger_bands(df_raw, indicators=indicators)
+
+        if rsi_ind:
+            st.subheader("Relative Strength Index (RSI)")
+            st.write("RSI above **70** → overbought (sell). RSI below **30** → oversold (buy).")
+            plot_rsi(df_raw, indicators=indicators)
+
+        if volume_ind:
+            st.subheader("Volume Chart")
+            plot_volumetric_chart(df_raw, indicators)
 
 # ---------- Tab 4: Predictions ----------
 with tab4:
-    st.subheader("Predictions For Next Day's Trading")
-    if df_ml.empty:
-        st.error("Not enough data after feature engineering. Select a larger date range.")
-    else:
-        # Updated feature list with all new technical indicators
-        features = df_ml[[
-            'Return', 'SMA_10', 'SMA_50', 'EMA_10', 'Volatility', 'Momentum',
-            'Lag1', 'Lag2', 'Lag3',
-            'RSI', 'MACD_gap', 'BB_position', 'Stoch', 'SMA_cross'
-        ]]
-        target = df_ml['Target']
-
-        # ---- Time-aware cross-validation (TimeSeriesSplit) ----
-        tscv = TimeSeriesSplit(n_splits=5)
-
-        # Models with improved hyperparameters & class balancing
-        models = {
-            "Random Forest": RandomForestClassifier(
-                n_estimators=500,            # more trees = more stable
-                max_depth=6,                # shallower = less overfit
-                min_samples_leaf=20,        # prevents memorising
-                max_features='sqrt',
-                class_weight='balanced',
-                random_state=50,
-                n_jobs=-1),
-            "Gradient Boosting": GradientBoostingClassifier(
-                n_estimators=200,
-                learning_rate=0.05,
-                max_depth=5,
-                random_state=50),
-            "XGBoost": xgb.XGBClassifier(
-                n_estimators=300,
-                max_depth=4,
-                learning_rate=0.03,
-                subsample=0.8,
-                colsample_bytree=0.8,
-                min_child_weight=10,
-                eval_metric='logloss',
-                random_state=50),
-            "Decision Tree": DecisionTreeClassifier(
-                max_depth=6,
-                class_weight='balanced',
-                random_state=50)
-        }
-
-        # Cross-validate and collect scores
-        cv_scores = {name: [] for name in models}
-        for train_idx, test_idx in tscv.split(features):
-            X_tr, X_te = features.iloc[train_idx], features.iloc[test_idx]
-            y_tr, y_te = target.iloc[train_idx], target.iloc[test_idx]
-
-            scaler = StandardScaler()
-            X_tr_s = scaler.fit_transform(X_tr)
-            X_te_s = scaler.transform(X_te)
-
-            for name, model in models.items():
-                model.fit(X_tr_s, y_tr)
-                score = accuracy_score(y_te, model.predict(X_te_s))
-                cv_scores[name].append(score)
-
-        st.subheader("Cross‑Validation Results (5‑fold)")
-        for name, scores in cv_scores.items():
-            mean = np.mean(scores) * 100
-            std  = np.std(scores) * 100
-            st.write(f"{name}: {mean:.1f}% ± {std:.1f}%")
-
-        # ---- Retrain on full data for final ensemble & next‑day prediction ----
-        # Use a simple time‑split for final evaluation (70/30)
-        split = int(len(features) * 0.7)
-        X_train, X_test = features[:split], features[split:]
-        y_train, y_test = target[:split], target[split:]
-
-        scaler_full = StandardScaler()
-        X_train_scaled = scaler_full.fit_transform(X_train)
-        X_test_scaled = scaler_full.transform(X_test)
-
-        # Train all models on full training set
-        for name, model in models.items():
-            model.fit(X_train_scaled, y_train)
-
-        # Ensemble via average probability
-        probs = []
-        model_accuracies = {}
-        for name, model in models.items():
-            y_pred = model.predict(X_test_scaled)
-            acc = accuracy_score(y_test, y_pred) * 100
-            model_accuracies[name] = acc
-            probs.append(model.predict_proba(X_test_scaled)[:, 1])
-
-        avg_prob = np.mean(probs, axis=0)
-        final_preds = (avg_prob > 0.5).astype(int)
-        ensemble_acc = accuracy_score(y_test, final_preds) * 100
-
-        # ---- Baseline comparison & confidence metrics ----
-        baseline = target.mean() * 100  # how often stock goes up
-        baseline = max(baseline, 100 - baseline)  # flip if it mostly goes down
-
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Ensemble Accuracy", f"{ensemble_acc:.1f}%")
-        col2.metric("Baseline (always guess majority)", f"{baseline:.1f}%")
-
-        beat = ensemble_acc - baseline
-        if beat > 3:
-            col3.metric("Edge over baseline", f"+{beat:.1f}%", delta="Model is learning")
-        elif beat > 0:
-            col3.metric("Edge over baseline", f"+{beat:.1f}%", delta="Marginal edge")
-        else:
-            col3.metric("Edge over baseline", f"{beat:.1f}%", delta="No edge — check features",
-                        delta_color="inverse")
-
-        # Class balance warning
-        up_pct = target.mean() * 100
-        if up_pct > 65 or up_pct < 35:
-            st.warning(f"⚠️ Imbalanced data: stock went UP {up_pct:.0f}% of days. "
-                       f"Models already use class_weight='balanced' where applicable.")
-
-        # Confusion matrix
-        cm = confusion_matrix(y_test, final_preds)
-        fig, ax = plt.subplots(figsize=(6, 5))
-        cax = ax.imshow(cm, interpolation='nearest', cmap=plt.cm.Blues)
-        fig.colorbar(cax)
-        classes = ['Down', 'Up']
-        ax.set(xticks=np.arange(len(classes)), yticks=np.arange(len(classes)),
-               xticklabels=classes, yticklabels=classes,
-               title="Confusion Matrix", ylabel="True Value", xlabel="Predicted Value")
-        for i in range(2):
-            for j in range(2):
-                ax.text(j, i, format(cm[i, j], 'd'), ha="center", va="center", color="black")
-        st.pyplot(fig)
-
-        # Individual model accuracy dropdown
-        st.subheader("Individual Model Accuracies")
-        selected_model_name = st.selectbox("Select Model", list(models.keys()))
-        st.write(f"{selected_model_name} Accuracy: {model_accuracies[selected_model_name]:.2f}%")
-
-        # ---- Feature Importance Chart ----
-        st.subheader("What the model actually learned")
-        rf_model = models["Random Forest"]
-        importances = pd.Series(
-            rf_model.feature_importances_,
-            index=features.columns
-        ).sort_values(ascending=False)
-
-        fig, ax = plt.subplots(figsize=(10, 4))
-        importances.head(8).plot(kind='bar', ax=ax, color='steelblue')
-        ax.set_title("Top 8 features driving predictions (Random Forest)", fontsize=13)
-        ax.set_ylabel("Importance score")
-        ax.set_xlabel("")
-        plt.xticks(rotation=30, ha='right')
-        st.pyplot(fig)
-
-        # ---- Next day prediction (ensemble) ----
-        latest_features = scaler_full.transform(features.iloc[-1:].values)
-        latest_probs = [m.predict_proba(latest_features)[0][1] for m in models.values()]
-        final_up_prob = np.mean(latest_probs)
-
-        st.subheader("Next Day Prediction")
-        if final_up_prob > 0.5:
-            st.success(f"UP ({final_up_prob*100:.2f}% probability)")
+    if tab4.open:
+        with st.spinner("Engineering features..."):
+            df_ml = load_features(df_raw)  # adds all new features + target, drops NA
+        st.subheader("Predictions For Next Day's Trading")
+        if df_ml.empty:
+            st.error("Not enough data after feature engineering. Select a larger date range.")
         else:
-            st.error(f"DOWN ({(1-final_up_prob)*100:.2f}% probability)")
+            # Updated feature list with all new technical indicators
+            features = df_ml[FEATURE_COLUMNS]
+            target = df_ml['Target']
+
+            # ---- Train (or load) the ensemble: walk-forward CV, then one final fit ----
+            tb1, tb2 = st.columns([1, 2])
+            budgeted = tb1.toggle("Time-budgeted training",
+                                  help="Boosters stop early on the newest data and the forest grows "
+                                       "until its probabilities settle, all within the budget.")
+            budget_s = tb2.slider("Training budget (seconds)", 5, 120, 20, 5, disabled=not budgeted)
+            trained, from_store = load_or_train(stock_symbol, df_ml, budget_s=budget_s if budgeted else None)
+            if from_store:
+                st.caption(f"Using models trained at {trained['trained_at']} (inputs unchanged).")
+            if trained["updates"]:
+                st.caption(f"Updated with {trained['new_rows']} new bar(s) in {trained['update_s']:.1f}s, "
+                           f"update {trained['updates']} of {REFIT_EVERY} before a full refit: "
+                           + ", ".join(f"{name} {done}" for name, done in trained["update_report"].items()) + ".")
+            if st.button("Retrain models", help="Refit every model from scratch on the whole history."):
+                get_model_store().invalidate(stock_symbol)
+                st.rerun()
+            if trained["budget_s"] is not None:
+                st.caption(f"Last full fit took {trained['train_s']:.1f}s of a {trained['budget_s']:.0f}s budget.")
+                report = pd.DataFrame(trained["fit_report"]).T
+                report.columns = ["Trees / Rounds", "Stopped By", "Final Fit (s)"]
+                st.dataframe(report.style.format({"Final Fit (s)": "{:.2f}"}))
+            tuning = get_tuning_store().best(stock_symbol)
+            if tuning:
+                scope = "this stock" if tuning["scope"] == stock_symbol else tuning["scope"]
+                with st.expander(f"Hyperparameters tuned for {scope} at {tuning['tuned_at']}"):
+                    # Budgeted training swaps in estimators the parameters were not tuned on
+                    in_use = {k: all(trained["models"][k].get_params().get(p) == v for p, v in params.items())
+                              for k, params in tuning["params"].items() if k in trained["models"]}
+                    st.dataframe(pd.DataFrame({
+                        "Tuned CV %": {k: v * 100 for k, v in tuning["scores"].items()},
+                        "Default CV %": {k: v * 100 for k, v in tuning["default_scores"].items()},
+                        "Parameters": {k: ", ".join(f"{p}={v}" for p, v in params.items())
+                                       for k, params in tuning["params"].items()},
+                        "In Use": in_use,
+                    }).style.format({"Tuned CV %": "{:.1f}", "Default CV %": "{:.1f}"}))
+
+            models = trained["models"]
+            cv_scores, cv_timings = trained["cv_scores"], trained["cv_timings"]
+
+            st.subheader("Cross‑Validation Results (5‑fold)")
+            for name, scores in cv_scores.items():
+                mean = np.mean(scores) * 100
+                std  = np.std(scores) * 100
+                st.write(f"{name}: {mean:.1f}% ± {std:.1f}%")
+            with st.expander("Cross-validation job timings"):
+                st.dataframe(pd.DataFrame(cv_timings))
+
+            # ---- Evaluate on the out-of-fold (walk-forward) predictions ----
+            evaluation = evaluate_walk_forward(trained, target)
+            model_accuracies = evaluation["model_accuracies"]
+            ensemble_acc = evaluation["ensemble_accuracy"]
+
+            # ---- Baseline comparison & confidence metrics ----
+            baseline = evaluation["baseline"]
+
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Ensemble Accuracy", f"{ensemble_acc:.1f}%")
+            col2.metric("Baseline (always guess majority)", f"{baseline:.1f}%")
+
+            beat = ensemble_acc - baseline
+            if beat > 3:
+                col3.metric("Edge over baseline", f"+{beat:.1f}%", delta="Model is learning")
+            elif beat > 0:
+                col3.metric("Edge over baseline", f"+{beat:.1f}%", delta="Marginal edge")
+            else:
+                col3.metric("Edge over baseline", f"{beat:.1f}%", delta="No edge — check features",
+                            delta_color="inverse")
+
+            # Class balance warning
+            up_pct = target.mean() * 100
+            if up_pct > 65 or up_pct < 35:
+                st.warning(f"⚠️ Imbalanced data: stock went UP {up_pct:.0f}% of days. "
+                           f"Models already use class_weight='balanced' where applicable.")
+
+            # Confusion matrix
+            show_chart("confusion_matrix", draw_confusion_matrix, evaluation["confusion_matrix"], figsize=(6, 5))
+
+            # Individual model accuracy dropdown
+            st.subheader("Individual Model Accuracies")
+            selected_model_name = st.selectbox("Select Model", list(models.keys()))
+            st.write(f"{selected_model_name} Accuracy: {model_accuracies[selected_model_name]:.2f}%")
+
+            # ---- Feature Importance Chart ----
+            st.subheader("What the model actually learned")
+            rf_model = models["Random Forest"]
+            importances = pd.Series(
+                rf_model.feature_importances_,
+                index=features.columns
+            ).sort_values(ascending=False)
+
+            show_chart("feature_importance", draw_importances, importances.head(8), figsize=(10, 4))
+
+            # ---- Backtest: does trading the signal make money? ----
+            st.subheader("Backtest the Signal")
+            bt1, bt2, bt3, bt4 = st.columns(4)
+            bt_threshold = round(bt1.slider("Go long above", 0.50, 0.69, 0.55, 0.01,
+                                            help="Hold the stock on days the ensemble's UP probability exceeds this."), 2)
+            bt_cost = bt2.number_input("Cost (bps per trade)", 0.0, 100.0, 10.0, 1.0)
+            bt_slippage = bt3.number_input("Slippage (bps)", 0.0, 100.0, 5.0, 1.0)
+            bt_short = bt4.checkbox("Short below 1 − threshold")
+            signals = {stock_symbol: oof_signals(df_ml, trained)}
+            backtest = backtest_signals(signals, cost_bps=bt_cost, slippage_bps=bt_slippage,
+                                        allow_short=bt_short, equity=True)
+            sweep = backtest["metrics"].loc[stock_symbol]
+            chosen = sweep.loc[bt_threshold]
+
+            col1, col2, col3, col4, col5 = st.columns(5)
+            col1.metric("Strategy CAGR", f"{chosen['CAGR %']:.2f}%")
+            col2.metric("Buy & Hold Return", f"{chosen['Buy & Hold %']:.2f}%",
+                        help=f"Strategy total return {chosen['Total Return %']:.2f}%")
+            col3.metric("Max Drawdown", f"{chosen['Max Drawdown %']:.2f}%")
+            col4.metric("Hit Rate", f"{chosen['Hit Rate %']:.1f}%")
+            col5.metric("Turnover", f"{chosen['Turnover']:.0f}×/yr")
+
+            curves = backtest["equity"][stock_symbol]
+            show_chart("backtest_equity", draw_equity, curves[bt_threshold],
+                       (1 + signals[stock_symbol]["Return"].fillna(0)).cumprod(),
+                       f"Strategy (> {bt_threshold:.2f})", figsize=(12,5))
+            with st.expander("All thresholds"):
+                st.dataframe(sweep.style.format("{:,.2f}"))
+
+            # ---- Next day prediction (ensemble) ----
+            final_up_prob = predict_up_probability(trained, features)
+
+            st.subheader("Next Day Prediction")
+            if final_up_prob > 0.5:
+                st.success(f"UP ({final_up_prob*100:.2f}% probability)")
+            else:
+                st.error(f"DOWN ({(1-final_up_prob)*100:.2f}% probability)")
 
 with tab5: #ROI CALC
-    st.subheader("Advanced Investment Analytics")
+    if tab5.open:
+        st.subheader("Advanced Investment Analytics")
 
-    roi_start_date = st.date_input(
-        "Investment Start Date",
-        pd.to_datetime("2016-01-01"),
-        key="roi_start")
-    
-    investment_amount = st.number_input(
-        "Investment Amount (₹)",
-        min_value=1000,
-        value=100000,
-        step=1000)
+        roi_start_date = st.date_input(
+            "Investment Start Date",
+            pd.to_datetime("2016-01-01"),
+            key="roi_start")
     
-    if st.button("Calculate Advanced ROI"):
-        result = calculate_advanced_roi(stock_symbol, roi_start_date, investment_amount)
-        if result:
-            # ---- Metrics Row 1 ----
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Final Value", f"₹{result['Final Value']:,.0f}")
-            col2.metric("Total Return", f"{result['Total Return %']:.2f}%")
-            col3.metric("CAGR", f"{result['CAGR %']:.2f}%")
+        investment_amount = st.number_input(
+            "Investment Amount (₹)",
+            min_value=1000,
+            value=100000,
+            step=1000)
     
-            # ---- Metrics Row 2 ----
-            col4, col5 = st.columns(2)
-            col4.metric("Volatility", f"{result['Volatility %']:.2f}%")
-            col5.metric("Sharpe Ratio", f"{result['Sharpe Ratio']:.2f}")
+        roi_scope = st.radio("Analyse", ["Selected stock", "Portfolio"], horizontal=True,
+                             disabled=not st.session_state['portfolio'],
+                             help="Add stocks to your portfolio to analyse them together.")
+        roi_tickers = st.session_state['portfolio'] if roi_scope == "Portfolio" else [stock_symbol]
+        roi_weights = None
+        if roi_scope == "Portfolio":
+            weights_df = st.data_editor(pd.DataFrame({"Ticker": roi_tickers, "Weight": 1.0}),
+                                        disabled=["Ticker"], hide_index=True, key="roi_weights")
+            roi_weights = weights_df["Weight"].fillna(0).tolist()
+
+        if st.button("Calculate Advanced ROI"):
+            try:
+                analysis = analyze_portfolio(roi_tickers, roi_start_date, investment_amount, weights=roi_weights)
+            except ValueError as e:
+                st.error(str(e))
+                analysis = False
+            if analysis:
+                result = analysis["portfolio"]
+                # ---- Metrics Row 1 ----
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Final Value", f"₹{result['Final Value']:,.0f}")
+                col2.metric("Total Return", f"{result['Total Return %']:.2f}%")
+                col3.metric("CAGR", f"{result['CAGR %']:.2f}%")
     
-            # ---- Stock Growth Chart ----
-            st.subheader("Investment Growth Over Time")
+                # ---- Metrics Row 2 ----
+                col4, col5, col6, col7 = st.columns(4)
+                col4.metric("Volatility", f"{result['Volatility %']:.2f}%")
+                col5.metric("Sharpe Ratio", f"{result['Sharpe Ratio']:.2f}")
+                col6.metric("Max Drawdown", f"{result['Max Drawdown %']:.2f}%")
+                if analysis["benchmark"] is not None:
+                    col7.metric("vs Sensex", f"{result['Excess Return %']:+.2f}%",
+                                help=f"Sensex returned {analysis['benchmark']['Total Return %']:.2f}% over the same dates")
+
+                if len(roi_tickers) > 1:
+                    st.dataframe(analysis["holdings"].style.format("{:,.2f}"))
+                if analysis["missing"]:
+                    st.warning(f"No data for {', '.join(analysis['missing'])}; left out of the portfolio.")
     
-            stock_df = yf.download(stock_symbol, start=roi_start_date)
-    
-            normalized_price = stock_df['Close'] / stock_df['Close'].iloc[0]
-            investment_growth = normalized_price * investment_amount
-    
-            fig, ax = plt.subplots(figsize=(12,5))
-            ax.plot(investment_growth, label=f"{stock_symbol} Investment Value")
-            ax.set_ylabel("Portfolio Value (₹)")
-            ax.legend()
-
-        st.pyplot(fig)
+                # ---- Growth Chart (reuses the analysed series) ----
+                st.subheader("Investment Growth Over Time")
+                values = analysis["values"]
+                benchmark_cols = [c for c in values.columns if c.startswith("Benchmark")]
+                benchmark = values[benchmark_cols[0]] if benchmark_cols else None
+                if len(roi_tickers) > 1:
+                    show_chart("roi_growth", draw_growth, values["Portfolio"], "Portfolio Value",
+                               benchmark, linewidth=2, figsize=(12,5))
+                else:
+                    show_chart("roi_growth", draw_growth, values[roi_tickers[0]],
+                               f"{stock_symbol} Investment Value", benchmark, figsize=(12,5))
+            elif analysis is None:
+                st.error("Not enough price data for the selected stocks and start date.")
+
+        # ---- Monte Carlo projection from the same history ----
+        st.subheader("Monte Carlo Projection")
+        mc1, mc2, mc3 = st.columns(3)
+        mc_years = mc1.slider("Years ahead", 1, 30, 10)
+        mc_paths = mc2.select_slider("Paths", [10_000, 50_000, 100_000, 250_000, 500_000], value=100_000)
+        mc_method = mc3.radio("Model", ["bootstrap", "parametric"],
+                              format_func=lambda m: {"bootstrap": "Historical bootstrap",
+                                                     "parametric": "Log-normal (GBM)"}[m],
+                              help="Bootstrap resamples runs of consecutive historical returns; "
+                                   "log-normal uses only their mean and volatility.")
+        if st.button("Run Projection"):
+            try:
+                projection = run_projection(tuple(roi_tickers), roi_start_date, investment_amount,
+                                            tuple(roi_weights) if roi_weights else None,
+                                            mc_years, mc_paths, mc_method)
+            except ValueError as e:
+                st.error(str(e))
+                projection = False
+            if projection:
+                final = projection["final"]
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Median Value", f"₹{final[50]:,.0f}")
+                col2.metric("Expected CAGR", f"{projection['expected_cagr']:.2f}%",
+                            help=f"Median path CAGR {projection['median_cagr']:.2f}%")
+                col3.metric("Probability of Loss", f"{projection['prob_loss']:.1f}%")
+                col4.metric("5th–95th Percentile", f"₹{final[5]:,.0f} – ₹{final[95]:,.0f}")
+
+                show_chart("roi_projection", draw_projection, projection["bands"], investment_amount,
+                           figsize=(12,5))
+            elif projection is None:
+                st.error("Not enough price data for the selected stocks and start date.")
+
+# ---------- Tab 6: Screener ----------
+with tab6:
+    if tab6.open:
+        st.subheader("Index Screener")
+        st.write("Find stocks whose latest bar meets your conditions, across a whole index at once.")
+        with st.form("screener_form"):
+            universe = st.selectbox("Universe", list(UNIVERSES) + ["Portfolio & Watchlist", "Custom"])
+            custom_symbols = st.text_area("Custom symbols (comma or newline separated, e.g. TCS.NS)")
+            preset_labels = st.multiselect("Conditions", list(PRESET_CONDITIONS),
+                                           default=["RSI oversold (RSI < 30)"])
+            extra_condition = st.text_input("Extra condition (e.g. RSI < 35, Close > SMA_50)")
+            match = st.radio("Match", ["all", "any"], horizontal=True,
+                             format_func=lambda m: f"{m} conditions")
+            descending = st.checkbox("Sort descending")
+            run_screen = st.form_submit_button("Run Screener")
+
+        if run_screen:
+            if universe == "Custom":
+                universe_symbols = [s.strip().upper() for s in custom_symbols.replace(",", "\n").split() if s.strip()]
+            elif universe == "Portfolio & Watchlist":
+                universe_symbols = st.session_state['portfolio'] + st.session_state['watchlist']
+            else:
+                universe_symbols = UNIVERSES[universe]
+            conditions = [PRESET_CONDITIONS[label] for label in preset_labels]
+            conditions += [extra_condition] if extra_condition.strip() else []
+            st.session_state['screen_request'] = (tuple(universe_symbols), tuple(conditions), match, descending)
+            st.session_state['screen_page'] = 1
+
+        screen_request = st.session_state.get('screen_request')
+        if screen_request and not screen_request[0]:
+            st.warning("The selected universe has no symbols.")
+        elif screen_request and not screen_request[1]:
+            st.warning("Select at least one condition.")
+        elif screen_request:
+            try:
+                results, missing = load_screen(*screen_request)
+            except ValueError as e:
+                st.error(f"Invalid condition: {e}")
+            else:
+                pages = max(1, -(-len(results) // 25))
+                page = st.number_input("Page", min_value=1, max_value=pages, key="screen_page")
+                rows, pages = paginate(results, page, 25)
+                st.dataframe(rows)
+                st.caption(f"{len(results)} of {len(screen_request[0])} symbols match; page {page} of {pages}.")
+                if missing:
+                    st.caption(f"No data for: {', '.join(missing)}")
 
 # ---- Footer ----
 st.markdown("---")
 st.caption("MarketMantra – combining technical analysis with machine learning for smarter trading decisions.")
+
+# ---- Debug (append ?debug=1 to the URL) ----
+if st.query_params.get("debug"):
+    with st.expander("Debug: module import times"):
+        st.dataframe(pd.DataFrame(import_report(), columns=["Module", "Seconds"]))
+    with st.expander("Debug: stage timings for this run"):
+        if recorder.records:
+            stages = pd.DataFrame(recorder.records).drop(columns=["time"])
+            for col in ("bytes", "rss_delta_bytes", "peak_rss_bytes"):
+                if col in stages:
+                    stages[col.replace("bytes", "mb")] = stages.pop(col) / 2**20
+            st.dataframe(stages)
+            st.download_button("Download stages (JSON lines)", recorder.to_jsonl(),
+                               file_name="stages.jsonl", mime="application/json")
+        else:
+            st.caption("No instrumented stages ran (results came from the Streamlit cache).")
+        render_stats = get_render_cache().stats()
+        st.caption(f"Chart cache: {render_stats['entries']} images, {render_stats['bytes'] / 2**20:.1f} MB, "
+                   f"{render_stats['hits']} hits, {render_stats['misses']} misses")
+        stage_stats = get_stage_cache().stats()
+        st.caption(f"Feature cache: {stage_stats['entries']} frames, "
+                   f"{stage_stats['hits']} hits, {stage_stats['misses']} misses")
@@ -0,0 +1,52 @@
+"""MarketMantra: data, indicators, features, models and ROI analytics,
+usable without Streamlit."""
+from .lazy import import_report
+from .instrument import StageRecorder, set_recorder, stage, frame_stats
+from .cache import OHLCVCache, get_ohlcv_cache
+from .providers import (
+    DataProvider, YFinanceProvider, LocalProvider, SyntheticProvider,
+    normalize_ohlcv, provider_from_spec, get_provider, set_provider,
+)
+from .data import load_ohlcv, load_ohlcv_many, fetch_history
+from .indicators import (
+    indicator_arrays, compute_indicators, compute_rsi, compute_macd,
+    compute_stochastic, compute_bollinger_bands, compute_volumetric_data,
+)
+from .streaming import StreamingIndicators
+from .features import FEATURE_COLUMNS, add_features, feature_matrix, FeatureCache
+from .panel import compute_indicators_panel, add_features_panel, latest_indicators
+from .models import (
+    build_models, build_budget_models, fit_within, needs_scaling, fit_cost, score_split, parallel_cross_validate,
+    train_ensemble, update_ensemble, evaluate_walk_forward, predict_up_probability,
+)
+from .store import ModelStore, get_model_store, model_cache_key, model_lineage_key, data_digest
+from .roi import calculate_advanced_roi, analyze_portfolio
+from .montecarlo import project_growth
+from .optimizer import ledoit_wolf, efficient_frontier, optimize_returns, optimize_portfolio
+from .backtest import oof_signals, backtest_signals
+from .render import lttb, thin, render_png, RenderCache, get_render_cache
+from .tuning import TuningStore, get_tuning_store, tuned_models, tune
+from .pipeline import load_or_train, run_prediction
+from .prefetch import Prefetcher
+from .screener import screen, parse_condition, paginate, load_constituents
+
+__all__ = [
+    "import_report", "StageRecorder", "set_recorder", "stage", "frame_stats",
+    "OHLCVCache", "get_ohlcv_cache", "load_ohlcv", "load_ohlcv_many", "fetch_history",
+    "DataProvider", "YFinanceProvider", "LocalProvider", "SyntheticProvider",
+    "normalize_ohlcv", "provider_from_spec", "get_provider", "set_provider",
+    "indicator_arrays", "compute_indicators", "compute_rsi", "compute_macd",
+    "compute_stochastic", "compute_bollinger_bands", "compute_volumetric_data",
+    "StreamingIndicators", "FEATURE_COLUMNS", "add_features", "feature_matrix", "FeatureCache",
+    "compute_indicators_panel", "add_features_panel", "latest_indicators",
+    "build_models", "build_budget_models", "fit_within", "needs_scaling", "fit_cost", "score_split",
+    "parallel_cross_validate", "train_ensemble", "update_ensemble",
+    "evaluate_walk_forward", "predict_up_probability",
+    "ModelStore", "get_model_store", "model_cache_key", "model_lineage_key", "data_digest",
+    "calculate_advanced_roi", "analyze_portfolio", "project_growth",
+    "ledoit_wolf", "efficient_frontier", "optimize_returns", "optimize_portfolio",
+    "oof_signals", "backtest_signals", "lttb", "thin", "render_png", "RenderCache", "get_render_cache",
+    "TuningStore", "get_tuning_store", "tuned_models", "tune",
+    "load_or_train", "run_prediction", "Prefetcher",
+    "screen", "parse_condition", "paginate", "load_constituents",
+]
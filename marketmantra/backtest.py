@@ -0,0 +1,110 @@
+"""Trading backtests of the ensemble's walk-forward UP probabilities.
+
+A signal frame pairs each out-of-fold probability with the return of the
+bar after it, the one the prediction was about. backtest_signals turns
+probabilities into positions for a grid of thresholds - long above the
+threshold, flat (or short below 1 - threshold) otherwise - and charges
+costs and slippage on every change of position. Symbols are left-packed
+into (threshold, symbol, bar) arrays a chunk at a time, so a whole
+universe and threshold grid runs in a few vectorized passes.
+"""
+import numpy as np
+import pandas as pd
+
+from .instrument import stage
+from .roi import TRADING_DAYS
+
+DEFAULT_THRESHOLDS = tuple(round(0.50 + i / 100, 2) for i in range(20))
+METRICS = ["Total Return %", "CAGR %", "Max Drawdown %", "Hit Rate %",
+           "Turnover", "Exposure %", "Trades", "Buy & Hold %"]
+
+def oof_signals(df_ml, trained):
+    """Prob (ensemble out-of-fold UP probability) and Return (the next bar's
+    close-to-close return) for every walk-forward test row of df_ml."""
+    rows = trained["oof_index"]
+    prob = np.mean(list(trained["oof_probs"].values()), axis=0)
+    close = df_ml['Close']
+    next_return = close.shift(-1) / close - 1
+    return pd.DataFrame({"Prob": prob, "Return": next_return.iloc[rows].to_numpy()},
+                        index=df_ml.index[rows])
+
+def _pack(frames, column):
+    """(symbols, bars) array of column, left-aligned and NaN-padded."""
+    out = np.full((len(frames), max(len(f) for f in frames)), np.nan)
+    for i, f in enumerate(frames):
+        out[i, :len(f)] = f[column].to_numpy()
+    return out
+
+def _simulate(prob, ret, thresholds, cost, allow_short):
+    """Positions, trades and net returns, each (thresholds, symbols, bars)."""
+    valid = np.isfinite(prob) & np.isfinite(ret)
+    th = thresholds[:, None, None]
+    with np.errstate(invalid="ignore"):
+        pos = (prob > th).astype(float)
+        if allow_short:
+            pos -= prob < 1 - th
+    pos *= valid
+    ret = np.where(valid, ret, 0.0)
+    trades = np.abs(np.diff(pos, axis=-1, prepend=0.0)) * valid  # no exit charged in the padding
+    return pos, trades, pos * ret - trades * cost, ret, valid
+
+def backtest_signals(signals, thresholds=DEFAULT_THRESHOLDS, cost_bps=10.0, slippage_bps=5.0,
+                     allow_short=False, equity=False, chunk_size=64):
+    """Backtest every symbol's signal frame at every threshold.
+
+    signals maps symbol -> frame with Prob and Return (see oof_signals).
+    cost_bps and slippage_bps are charged per unit of position traded.
+    Returns a dict with:
+        metrics  DataFrame indexed by (Symbol, Threshold): Total Return %,
+                 CAGR %, Max Drawdown %, Hit Rate % (share of bars in the
+                 market that made money), Turnover (position traded per
+                 year), Exposure %, Trades and Buy & Hold %
+        equity   with equity=True, {symbol: DataFrame of growth of 1 per threshold}
+    """
+    thresholds = np.atleast_1d(np.asarray(thresholds, dtype=float))
+    cost = (cost_bps + slippage_bps) / 1e4
+    symbols = sorted((s for s, f in signals.items() if len(f)), key=lambda s: len(signals[s]))
+    blocks, curves = [], {}
+
+    with stage("backtest", symbols=len(symbols), thresholds=len(thresholds)):
+        for start in range(0, len(symbols), chunk_size):
+            chunk = symbols[start:start + chunk_size]
+            frames = [signals[s] for s in chunk]
+            pos, trades, net, ret, valid = _simulate(
+                _pack(frames, "Prob"), _pack(frames, "Return"), thresholds, cost, allow_short)
+
+            growth = np.cumprod(1 + net, axis=-1)
+            bars = valid.sum(axis=-1)
+            years = np.maximum(bars, 1) / TRADING_DAYS
+            in_market = pos != 0
+            with np.errstate(divide="ignore", invalid="ignore"):
+                final = growth[..., -1]
+                drawdown = (growth / np.maximum.accumulate(growth, axis=-1) - 1).min(axis=-1)
+                hit_rate = ((pos * ret > 0).sum(axis=-1) / in_market.sum(axis=-1))
+                stats = {"Total Return %": (final - 1) * 100,
+                         "CAGR %": (final ** (1 / years) - 1) * 100,
+                         "Max Drawdown %": drawdown * 100,
+                         "Hit Rate %": hit_rate * 100,
+                         "Turnover": trades.sum(axis=-1) / years,
+                         "Exposure %": in_market.sum(axis=-1) / np.maximum(bars, 1) * 100,
+                         "Trades": (trades > 0).sum(axis=-1),
+                         "Buy & Hold %": np.broadcast_to((np.prod(1 + ret, axis=-1) - 1) * 100,
+                                                         final.shape)}
+            # (thresholds, symbols) -> rows ordered symbol-major
+            index = pd.MultiIndex.from_product([chunk, thresholds], names=["Symbol", "Threshold"])
+            blocks.append(pd.DataFrame({k: v.T.ravel() for k, v in stats.items()}, index=index))
+            if equity:
+                for i, (symbol, f) in enumerate(zip(chunk, frames)):
+                    curves[symbol] = pd.DataFrame(growth[:, i, :len(f)].T, index=f.index,
+                                                  columns=pd.Index(thresholds, name="Threshold"))
+
+    if blocks:
+        # Back to the caller's symbol order; chunks were packed by length
+        metrics = pd.concat(blocks).reindex([s for s in signals if len(signals[s])], level="Symbol")
+    else:
+        metrics = pd.DataFrame(columns=METRICS, index=pd.MultiIndex.from_arrays(
+            [[], []], names=["Symbol", "Threshold"]))
+    result = {"metrics": metrics}
+    if equity:
+        result["equity"] = curves
+    return result
@@ -0,0 +1,178 @@
+"""On-disk caches shared by every session, rerun and batch job."""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+
+import pandas as pd
+
+CACHE_DIR = os.environ.get("MARKETMANTRA_CACHE_DIR",
+                           os.path.join(os.path.expanduser("~"), ".cache", "marketmantra"))
+
+def _cache_name(key):
+    """Filesystem-safe, collision-free file stem for a cache key (e.g. '^BSESN')."""
+    digest = hashlib.md5(key.encode("utf-8")).hexdigest()[:8]
+    # No dots: everything before the first '.' identifies the cache entry.
+    return f"{re.sub(r'[^A-Za-z0-9_-]', '_', key)}-{digest}"
+
+def _evict_cache_dir(directory, max_bytes, max_age):
+    """Evict cache entries (all files sharing a stem) unused for max_age seconds,
+    then the least recently used ones until the directory fits in max_bytes."""
+    entries = {}
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            st_ = os.stat(path)
+        except OSError:
+            continue
+        stem = name.split(".", 1)[0]
+        size, used, paths = entries.get(stem, (0, 0.0, []))
+        entries[stem] = (size + st_.st_size, max(used, st_.st_mtime), paths + [path])
+
+    now = time.time()
+    total = sum(size for size, _, _ in entries.values())
+    for stem, (size, used, paths) in sorted(entries.items(), key=lambda kv: kv[1][1]):
+        if now - used <= max_age and total <= max_bytes:
+            continue
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
+
+class OHLCVCache:
+    """On-disk Parquet cache of daily OHLCV bars, one file per symbol.
+
+    Each symbol keeps a single contiguous [start, end) range of bars; requests
+    outside it only download the missing head or tail and merge it in.
+    """
+
+    def __init__(self, directory=None, max_bytes=512 * 1024 ** 2, max_age_days=30, namespace="ohlcv"):
+        self.directory = os.path.join(directory or CACHE_DIR, namespace)
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._symbol_locks = {}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _paths(self, symbol):
+        stem = os.path.join(self.directory, _cache_name(symbol))
+        return stem + ".parquet", stem + ".json"
+
+    def _symbol_lock(self, symbol):
+        with self._lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    def _count(self, counter):
+        # += is not atomic; get() runs on every session thread and the prefetch pool
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _span(self, symbol):
+        try:
+            with open(self._paths(symbol)[1]) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return pd.Timestamp(meta["start"]), pd.Timestamp(meta["end"])
+
+    def missing(self, symbol, start, end):
+        """The [a, b) ranges get() would have to fetch for this request."""
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        if start >= min(end, pd.Timestamp.today().normalize()):
+            return [(start, end)]
+        span = self._span(symbol)
+        if span is None:
+            return [(start, end)]
+        ranges = []
+        if start < span[0]:
+            ranges.append((start, span[0]))
+        if end > span[1]:
+            ranges.append((span[1], end))
+        return ranges
+
+    def _load(self, symbol):
+        data_path, meta_path = self._paths(symbol)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            df = pd.read_parquet(data_path)
+        except (OSError, ValueError):
+            return None, None
+        os.utime(data_path)  # mark as recently used for LRU eviction
+        return df, (pd.Timestamp(meta["start"]), pd.Timestamp(meta["end"]))
+
+    def _store(self, symbol, df, start, end):
+        data_path, meta_path = self._paths(symbol)
+        tmp = f"{data_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        df.to_parquet(tmp)
+        os.replace(tmp, data_path)
+        with open(tmp, "w") as f:
+            json.dump({"start": start.isoformat(), "end": end.isoformat()}, f)
+        os.replace(tmp, meta_path)
+        _evict_cache_dir(self.directory, self.max_bytes, self.max_age)
+
+    def get(self, symbol, start, end, fetch):
+        """Return bars for symbol in [start, end), calling fetch(symbol, start, end)
+        only for the part of the range that is not cached yet."""
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        # Today's bar is still moving, so coverage never extends past today.
+        covered_end = min(end, pd.Timestamp.today().normalize())
+        if start >= covered_end:
+            self._count("misses")
+            return fetch(symbol, start, end)
+
+        with self._symbol_lock(symbol):
+            df, span = self._load(symbol)
+            if df is None:
+                self._count("misses")
+                df = fetch(symbol, start, end)
+                if df.empty:
+                    return df
+                self._store(symbol, df, start, covered_end)
+            else:
+                cached_start, cached_end = span
+                parts = []
+                if start < cached_start:
+                    parts.append(fetch(symbol, start, cached_start))
+                if end > cached_end:
+                    parts.append(fetch(symbol, cached_end, end))
+                if parts:
+                    self._count("partial_hits")
+                    fresh = [p for p in parts if not p.empty]
+                    if fresh:
+                        df = pd.concat([df] + fresh)
+                        df = df[~df.index.duplicated(keep="last")].sort_index()
+                    new_span = (min(start, cached_start), max(covered_end, cached_end))
+                    # Re-fetching today's open bar alone changes nothing on disk.
+                    if fresh or new_span != span:
+                        self._store(symbol, df, *new_span)
+                else:
+                    self._count("hits")
+
+        return df[(df.index >= start) & (df.index < end)]
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "partial_hits": self.partial_hits, "misses": self.misses}
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+
+_default_caches = {}
+_default_lock = threading.Lock()
+
+def get_ohlcv_cache(namespace="ohlcv"):
+    """The process-wide OHLCVCache for one data provider's bars, shared by
+    every session and rerun."""
+    with _default_lock:
+        if namespace not in _default_caches:
+            _default_caches[namespace] = OHLCVCache(namespace=namespace)
+        return _default_caches[namespace]
@@ -0,0 +1,283 @@
+"""Batch scoring, screening, backtesting and tuning from the command line.
+
+    python -m marketmantra predict RELIANCE.NS TCS.NS --start 2020-01-01 --out scores.csv
+    python -m marketmantra screen --universe Sensex -c "RSI < 30" -c "Close < Lower_BB"
+    python -m marketmantra backtest --universe Sensex --cost-bps 10 --out backtest.csv
+    python -m marketmantra tune --universe Sensex --max-age 7 --time-limit 240
+    python -m marketmantra tune HDFCBANK.NS ICICIBANK.NS AXISBANK.NS --group Banks
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import date, datetime
+from functools import partial
+
+import pandas as pd
+from joblib import Parallel, delayed
+
+from .backtest import DEFAULT_THRESHOLDS, backtest_signals
+from .data import load_ohlcv, load_ohlcv_many
+from .features import add_features
+from .pipeline import run_prediction, walk_forward_signals
+from .providers import provider_from_spec, get_provider, set_provider
+from .screener import UNIVERSES, load_constituents, screen
+from .tuning import get_tuning_store, tune
+
+def _score(symbol, start, end, n_threads, provider_spec=None, budget_s=None):
+    try:
+        if provider_spec:
+            set_provider(provider_spec)  # runs in a pool worker, not the parent
+        return run_prediction(symbol, start, end, n_workers=1, n_threads=n_threads, budget_s=budget_s)
+    except Exception as e:
+        return {"symbol": symbol, "error": f"{type(e).__name__}: {e}"}
+
+def _signals(symbol, start, end, n_threads, provider_spec=None, budget_s=None):
+    try:
+        if provider_spec:
+            set_provider(provider_spec)
+        return symbol, walk_forward_signals(symbol, start, end, n_workers=1, n_threads=n_threads,
+                                            budget_s=budget_s)
+    except Exception as e:
+        return symbol, f"{type(e).__name__}: {e}"
+
+def _read_symbols(args):
+    symbols = list(args.symbols)
+    if args.symbols_file:
+        symbols += load_constituents(args.symbols_file, suffix="")
+    return list(dict.fromkeys(s.upper() for s in symbols))
+
+def write_results(df, path):
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+def _warm(symbols, args):
+    """Warm the shared data cache with one bulk download, so pool workers
+    read from disk instead of each hitting the network for its symbol.
+    Returns False when the provider spec is invalid."""
+    try:
+        provider = provider_from_spec(args.provider) if args.provider else get_provider()
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return False
+    if provider.cache_namespace is not None:
+        try:
+            load_ohlcv_many(symbols, args.start, args.end, provider=provider)
+        except Exception as e:
+            print(f"bulk download failed, falling back to per-symbol: {e}", file=sys.stderr)
+    return True
+
+def _map_symbols(func, symbols, args):
+    """func(symbol, start, end, n_threads, provider) over a process pool;
+    each symbol trains on its share of the cores."""
+    n_workers = max(1, min(args.workers, len(symbols)))
+    n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+    return Parallel(n_jobs=n_workers, backend="loky")(
+        delayed(func)(symbol, args.start, args.end, n_threads, args.provider) for symbol in symbols)
+
+def cmd_predict(args):
+    symbols = _read_symbols(args)
+    if not symbols:
+        print("no symbols given", file=sys.stderr)
+        return 2
+    if not _warm(symbols, args):
+        return 2
+    rows = _map_symbols(partial(_score, budget_s=args.budget), symbols, args)
+
+    results = pd.DataFrame(rows)
+    write_results(results, args.out)
+    failed = results[results["error"].notna()] if "error" in results else results.iloc[:0]
+    for _, row in failed.iterrows():
+        print(f"{row['symbol']}: {row['error']}", file=sys.stderr)
+    print(f"scored {len(results) - len(failed)}/{len(results)} symbols -> {args.out}")
+    return 1 if len(failed) else 0
+
+def cmd_screen(args):
+    symbols = _read_symbols(args)
+    if args.universe:
+        symbols = list(dict.fromkeys(UNIVERSES[args.universe] + symbols))
+    if not symbols:
+        print("no symbols given", file=sys.stderr)
+        return 2
+    try:
+        provider = provider_from_spec(args.provider) if args.provider else get_provider()
+        results = screen(symbols, args.condition, match=args.match, sort_by=args.sort_by,
+                         ascending=not args.descending, provider=provider)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if args.out:
+        write_results(results.reset_index(), args.out)
+    else:
+        print(results.head(args.top).to_string())
+    if results.attrs["missing"]:
+        print(f"no data for {len(results.attrs['missing'])} symbols: "
+              f"{' '.join(results.attrs['missing'])}", file=sys.stderr)
+    print(f"{len(results)}/{len(symbols)} symbols match", file=sys.stderr)
+    return 0
+
+def cmd_backtest(args):
+    symbols = _read_symbols(args)
+    if args.universe:
+        symbols = list(dict.fromkeys(UNIVERSES[args.universe] + symbols))
+    if not symbols:
+        print("no symbols given", file=sys.stderr)
+        return 2
+    if not _warm(symbols, args):
+        return 2
+
+    signals, failed = {}, {}
+    for symbol, result in _map_symbols(partial(_signals, budget_s=args.budget), symbols, args):
+        if isinstance(result, str):
+            failed[symbol] = result
+        else:
+            signals[symbol] = result
+    metrics = backtest_signals(signals, args.thresholds, cost_bps=args.cost_bps,
+                               slippage_bps=args.slippage_bps, allow_short=args.short)["metrics"]
+
+    if args.out:
+        write_results(metrics.reset_index(), args.out)
+    # One line per threshold: the typical symbol's result
+    print(metrics.groupby(level="Threshold").median().to_string(float_format="{:.2f}".format))
+    for symbol, error in failed.items():
+        print(f"{symbol}: {error}", file=sys.stderr)
+    print(f"backtested {len(signals)}/{len(symbols)} symbols x {len(args.thresholds)} thresholds"
+          + (f" -> {args.out}" if args.out else ""), file=sys.stderr)
+    return 1 if failed else 0
+
+def _age_days(best):
+    return float("inf") if best is None else (datetime.now() - datetime.fromisoformat(best["tuned_at"])).days
+
+def cmd_tune(args):
+    symbols = _read_symbols(args)
+    if args.universe:
+        symbols = list(dict.fromkeys(UNIVERSES[args.universe] + symbols))
+    if not symbols:
+        print("no symbols given", file=sys.stderr)
+        return 2
+    store = get_tuning_store()
+    if not args.group:
+        # Stalest first, so a night that runs out of time leaves the freshest behind
+        symbols = sorted(symbols, key=lambda s: -_age_days(store.best(s)))
+        symbols = [s for s in symbols if _age_days(store.best(s)) >= args.max_age]
+    if not symbols:
+        print(f"every symbol was tuned in the last {args.max_age} days", file=sys.stderr)
+        return 0
+    if not _warm(symbols, args):
+        return 2
+    provider = provider_from_spec(args.provider) if args.provider else get_provider()
+    deadline = time.time() + args.time_limit * 60 if args.time_limit else None
+
+    frames, failed = {}, {}
+    for symbol in symbols:
+        try:
+            frames[symbol] = add_features(load_ohlcv(symbol, args.start, args.end, provider=provider))
+        except Exception as e:
+            failed[symbol] = f"{type(e).__name__}: {e}"
+            continue
+        if frames[symbol].empty:
+            failed[symbol] = "not enough data after feature engineering"
+            del frames[symbol]
+    scopes = [(args.group, frames)] if args.group else [(s, {s: f}) for s, f in frames.items()]
+
+    done = 0
+    for scope, group in scopes:
+        if not group:
+            continue
+        result = tune(group, scope=scope, n_candidates=args.candidates, factor=args.factor,
+                      n_workers=args.workers, deadline=deadline)
+        if result is None:
+            print(f"time limit reached before {scope}; rerun to resume", file=sys.stderr)
+            break
+        done += 1
+        print(f"{scope}: " + ", ".join(f"{name} {score * 100:.1f}% (default {result['default_scores'][name] * 100:.1f}%)"
+                                       for name, score in result["scores"].items())
+              + f" [{result['evaluations']} fits, {result['reused']} reused]")
+    for symbol, error in failed.items():
+        print(f"{symbol}: {error}", file=sys.stderr)
+    print(f"tuned {done}/{len(scopes)} {'groups' if args.group else 'symbols'}", file=sys.stderr)
+    return 1 if failed else 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="marketmantra", description="MarketMantra batch jobs")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("predict", help="score symbols with the prediction ensemble")
+    p.add_argument("symbols", nargs="*", help="ticker symbols, e.g. RELIANCE.NS")
+    p.add_argument("--symbols-file", help="file with one symbol per line, or a CSV with a Symbol column")
+    p.add_argument("--start", default="2020-01-01", help="first date of history (default: 2020-01-01)")
+    p.add_argument("--end", default=date.today().isoformat(), help="end date, exclusive (default: today)")
+    p.add_argument("--out", required=True, help="output file, .csv or .parquet")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                   help="symbols scored concurrently (default: CPU count)")
+    p.add_argument("--budget", type=float, metavar="SECONDS",
+                   help="train each symbol within this many seconds, with early stopping")
+    p.add_argument("--provider", default=os.environ.get("MARKETMANTRA_PROVIDER"),
+                   help="data source: yfinance, local:DIR or synthetic[:SEED] "
+                        "(default: $MARKETMANTRA_PROVIDER or yfinance)")
+    p.set_defaults(func=cmd_predict)
+
+    p = sub.add_parser("screen", help="screen a universe on its latest indicator values")
+    p.add_argument("symbols", nargs="*", help="ticker symbols, added to --universe")
+    p.add_argument("--symbols-file", help="file with one symbol per line, or a CSV with a Symbol column")
+    p.add_argument("--universe", choices=list(UNIVERSES), help="built-in index universe (more from $MARKETMANTRA_UNIVERSES_DIR)")
+    p.add_argument("--condition", "-c", action="append", required=True,
+                   help="e.g. 'RSI < 30' or 'SMA_10 crosses above SMA_50'; repeatable")
+    p.add_argument("--match", choices=["all", "any"], default="all",
+                   help="symbols must meet all conditions (default) or any of them")
+    p.add_argument("--sort-by", help="column to rank by (default: first condition's indicator)")
+    p.add_argument("--descending", action="store_true", help="rank highest first")
+    p.add_argument("--top", type=int, default=25, help="rows to print without --out (default: 25)")
+    p.add_argument("--out", help="write all matches to a .csv or .parquet file")
+    p.add_argument("--provider", default=os.environ.get("MARKETMANTRA_PROVIDER"),
+                   help="data source: yfinance, local:DIR or synthetic[:SEED]")
+    p.set_defaults(func=cmd_screen)
+
+    p = sub.add_parser("backtest", help="trade the ensemble's walk-forward signals over a threshold grid")
+    p.add_argument("symbols", nargs="*", help="ticker symbols, added to --universe")
+    p.add_argument("--symbols-file", help="file with one symbol per line, or a CSV with a Symbol column")
+    p.add_argument("--universe", choices=list(UNIVERSES), help="built-in index universe (more from $MARKETMANTRA_UNIVERSES_DIR)")
+    p.add_argument("--start", default="2020-01-01", help="first date of history (default: 2020-01-01)")
+    p.add_argument("--end", default=date.today().isoformat(), help="end date, exclusive (default: today)")
+    p.add_argument("--thresholds", type=float, nargs="+", default=list(DEFAULT_THRESHOLDS),
+                   help="UP probabilities to go long above (default: 0.50 to 0.69 by 0.01)")
+    p.add_argument("--cost-bps", type=float, default=10.0, help="cost per unit traded, in bps (default: 10)")
+    p.add_argument("--slippage-bps", type=float, default=5.0, help="slippage per unit traded, in bps (default: 5)")
+    p.add_argument("--short", action="store_true", help="go short below 1 - threshold instead of flat")
+    p.add_argument("--out", help="write every (symbol, threshold) row to a .csv or .parquet file")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                   help="symbols trained concurrently (default: CPU count)")
+    p.add_argument("--budget", type=float, metavar="SECONDS",
+                   help="train each symbol within this many seconds, with early stopping")
+    p.add_argument("--provider", default=os.environ.get("MARKETMANTRA_PROVIDER"),
+                   help="data source: yfinance, local:DIR or synthetic[:SEED]")
+    p.set_defaults(func=cmd_backtest)
+
+    p = sub.add_parser("tune", help="search the ensemble's hyperparameters by successive halving")
+    p.add_argument("symbols", nargs="*", help="ticker symbols, added to --universe")
+    p.add_argument("--symbols-file", help="file with one symbol per line, or a CSV with a Symbol column")
+    p.add_argument("--universe", choices=list(UNIVERSES), help="built-in index universe (more from $MARKETMANTRA_UNIVERSES_DIR)")
+    p.add_argument("--group", help="tune one configuration shared by all the symbols, e.g. a sector, "
+                                   "recorded under this name (default: one per symbol)")
+    p.add_argument("--start", default="2015-01-01", help="first date of history (default: 2015-01-01)")
+    p.add_argument("--end", default=date.today().isoformat(), help="end date, exclusive (default: today)")
+    p.add_argument("--candidates", type=int, default=16, help="configurations tried per model (default: 16)")
+    p.add_argument("--factor", type=int, default=3,
+                   help="keep 1/factor of the candidates per round, on factor times the rows (default: 3)")
+    p.add_argument("--max-age", type=float, default=0,
+                   help="without --group, skip symbols tuned within this many days (default: 0)")
+    p.add_argument("--time-limit", type=float, metavar="MINUTES",
+                   help="start no new round after this long; a rerun resumes from the stored evaluations")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                   help="fits run concurrently (default: CPU count)")
+    p.add_argument("--provider", default=os.environ.get("MARKETMANTRA_PROVIDER"),
+                   help="data source: yfinance, local:DIR or synthetic[:SEED]")
+    p.set_defaults(func=cmd_tune)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
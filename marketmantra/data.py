@@ -0,0 +1,54 @@
+"""Market data from the configured provider, served through the OHLCV cache."""
+from collections import defaultdict
+
+import pandas as pd
+
+from .cache import get_ohlcv_cache
+from .providers import get_provider, normalize_ohlcv
+
+def _bars(symbol, start, end, cache=None, provider=None):
+    provider = provider or get_provider()
+    if provider.cache_namespace is None:
+        return provider.fetch(symbol, start, end)
+    cache = cache or get_ohlcv_cache(provider.cache_namespace)
+    # Frames cached before providers normalized their output may carry extra columns.
+    return normalize_ohlcv(cache.get(symbol, start, end, provider.fetch))
+
+def load_ohlcv(symbol, start_date, end_date, cache=None, provider=None):
+    """Daily OHLCV bars for symbol in [start_date, end_date)."""
+    return _bars(symbol, start_date, end_date, cache, provider)
+
+def fetch_history(ticker, start_date, cache=None, provider=None):
+    """Bars from start_date through today."""
+    end = pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+    return _bars(ticker, start_date, end, cache, provider)
+
+def load_ohlcv_many(symbols, start_date, end_date, cache=None, provider=None):
+    """{symbol: bars in [start_date, end_date)} for many symbols.
+
+    Symbols missing the same range from the cache are downloaded together,
+    so a cold portfolio costs one bulk request per distinct range instead
+    of one request per symbol.
+    """
+    provider = provider or get_provider()
+    symbols = list(dict.fromkeys(symbols))
+    if provider.cache_namespace is None:
+        return provider.fetch_many(symbols, start_date, end_date)
+    cache = cache or get_ohlcv_cache(provider.cache_namespace)
+
+    wanted = defaultdict(list)
+    for symbol in symbols:
+        for span in cache.missing(symbol, start_date, end_date):
+            wanted[span].append(symbol)
+    fetched = {}
+    for (start, end), group in wanted.items():
+        for symbol, df in provider.fetch_many(group, start, end).items():
+            fetched[symbol, start, end] = df
+
+    def fetch(symbol, start, end):
+        # Another session may have moved the cached span in the meantime
+        df = fetched.get((symbol, start, end))
+        return provider.fetch(symbol, start, end) if df is None else df
+
+    return {symbol: normalize_ohlcv(cache.get(symbol, start_date, end_date, fetch))
+            for symbol in symbols}
@@ -0,0 +1,76 @@
+"""Feature engineering for the prediction models."""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .indicators import compute_indicators
+from .instrument import stage, frame_stats
+
+FEATURE_COLUMNS = [
+    'Return', 'SMA_10', 'SMA_50', 'EMA_10', 'Volatility', 'Momentum',
+    'Lag1', 'Lag2', 'Lag3',
+    'RSI', 'MACD_gap', 'BB_position', 'Stoch', 'SMA_cross'
+]
+
+def add_features(df, indicators=None):
+    """Add technical features and target for the model (ML‑ready)."""
+    with stage("add_features") as record:
+        if indicators is None:
+            indicators = compute_indicators(df)
+        df = pd.concat([df, indicators[FEATURE_COLUMNS + ['Target']]], axis=1).dropna()
+        record.update(frame_stats(df))
+    return df
+
+def feature_matrix(features):
+    """features (a frame or array, one column per feature) as one contiguous
+    column-major float32 matrix. Converting once saves every fit the
+    pandas-to-float64 conversion; sklearn's tree builders scan this dtype
+    and layout as they are, while XGBoost still builds its DMatrix,
+    histogram gradient boosting bins the values and the scaler makes its
+    own copy. Row slices of it (the walk-forward folds) are views."""
+    return np.asfortranarray(np.asarray(features, dtype=np.float32))
+
+class FeatureCache:
+    """compute_indicators() and add_features() of recently seen OHLCV
+    frames, keyed by their contents, for up to max_entries frames evicted
+    least recently used first. Thread-safe, so a background pool can warm
+    it for the app's sessions. Cached frames are shared: treat them as
+    read-only."""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # frame digest -> {kind: frame}
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _get(self, kind, df, compute):
+        h = hashlib.sha256(repr(list(df.columns)).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+        key = h.hexdigest()
+        with self._lock:
+            entry = self._entries.get(key, {})
+            if kind in entry:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[kind]
+            self.misses += 1
+        out = compute()
+        with self._lock:
+            self._entries.setdefault(key, {})[kind] = out
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return out
+
+    def indicators(self, df):
+        return self._get("indicators", df, lambda: compute_indicators(df))
+
+    def features(self, df):
+        return self._get("features", df, lambda: add_features(df, self.indicators(df)))
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
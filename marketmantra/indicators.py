@@ -0,0 +1,210 @@
+"""Vectorized indicator engine and the per-indicator helpers built on it.
+
+All primitives work along the last axis, so the same code serves a single
+series and a (symbol x date) panel.
+"""
+import numpy as np
+import pandas as pd
+
+from .instrument import stage, frame_stats
+from .lazy import lazy_import
+
+scipy_signal = lazy_import("scipy.signal")
+
+def _shift(x, n):
+    """Like Series.shift(n) along the last axis."""
+    out = np.full_like(x, np.nan)
+    if n > 0:
+        out[..., n:] = x[..., :-n]
+    elif n < 0:
+        out[..., :n] = x[..., -n:]
+    else:
+        out[...] = x
+    return out
+
+def _padded(x, window, values):
+    """Place per-window results at the window's last position, NaN before it."""
+    out = np.full(x.shape, np.nan)
+    out[..., window - 1:] = values
+    return out
+
+def _prefix_sums(x):
+    """Centred prefix sums of x (NaNs counted separately), shared by every
+    rolling mean of the same series."""
+    valid = ~np.isnan(x)
+    first = valid.argmax(axis=-1)[..., None]
+    ref = np.take_along_axis(np.where(valid, x, 0.0), first, axis=-1)
+    zero = np.zeros(x.shape[:-1] + (1,))
+    sums = np.concatenate([zero, np.cumsum(np.where(valid, x - ref, 0.0), axis=-1)], axis=-1)
+    counts = np.concatenate([zero, np.cumsum(valid, axis=-1)], axis=-1)
+    return sums, counts, ref
+
+def _rolling_mean(x, window, prefix=None):
+    """Like rolling(window).mean(): NaN until the window is full or if it holds a NaN."""
+    sums, counts, ref = _prefix_sums(x) if prefix is None else prefix
+    if x.shape[-1] < window:
+        return np.full(x.shape, np.nan)
+    total = sums[..., window:] - sums[..., :-window]
+    full = (counts[..., window:] - counts[..., :-window]) == window
+    return _padded(x, window, np.where(full, total / window + ref, np.nan))
+
+def _rolling_count(mask, window):
+    """Number of True values in each full window (exact integer prefix sums)."""
+    counts = np.concatenate([np.zeros(mask.shape[:-1] + (1,), dtype=np.int64),
+                             np.cumsum(mask, axis=-1)], axis=-1)
+    return counts[..., window:] - counts[..., :-window]
+
+def _rolling_std(x, window, mean):
+    """Like rolling(window).std() (ddof=1), given the matching rolling mean."""
+    if x.shape[-1] < window:
+        return np.full(x.shape, np.nan)
+    n = x.shape[-1] - window + 1
+    m = mean[..., window - 1:]
+    # Two-pass variance, one contiguous pass per window offset.
+    ss = np.zeros(m.shape)
+    buf = np.empty(m.shape)
+    for k in range(window):
+        np.subtract(x[..., k:k + n], m, out=buf)
+        np.multiply(buf, buf, out=buf)
+        ss += buf
+    # Constant windows are exactly zero, as in pandas.
+    moves = np.zeros(x.shape, dtype=bool)
+    moves[..., 1:] = x[..., 1:] != x[..., :-1]
+    ss[_rolling_count(moves[..., 1:], window - 1) == 0] = 0.0
+    return _padded(x, window, np.sqrt(ss / (window - 1)))
+
+def _rolling_extreme(x, window, func):
+    """Rolling min/max for func=np.minimum/np.maximum; NaN windows stay NaN."""
+    if x.shape[-1] < window:
+        return np.full(x.shape, np.nan)
+    n = x.shape[-1] - window + 1
+    acc = x[..., :n].copy()
+    for k in range(1, window):
+        func(acc, x[..., k:k + n], out=acc)
+    return _padded(x, window, acc)
+
+def _ewm_sums(x, span):
+    """Exponentially decayed sums of values and weights; both EWM flavours
+    are derived from these."""
+    decay = 1.0 - 2.0 / (span + 1)
+    valid = ~np.isnan(x)
+    num = scipy_signal.lfilter([1.0], [1.0, -decay], np.where(valid, x, 0.0), axis=-1)
+    den = scipy_signal.lfilter([1.0], [1.0, -decay], valid.astype(float), axis=-1)
+    return num, den
+
+def _ewm(x, span, adjust=True, sums=None):
+    """Like ewm(span=span, adjust=adjust).mean() for series without interior gaps."""
+    num, den = _ewm_sums(x, span) if sums is None else sums
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if adjust:
+            return np.where(den > 0, num / den, np.nan)
+        alpha = 2.0 / (span + 1)
+        valid = ~np.isnan(x)
+        first = np.take_along_axis(np.where(valid, x, 0.0), valid.argmax(axis=-1)[..., None], axis=-1)
+        return np.where(den > 0, alpha * num + (1.0 - alpha * den) * first, np.nan)
+
+def _rsi(close, window=14):
+    delta = close - _shift(close, 1)
+    with np.errstate(invalid='ignore'):
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = _rolling_mean(gain, window)
+    avg_loss = _rolling_mean(loss, window)
+    # Windows without a single gain (loss) are exactly zero, not prefix-sum noise.
+    if close.shape[-1] >= window:
+        avg_gain[..., window - 1:][_rolling_count(gain > 0, window) == 0] = 0.0
+        avg_loss[..., window - 1:][_rolling_count(loss > 0, window) == 0] = 0.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+def _stochastic(high, low, close, window=14):
+    low_min = _rolling_extreme(low, window, np.minimum)
+    high_max = _rolling_extreme(high, window, np.maximum)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * (close - low_min) / (high_max - low_min)
+
+def indicator_arrays(open_, high, low, close, volume):
+    """Compute every chart and ML indicator in one pass, sharing the close
+    prefix sums, the EWM sums and the rolling means between them."""
+    prefix = _prefix_sums(close)
+    sma_10 = _rolling_mean(close, 10, prefix)
+    sma_20 = _rolling_mean(close, 20, prefix)
+    sma_50 = _rolling_mean(close, 50, prefix)
+    std_10 = _rolling_std(close, 10, sma_10)
+    std_20 = _rolling_std(close, 20, sma_20)
+
+    ewm_10, ewm_12, ewm_26 = (_ewm_sums(close, span) for span in (10, 12, 26))
+    # Charts use the recursive (adjust=False) MACD, the model the adjusted one.
+    macd = _ewm(close, 12, False, ewm_12) - _ewm(close, 26, False, ewm_26)
+    macd_adj = _ewm(close, 12, True, ewm_12) - _ewm(close, 26, True, ewm_26)
+
+    lag1 = _shift(close, 1)
+    nxt = _shift(close, -1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = {
+            'Return': close / lag1 - 1,
+            'SMA_10': sma_10,
+            'SMA_50': sma_50,
+            'SMA_200': _rolling_mean(close, 200, prefix),
+            'EMA_10': _ewm(close, 10, True, ewm_10),
+            'Volatility': std_10,
+            'Momentum': close - _shift(close, 5),
+            'Lag1': lag1,
+            'Lag2': _shift(close, 2),
+            'Lag3': _shift(close, 3),
+            'RSI': _rsi(close, 14),
+            'MACD': macd,
+            'MACD_signal': _ewm(macd, 9, False),
+            'MACD_gap': macd_adj - _ewm(macd_adj, 9, True),
+            'Middle_BB': sma_20,
+            'Std_Dev': std_20,
+            'Upper_BB': sma_20 + 2 * std_20,
+            'Lower_BB': sma_20 - 2 * std_20,
+            'BB_position': (close - (sma_20 - 2 * std_20)) / (4 * std_20),
+            'Stoch': _stochastic(high, low, close, 14),
+            'SMA_cross': sma_10 - sma_50,
+            'Buy_Volume': np.where(close > open_, volume, 0.0),
+            'Sell_Volume': np.where(close <= open_, volume, 0.0),
+            'Target': (nxt > close).astype(int),
+        }
+    return out
+
+def compute_indicators(df):
+    """Indicator frame for an OHLCV frame, aligned on its index."""
+    with stage("indicators") as record:
+        cols = [np.asarray(df[c], dtype=float) for c in ('Open', 'High', 'Low', 'Close', 'Volume')]
+        out = pd.DataFrame(indicator_arrays(*cols), index=df.index)
+        record.update(frame_stats(out))
+    return out
+
+def _close(df):
+    return np.asarray(df['Close'], dtype=float)
+
+def compute_rsi(df, window=14):
+    return pd.Series(_rsi(_close(df), window), index=df.index)
+
+def compute_macd(df, fast=12, slow=26, signal=9):
+    close = _close(df)
+    macd_line = _ewm(close, fast, False) - _ewm(close, slow, False)
+    signal_line = _ewm(macd_line, signal, False)
+    return pd.Series(macd_line, index=df.index), pd.Series(signal_line, index=df.index)
+
+def compute_stochastic(df, window=14):
+    high, low = np.asarray(df['High'], dtype=float), np.asarray(df['Low'], dtype=float)
+    return pd.Series(_stochastic(high, low, _close(df), window), index=df.index)
+
+def compute_bollinger_bands(df, window=20):
+    close = _close(df)
+    middle = _rolling_mean(close, window)
+    std = _rolling_std(close, window, middle)
+    bands = pd.DataFrame({'Middle_BB': middle, 'Std_Dev': std,
+                          'Upper_BB': middle + 2 * std, 'Lower_BB': middle - 2 * std},
+                         index=df.index)
+    return pd.concat([df, bands], axis=1)
+
+def compute_volumetric_data(df):
+    close, open_ = _close(df), np.asarray(df['Open'], dtype=float)
+    volume = np.asarray(df['Volume'], dtype=float)
+    return pd.DataFrame({'Buy_Volume': np.where(close > open_, volume, 0.0),
+                         'Sell_Volume': np.where(close <= open_, volume, 0.0)},
+                        index=df.index)
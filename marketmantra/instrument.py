@@ -0,0 +1,149 @@
+"""Per-stage wall time, CPU time, memory and data-size instrumentation.
+
+    with stage("add_features") as record:
+        df_ml = add_features(df_raw)
+        record.update(frame_stats(df_ml))
+
+Each stage becomes one record on the current StageRecorder (see
+set_recorder) and is folded into process-wide histograms. When
+MARKETMANTRA_METRICS_DIR is set, records are appended to stages.jsonl and
+the histograms are rewritten to marketmantra.prom for the Prometheus
+node_exporter textfile collector.
+"""
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_DIR = os.environ.get("MARKETMANTRA_METRICS_DIR")
+
+# Upper bounds (seconds) of the stage duration histogram buckets.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float("inf"))
+
+def _rss_bytes():
+    """Current resident set size, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _peak_rss_bytes():
+    """Peak resident set size of the process so far."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+def frame_stats(df, prefix=""):
+    """Row, column and memory counts of a DataFrame for a stage record."""
+    return {f"{prefix}rows": int(len(df)), f"{prefix}columns": int(df.shape[1]),
+            f"{prefix}bytes": int(df.memory_usage(deep=False).sum())}
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+class StageMetrics:
+    """Process-wide duration histograms and peak memory per stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}  # stage -> [bucket counts, sum, count]
+        self.peak_rss = {}
+
+    def observe(self, record):
+        with self._lock:
+            counts, total, n = self.histograms.get(record["stage"], ([0] * len(BUCKETS), 0.0, 0))
+            for i, bound in enumerate(BUCKETS):
+                if record["wall_s"] <= bound:
+                    counts[i] += 1
+            self.histograms[record["stage"]] = (counts, total + record["wall_s"], n + 1)
+            if record.get("peak_rss_bytes"):
+                self.peak_rss[record["stage"]] = max(self.peak_rss.get(record["stage"], 0),
+                                                     record["peak_rss_bytes"])
+
+    def prometheus_text(self):
+        lines = ["# HELP marketmantra_stage_seconds Wall time of an instrumented stage.",
+                 "# TYPE marketmantra_stage_seconds histogram"]
+        with self._lock:
+            for stage_name, (counts, total, n) in sorted(self.histograms.items()):
+                label = _label(stage_name)
+                for bound, count in zip(BUCKETS, counts):
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'marketmantra_stage_seconds_bucket{{stage="{label}",le="{le}"}} {count}')
+                lines.append(f'marketmantra_stage_seconds_sum{{stage="{label}"}} {total}')
+                lines.append(f'marketmantra_stage_seconds_count{{stage="{label}"}} {n}')
+            lines += ["# HELP marketmantra_stage_peak_rss_bytes Process peak RSS seen after a stage.",
+                      "# TYPE marketmantra_stage_peak_rss_bytes gauge"]
+            for stage_name, peak in sorted(self.peak_rss.items()):
+                lines.append(f'marketmantra_stage_peak_rss_bytes{{stage="{_label(stage_name)}"}} {peak}')
+        return "\n".join(lines) + "\n"
+
+METRICS = StageMetrics()
+_export_lock = threading.Lock()
+
+def _export(record):
+    if not METRICS_DIR:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with _export_lock:
+        with open(os.path.join(METRICS_DIR, "stages.jsonl"), "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+        path = os.path.join(METRICS_DIR, "marketmantra.prom")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(METRICS.prometheus_text())
+        os.replace(tmp, path)  # the textfile collector must never see a partial file
+
+class StageRecorder:
+    """The stage records of one unit of work, e.g. one Streamlit rerun."""
+
+    def __init__(self, **labels):
+        self.labels = labels
+        self.records = []
+
+    def to_jsonl(self):
+        return "".join(json.dumps(r, default=str) + "\n" for r in self.records)
+
+_current = contextvars.ContextVar("marketmantra_recorder", default=None)
+
+def set_recorder(recorder):
+    """Make recorder receive the stages run from now on in this thread/context."""
+    _current.set(recorder)
+    return recorder
+
+def current_recorder():
+    return _current.get()
+
+@contextmanager
+def stage(name, **labels):
+    """Time the enclosed block. Yields the record so the block can add
+    fields such as frame_stats() of its output."""
+    recorder = _current.get()
+    record = {"stage": name, "time": time.time(), **(recorder.labels if recorder else {}), **labels}
+    rss_before = _rss_bytes()
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["wall_s"] = time.perf_counter() - wall
+        # CPU time of this thread only; work done in pool processes is not included.
+        record["cpu_s"] = time.thread_time() - cpu
+        rss_after = _rss_bytes()
+        if rss_before is not None and rss_after is not None:
+            record["rss_delta_bytes"] = rss_after - rss_before
+        record["peak_rss_bytes"] = _peak_rss_bytes()
+        if recorder is not None:
+            recorder.records.append(record)
+        METRICS.observe(record)
+        _export(record)
@@ -0,0 +1,48 @@
+"""Deferred imports for the heavy parts of the stack.
+
+A module wrapped with lazy_import() is only imported when one of its
+attributes is first used, and the time that first import took is recorded
+for import_report().
+"""
+import sys
+import time
+import threading
+import importlib
+
+IMPORT_TIMES = {}  # module name -> seconds spent on its first import
+_lock = threading.RLock()
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    already_loaded = self._name in sys.modules
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    if not already_loaded:
+                        IMPORT_TIMES[self._name] = time.perf_counter() - start
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+def lazy_import(name):
+    return LazyModule(name)
+
+def import_report():
+    """(module, seconds) for every lazy module imported so far, slowest first.
+    Times are inclusive, so a module imported after a shared dependency
+    looks cheaper than it would on its own."""
+    return sorted(IMPORT_TIMES.items(), key=lambda kv: kv[1], reverse=True)
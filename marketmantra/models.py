@@ -0,0 +1,425 @@
+"""The prediction ensemble: definition, walk-forward evaluation and training.
+
+Training normally fits fixed-size models, so its cost grows with the
+history. With a budget, train_ensemble() uses build_budget_models() instead
+and fits each model under a share of the wall-clock budget: the boosters
+stop when the loss on the newest tenth of their training rows stops
+improving, and the forest grows until its probabilities settle.
+
+When new bars arrive, update_ensemble() brings a trained ensemble up to
+date on a window of the newest rows instead of retraining it, until
+REFIT_EVERY updates call for a full refit.
+"""
+import os
+import copy
+import time
+from datetime import datetime
+
+import numpy as np
+from joblib import Parallel, delayed, parallel_config
+
+from .features import feature_matrix
+from .instrument import stage
+from .lazy import lazy_import
+
+# The ML stack takes seconds to import; load it when a model is first used.
+xgb = lazy_import("xgboost")
+base = lazy_import("sklearn.base")
+ensemble = lazy_import("sklearn.ensemble")
+metrics = lazy_import("sklearn.metrics")
+model_selection = lazy_import("sklearn.model_selection")
+preprocessing = lazy_import("sklearn.preprocessing")
+tree = lazy_import("sklearn.tree")
+class_weight = lazy_import("sklearn.utils.class_weight")
+
+def build_models():
+    """The prediction ensemble, unfitted."""
+    # Models with improved hyperparameters & class balancing
+    return {
+        "Random Forest": ensemble.RandomForestClassifier(
+            n_estimators=500,            # more trees = more stable
+            max_depth=6,                # shallower = less overfit
+            min_samples_leaf=20,        # prevents memorising
+            max_features='sqrt',
+            class_weight='balanced',
+            random_state=50,
+            n_jobs=-1),
+        "Gradient Boosting": ensemble.GradientBoostingClassifier(
+            n_estimators=200,
+            learning_rate=0.05,
+            max_depth=5,
+            random_state=50),
+        "XGBoost": xgb.XGBClassifier(
+            n_estimators=300,
+            max_depth=4,
+            learning_rate=0.03,
+            subsample=0.8,
+            colsample_bytree=0.8,
+            min_child_weight=10,
+            eval_metric='logloss',
+            random_state=50),
+        "Decision Tree": tree.DecisionTreeClassifier(
+            max_depth=6,
+            class_weight='balanced',
+            random_state=50)
+    }
+
+# Budgeted training: rows held out (the newest) for early stopping, and the
+# forest's growth step, size cap and probability tolerance.
+VALIDATION_FRACTION = 0.1
+FOREST_STEP, FOREST_MAX = 50, 1000
+FOREST_TOL = 0.01
+
+def build_budget_models():
+    """The ensemble for budgeted training, unfitted: the same members with
+    open-ended sizes that fit_within() cuts short."""
+    return {
+        "Random Forest": ensemble.RandomForestClassifier(
+            n_estimators=FOREST_MAX,
+            max_depth=6,
+            min_samples_leaf=20,
+            max_features='sqrt',
+            class_weight='balanced',
+            random_state=50,
+            n_jobs=-1),
+        "Gradient Boosting": ensemble.HistGradientBoostingClassifier(
+            max_iter=1000,
+            learning_rate=0.05,
+            max_depth=5,
+            early_stopping=True,
+            n_iter_no_change=20,
+            random_state=50),
+        "XGBoost": xgb.XGBClassifier(
+            n_estimators=1000,
+            max_depth=4,
+            learning_rate=0.03,
+            subsample=0.8,
+            colsample_bytree=0.8,
+            min_child_weight=10,
+            early_stopping_rounds=30,
+            eval_metric='logloss',
+            random_state=50),
+        "Decision Tree": tree.DecisionTreeClassifier(
+            max_depth=6,
+            class_weight='balanced',
+            random_state=50)
+    }
+
+def _deadline(at):
+    """XGBoost callback that stops training once time.perf_counter() passes at."""
+    class Deadline(xgb.callback.TrainingCallback):
+        hit = False
+
+        def after_iteration(self, model, epoch, evals_log):
+            self.hit = time.perf_counter() > at
+            return self.hit
+    return Deadline()
+
+def fit_within(model, X, y, time_limit):
+    """Fit model in place, stopping once time_limit seconds are spent.
+
+    HistGradientBoosting grows in warm-started steps and XGBoost checks a
+    deadline every round; both early-stop on the newest VALIDATION_FRACTION
+    of the rows, which they do not train on. A RandomForest grows
+    FOREST_STEP trees at a time until no probability on those rows moves
+    by more than FOREST_TOL. Other models are fitted as usual. Returns what
+    was trained: {"estimators", "stopped", "seconds"}, stopped being one of
+    'early stopping', 'converged', 'budget', 'limit' or 'fitted'.
+    """
+    start = time.perf_counter()
+    deadline = start + time_limit
+    n_val = max(1, int(len(y) * VALIDATION_FRACTION))
+    X_fit, y_fit, X_val, y_val = X[:-n_val], y[:-n_val], X[-n_val:], y[-n_val:]
+
+    if isinstance(model, ensemble.HistGradientBoostingClassifier):
+        limit, step = model.max_iter, 25
+        model.set_params(warm_start=True, max_iter=min(step, limit))
+        while True:
+            model.fit(X_fit, y_fit, X_val=X_val, y_val=y_val)
+            if model.n_iter_ < model.max_iter:
+                stopped = "early stopping"
+            elif model.max_iter >= limit:
+                stopped = "limit"
+            elif time.perf_counter() > deadline:
+                stopped = "budget"
+            else:
+                model.set_params(max_iter=min(model.max_iter + step, limit))
+                continue
+            break
+        estimators = model.n_iter_
+    elif isinstance(model, xgb.XGBModel):
+        callback = _deadline(deadline)
+        model.set_params(callbacks=[callback])
+        try:
+            model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+        finally:
+            model.set_params(callbacks=None)  # the deadline is this fit's alone
+        rounds = model.get_booster().num_boosted_rounds()
+        stopped = ("budget" if callback.hit else
+                   "limit" if rounds >= model.n_estimators else "early stopping")
+        estimators = model.best_iteration + 1
+    elif isinstance(model, ensemble.RandomForestClassifier):
+        limit, previous = model.n_estimators, None
+        if model.class_weight == "balanced":  # every step sees the same rows, so fix the weights once
+            classes = np.unique(y)
+            model.set_params(class_weight=dict(zip(classes, class_weight.compute_class_weight(
+                "balanced", classes=classes, y=y))))
+        model.set_params(warm_start=True, n_estimators=min(FOREST_STEP, limit))
+        while True:
+            model.fit(X, y)
+            proba = model.predict_proba(X_val)[:, -1]
+            if previous is not None and np.abs(proba - previous).max() <= FOREST_TOL:
+                stopped = "converged"
+            elif model.n_estimators >= limit:
+                stopped = "limit"
+            elif time.perf_counter() > deadline:
+                stopped = "budget"
+            else:
+                previous = proba
+                model.set_params(n_estimators=min(model.n_estimators + FOREST_STEP, limit))
+                continue
+            break
+        estimators = len(model.estimators_)
+    else:
+        model.fit(X, y)
+        stopped, estimators = "fitted", len(getattr(model, "estimators_", [model]))
+    return {"estimators": estimators, "stopped": stopped, "seconds": time.perf_counter() - start}
+
+def needs_scaling(model):
+    """Whether model depends on feature scale. Trees split on per-feature
+    thresholds, so standardizing their inputs changes nothing but the cost."""
+    trees = (tree.BaseDecisionTree, ensemble.RandomForestClassifier, ensemble.ExtraTreesClassifier,
+             ensemble.GradientBoostingClassifier, ensemble.HistGradientBoostingClassifier, xgb.XGBModel)
+    return not isinstance(model, trees)
+
+def fit_cost(model, n_rows):
+    """Rough relative cost of fitting model on n_rows, for starting the
+    slowest jobs of a pool first."""
+    return getattr(model, 'n_estimators', 1) * n_rows
+
+def score_split(model, X, y, train, test, n_threads=1, time_limit=None):
+    """Fit a clone of model on rows train of X and y and score it on rows
+    test: the unit of work of cross-validation and tuning. train and test
+    are row slices (views of X) or index arrays. Scale-sensitive models are
+    standardized on the training rows; with a time_limit the fit goes
+    through fit_within(). Returns (accuracy, UP probabilities of the test
+    rows, fit_within's report without its timing, or {})."""
+    model = base.clone(model)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=n_threads)
+    X_tr, X_te, y_tr, y_te = X[train], X[test], y[train], y[test]
+    if needs_scaling(model):
+        scaler = preprocessing.StandardScaler()
+        X_tr = scaler.fit_transform(X_tr)
+        X_te = scaler.transform(X_te)
+    fit = {}
+    if time_limit is None:
+        model.fit(X_tr, y_tr)
+    else:
+        fit = fit_within(model, X_tr, y_tr, time_limit)
+        del fit["seconds"]
+    proba = model.predict_proba(X_te)[:, 1]
+    score = metrics.accuracy_score(y_te, model.classes_[(proba > 0.5).astype(int)])
+    return score, proba, fit
+
+def _fit_fold(fold, name, model, X, y, train, test, n_threads, time_limit=None):
+    """One (fold, model) cross-validation job (see score_split); runs in a
+    worker process, where X is the shared feature matrix."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    score, proba, fit = score_split(model, X, y, train, test, n_threads, time_limit)
+    return fold, name, score, proba, {"fold": fold, "model": name, "threads": n_threads,
+                               "wall_s": time.perf_counter() - wall,
+                               "cpu_s": time.process_time() - cpu, **fit}
+
+def parallel_cross_validate(models, features, target, n_splits=5, n_workers=None, n_threads=None,
+                            budget_s=None):
+    """TimeSeriesSplit scores for every model, with the (fold, model) fits
+    spread over a process pool.
+
+    Each worker gets cpu_count // n_workers threads (or n_threads) for the
+    models' own parallelism and BLAS/OpenMP, so the pool never
+    oversubscribes the cores. With budget_s, the pool's rounds of jobs
+    split those seconds and each fit stops at its share (see fit_within).
+    Returns (cv_scores, oof, timings): cv_scores in fold order and
+    oof = (row positions, {model: out-of-fold UP probabilities}) covering
+    every test fold in time order.
+    """
+    X, y = feature_matrix(features), np.asarray(target)
+    # TimeSeriesSplit folds are contiguous, so they can be slices (views) of X
+    # rather than fancy-indexed copies; the pool ships X to the workers once.
+    folds = [(slice(train[0], train[-1] + 1), slice(test[0], test[-1] + 1))
+             for train, test in model_selection.TimeSeriesSplit(n_splits=n_splits).split(X)]
+    jobs = [(fold, name, model) for fold in range(len(folds)) for name, model in models.items()]
+    jobs.sort(key=lambda job: fit_cost(job[2], folds[job[0]][0].stop), reverse=True)
+
+    n_cpu = os.cpu_count() or 1
+    n_workers = min(len(jobs), n_cpu) if n_workers is None else n_workers
+    n_threads = max(1, n_cpu // n_workers) if n_threads is None else n_threads
+    time_limit = None if budget_s is None else budget_s / -(-len(jobs) // n_workers)
+    with parallel_config(backend='loky', inner_max_num_threads=n_threads):
+        results = Parallel(n_jobs=n_workers)(
+            delayed(_fit_fold)(fold, name, model, X, y, folds[fold][0], folds[fold][1], n_threads,
+                               time_limit)
+            for fold, name, model in jobs)
+
+    cv_scores = {name: [None] * len(folds) for name in models}
+    fold_probs = {name: [None] * len(folds) for name in models}
+    timings = []
+    for fold, name, score, proba, timing in results:
+        cv_scores[name][fold] = score
+        fold_probs[name][fold] = proba
+        timings.append(timing)
+    oof_index = np.concatenate([np.arange(test.start, test.stop) for _, test in folds])
+    oof_probs = {name: np.concatenate(probs) for name, probs in fold_probs.items()}
+    return cv_scores, (oof_index, oof_probs), sorted(timings, key=lambda t: (t["fold"], t["model"]))
+
+def train_ensemble(models, features, target, n_workers=None, n_threads=None, budget_s=None):
+    """Walk-forward evaluation of the ensemble, then one fit on all the data.
+
+    The out-of-fold probabilities from the TimeSeriesSplit pass serve as the
+    held-out evaluation, so every model is fitted n_splits + 1 times in
+    total. With budget_s, training aims to finish within that many seconds:
+    cross-validation gets the share its rounds of fits are of all the
+    rounds, and each final fit an even share of what is left. Returns
+    everything the Predictions tab needs, in a form the model store can
+    persist; fit_report says what each final model grew to.
+    """
+    start = time.perf_counter()
+    if budget_s is not None:
+        n_jobs = 5 * len(models)
+        n_rounds = -(-n_jobs // min(n_jobs, n_workers or os.cpu_count() or 1))
+        cv_budget = budget_s * n_rounds / (n_rounds + len(models))
+    with stage("cross_validation", rows=len(features)):
+        cv_scores, (oof_index, oof_probs), cv_timings = parallel_cross_validate(
+            models, features, target, n_splits=5, n_workers=n_workers, n_threads=n_threads,
+            budget_s=None if budget_s is None else cv_budget)
+
+    # Final fit on all data, used only for the next-day prediction
+    fit_report = {}
+    with stage("final_fit", rows=len(features)):
+        X, y = feature_matrix(features), np.asarray(target)
+        scaler = X_scaled = None
+        if any(needs_scaling(model) for model in models.values()):
+            scaler = preprocessing.StandardScaler()
+            X_scaled = scaler.fit_transform(X)
+        # Cheapest first, so time the others leave over goes to the open-ended ones
+        order = sorted(models, key=lambda name: fit_cost(models[name], len(y)))
+        for i, name in enumerate(order):
+            model = models[name]
+            X_fit = X_scaled if needs_scaling(model) else X
+            if budget_s is None:
+                model.fit(X_fit, y)
+            else:
+                left = budget_s - (time.perf_counter() - start)
+                fit_report[name] = fit_within(model, X_fit, y, max(left, 0) / (len(models) - i))
+        fit_report = {name: fit_report[name] for name in models if name in fit_report}
+
+    return {"models": models, "scaler": scaler,
+            "cv_scores": cv_scores, "cv_timings": cv_timings,
+            "oof_index": oof_index, "oof_probs": oof_probs,
+            "budget_s": budget_s, "fit_report": fit_report,
+            "train_s": time.perf_counter() - start,
+            "rows": len(features), "updates": 0, "update_report": {}, "update_s": None,
+            "trained_at": datetime.now().isoformat(timespec="seconds")}
+
+# Incremental updates: each one fits on the newest UPDATE_WINDOW rows and
+# grows the boosters, or renews the forest, by UPDATE_FRACTION of their
+# size; after REFIT_EVERY of them the forest is all new trees and the
+# ensemble is due a full refit.
+UPDATE_WINDOW = 250
+UPDATE_FRACTION = 0.05
+REFIT_EVERY = 20
+
+def update_model(model, X, y, n_old, window=UPDATE_WINDOW):
+    """Update model, fitted on the first n_old rows of X, with the rest.
+    Returns the updated model (model itself unless it was refitted) and
+    what was done, for display."""
+    X_win, y_win = X[-window:], y[-window:]
+    if len(np.unique(y_win)) < 2:
+        return model, "unchanged (one class in the window)"
+    if isinstance(model, xgb.XGBModel):
+        booster = model.get_booster()
+        if getattr(model, "best_iteration", None) is not None:
+            booster = booster[:model.best_iteration + 1]  # drop the rounds early stopping rejected
+        size, stopping = model.n_estimators, model.early_stopping_rounds
+        rounds = max(1, round(booster.num_boosted_rounds() * UPDATE_FRACTION))
+        model.set_params(n_estimators=rounds, early_stopping_rounds=None)
+        try:
+            model.fit(X_win, y_win, xgb_model=booster, verbose=False)
+        finally:
+            model.set_params(n_estimators=size, early_stopping_rounds=stopping)
+        return model, f"+{rounds} rounds"
+    if isinstance(model, ensemble.GradientBoostingClassifier):
+        size, warm_start = model.n_estimators, model.warm_start
+        stages = max(1, round(size * UPDATE_FRACTION))
+        model.set_params(warm_start=True, n_estimators=model.n_estimators_ + stages)
+        try:
+            model.fit(X_win, y_win)
+        finally:
+            # Keep the configured size, so clones and refits build the model as designed
+            model.set_params(n_estimators=size, warm_start=warm_start)
+        return model, f"+{stages} stages"
+    if isinstance(model, ensemble.RandomForestClassifier):
+        trees = max(1, round(len(model.estimators_) * UPDATE_FRACTION))
+        fresh = base.clone(model).set_params(n_estimators=trees, warm_start=False,
+                                             random_state=(model.random_state or 0) + len(y))
+        fresh.fit(X_win, y_win)
+        model.estimators_ = model.estimators_[trees:] + fresh.estimators_
+        return model, f"{trees} oldest trees replaced"
+    # HistGradientBoosting re-bins the data when warm started, under trees
+    # grown on the old bins, so it is refitted like the cheap models
+    return base.clone(model).fit(X, y), "refit"
+
+def update_ensemble(trained, features, target, window=UPDATE_WINDOW):
+    """trained (from train_ensemble or an earlier update, on the first
+    trained['rows'] rows of features) brought up to date with the rows
+    after them, without touching the stored copy.
+
+    The models have not seen the new rows, so their probabilities there are
+    out of sample and extend the walk-forward predictions; the
+    cross-validation scores stay those of the last full fit.
+    """
+    with stage("update_ensemble", rows=len(features), new_rows=len(features) - trained["rows"]):
+        start = time.perf_counter()
+        trained = copy.deepcopy(trained)
+        X, y = feature_matrix(features), np.asarray(target)
+        n_old, scaler = trained["rows"], trained["scaler"]
+        report = {}
+        for name, model in trained["models"].items():
+            X_model = scaler.transform(X) if needs_scaling(model) else X
+            proba = model.predict_proba(X_model[n_old:])[:, 1]
+            trained["oof_probs"][name] = np.concatenate([trained["oof_probs"][name], proba])
+            trained["models"][name], report[name] = update_model(model, X_model, y, n_old, window)
+        trained["oof_index"] = np.concatenate([trained["oof_index"], np.arange(n_old, len(y))])
+
+    trained.update({"rows": len(y), "updates": trained["updates"] + 1,
+                    "update_report": report, "new_rows": len(y) - n_old,
+                    "update_s": time.perf_counter() - start,
+                    "trained_at": datetime.now().isoformat(timespec="seconds")})
+    return trained
+
+def evaluate_walk_forward(trained, target):
+    """Ensemble and per-model metrics on the out-of-fold predictions."""
+    y_true = target.iloc[trained["oof_index"]]
+    oof_probs = trained["oof_probs"]
+
+    # Ensemble via average probability
+    model_accuracies = {name: metrics.accuracy_score(y_true, (p > 0.5).astype(int)) * 100
+                        for name, p in oof_probs.items()}
+    avg_prob = np.mean(list(oof_probs.values()), axis=0)
+    predictions = (avg_prob > 0.5).astype(int)
+
+    baseline = y_true.mean() * 100  # how often stock goes up
+    baseline = max(baseline, 100 - baseline)  # flip if it mostly goes down
+
+    return {"y_true": y_true, "avg_prob": avg_prob, "predictions": predictions,
+            "ensemble_accuracy": metrics.accuracy_score(y_true, predictions) * 100,
+            "model_accuracies": model_accuracies, "baseline": baseline,
+            "confusion_matrix": metrics.confusion_matrix(y_true, predictions, labels=[0, 1])}
+
+def predict_up_probability(trained, features):
+    """Ensemble probability that the bar after the last row closes higher."""
+    latest = feature_matrix(np.asarray(features)[-1:])
+    scaler = trained["scaler"]
+    return float(np.mean([m.predict_proba(scaler.transform(latest) if needs_scaling(m) else latest)[0][1]
+                          for m in trained["models"].values()]))
@@ -0,0 +1,110 @@
+"""Forward Monte Carlo projection of an investment from its daily returns.
+
+Paths are simulated in log space, one draw per checkpoint, in chunks of
+chunk_size paths, and only reduced statistics are kept: a fixed-bin histogram of log growth at each
+checkpoint (for the percentile bands), plus exact loss counts and sums of
+the final values. Memory depends on chunk_size and the number of
+checkpoints, never on n_paths.
+"""
+import numpy as np
+import pandas as pd
+
+from .instrument import stage
+from .roi import TRADING_DAYS
+
+PERCENTILES = (5, 25, 50, 75, 95)
+# Histogram range, in standard deviations of log growth around its mean
+_SPREAD = 10.0
+
+def _quantiles(counts, edges, qs):
+    """Percentiles (0-100) from per-row histograms, interpolating within a bin."""
+    cum = np.cumsum(counts, axis=1)
+    total = cum[:, -1:]
+    out = np.empty((counts.shape[0], len(qs)))
+    rows = np.arange(counts.shape[0])
+    for j, q in enumerate(qs):
+        target = q / 100 * total[:, 0]
+        b = np.minimum((cum < target[:, None]).sum(axis=1), counts.shape[1] - 1)
+        below = np.where(b > 0, cum[rows, np.maximum(b - 1, 0)], 0)
+        frac = np.clip((target - below) / np.maximum(counts[rows, b], 1), 0, 1)
+        out[:, j] = edges[rows, b] + frac * (edges[rows, b + 1] - edges[rows, b])
+    return out
+
+def project_growth(daily_returns, investment, years=10, n_paths=100_000, method="bootstrap",
+                   checkpoints_per_year=12, chunk_size=2_000, bins=4_096, seed=None):
+    """Simulate n_paths values of investment over years of trading days.
+
+    method='bootstrap' is a circular block bootstrap: each checkpoint's
+    days are one run of consecutive historical returns, starting at a random
+    day and wrapping around the end, so every day is drawn equally often
+    and the history's volatility clustering is kept. 'parametric' draws
+    normal log returns with their mean and volatility (a geometric Brownian
+    motion), summed over the checkpoint since a sum of normals is normal.
+    Returns a dict with:
+        bands          DataFrame of value percentiles (P5..P95) per checkpoint, index in years
+        final          {percentile: final value}
+        prob_loss      % of paths that end below the investment
+        expected_cagr  % CAGR of the mean final value
+        median_cagr    % CAGR of the median final value
+        mean_final     mean final value
+    """
+    r = np.asarray(daily_returns, dtype=float)
+    r = r[np.isfinite(r) & (r > -1)]
+    if len(r) < 2:
+        raise ValueError("need at least two daily returns to project from")
+    if method not in ("bootstrap", "parametric"):
+        raise ValueError(f"method must be 'bootstrap' or 'parametric', not {method!r}")
+
+    log_r = np.log1p(r)
+    mu, sigma = log_r.mean(), log_r.std(ddof=1)
+    n_ck = max(1, int(round(years * checkpoints_per_year)))
+    step = max(1, int(round(years * TRADING_DAYS / n_ck)))
+    steps = step * np.arange(1, n_ck + 1)
+
+    # Per-checkpoint histogram edges, wide enough for any plausible path
+    spread = _SPREAD * max(sigma, 1e-6) * np.sqrt(steps)
+    lo, hi = steps * mu - spread, steps * mu + spread
+    edges = lo[:, None] + (hi - lo)[:, None] * np.linspace(0, 1, bins + 1)[None, :]
+    counts = np.zeros(n_ck * bins, dtype=np.int64)
+    offsets = (np.arange(n_ck) * bins)[None, :]
+
+    rng = np.random.default_rng(seed)
+    if method == "bootstrap":
+        # The sum of the step-day run starting at each day, from one cumsum;
+        # a checkpoint then costs one draw instead of step
+        wrapped = np.resize(log_r, len(log_r) + step - 1)
+        cum = np.concatenate([[0.0], np.cumsum(wrapped)])
+        block_sums = cum[step:step + len(log_r)] - cum[:len(log_r)]
+    losses, final_sum = 0, 0.0
+    with stage("monte_carlo", paths=n_paths, days=int(steps[-1]), method=method):
+        for start in range(0, n_paths, chunk_size):
+            m = min(chunk_size, n_paths - start)
+            if method == "bootstrap":
+                blocks = block_sums[rng.integers(0, len(block_sums), size=(m, n_ck))]
+            else:
+                blocks = rng.normal(step * mu, sigma * np.sqrt(step), size=(m, n_ck))
+            growth = np.cumsum(blocks, axis=1)
+
+            pos = ((growth - lo) / (hi - lo) * bins).astype(np.int64)
+            np.clip(pos, 0, bins - 1, out=pos)
+            counts += np.bincount((pos + offsets).ravel(), minlength=n_ck * bins)
+            losses += int((growth[:, -1] < 0).sum())
+            final_sum += float(np.exp(growth[:, -1]).sum())
+
+    counts = counts.reshape(n_ck, bins)
+    log_q = _quantiles(counts, edges, PERCENTILES)
+    bands = pd.DataFrame(investment * np.exp(log_q), columns=[f"P{q}" for q in PERCENTILES],
+                         index=pd.Index(steps / TRADING_DAYS, name="Years"))
+    start_row = pd.DataFrame([[float(investment)] * len(PERCENTILES)], columns=bands.columns,
+                             index=pd.Index([0.0], name="Years"))
+    bands = pd.concat([start_row, bands])
+
+    horizon = steps[-1] / TRADING_DAYS
+    mean_final = investment * final_sum / n_paths
+    median_final = bands["P50"].iloc[-1]
+    return {"bands": bands,
+            "final": {q: float(bands[f"P{q}"].iloc[-1]) for q in PERCENTILES},
+            "prob_loss": losses / n_paths * 100,
+            "expected_cagr": ((mean_final / investment) ** (1 / horizon) - 1) * 100,
+            "median_cagr": ((median_final / investment) ** (1 / horizon) - 1) * 100,
+            "mean_final": mean_final}
@@ -0,0 +1,172 @@
+"""Long-only mean-variance optimization over a set of holdings.
+
+Expected returns and the covariance are annualized from daily returns with
+the same 252 trading days and 6% risk-free rate as the ROI analytics; the
+covariance is shrunk towards a scaled identity (Ledoit-Wolf) so it stays
+well conditioned with many holdings and little history. Every frontier
+point maximizes mu'w - gamma/2 w'Sw over the simplex for one risk aversion
+gamma; all points are solved together by accelerated projected gradient,
+warm-started from the minimum-volatility portfolio.
+"""
+import numpy as np
+import pandas as pd
+
+from .data import load_ohlcv_many
+from .instrument import stage
+from .roi import RISK_FREE_RATE, TRADING_DAYS
+
+def ledoit_wolf(returns):
+    """(shrunk covariance, shrinkage) of a (samples, assets) array, shrinking
+    towards the average variance times the identity."""
+    x = np.asarray(returns, dtype=float)
+    x = x - x.mean(axis=0)
+    t, n = x.shape
+    sample = x.T @ x / t
+    target = np.trace(sample) / n
+    x2 = x ** 2
+    beta = ((x2.T @ x2) / t - sample ** 2).sum() / (n * t)
+    delta = ((sample - target * np.eye(n)) ** 2).sum() / n
+    shrinkage = 0.0 if delta == 0 else min(beta, delta) / delta
+    cov = (1 - shrinkage) * sample
+    cov.flat[::n + 1] += shrinkage * target
+    return cov, shrinkage
+
+def _project_simplex(v):
+    """Euclidean projection of each row of v onto {w >= 0, sum(w) = 1}."""
+    u = -np.sort(-v, axis=1)
+    css = np.cumsum(u, axis=1) - 1
+    k = np.arange(1, v.shape[1] + 1)
+    rho = (u - css / k > 0).sum(axis=1)
+    theta = css[np.arange(len(v)), rho - 1] / rho
+    return np.maximum(v - theta[:, None], 0)
+
+def _solve(mu, cov, gammas, start, lam_max, tol=1e-10, max_iter=20_000):
+    """Rows of weights maximizing mu'w - gamma/2 w'Sw on the simplex, one per
+    gamma, by FISTA with per-row adaptive restarts from the start weights;
+    lam_max is the largest eigenvalue of cov."""
+    gammas = np.asarray(gammas, dtype=float)[:, None]
+    lipschitz = gammas * lam_max + 1e-12
+    w = np.broadcast_to(start, (len(gammas), len(mu))).copy()
+    y, t = w.copy(), np.ones((len(gammas), 1))
+    for _ in range(max_iter):
+        grad = gammas * (y @ cov) - mu
+        w_next = _project_simplex(y - grad / lipschitz)
+        step = w_next - w
+        if np.abs(step).max() < tol:
+            return w_next
+        # Restart momentum on rows where it stopped helping
+        restart = ((y - w_next) * step).sum(axis=1, keepdims=True) > 0
+        t_next = np.where(restart, 1.0, (1 + np.sqrt(1 + 4 * t ** 2)) / 2)
+        y = w_next + np.where(restart, 0.0, (t - 1) / t_next) * step
+        w, t = w_next, t_next
+    return w
+
+def _stats(weights, mu, cov):
+    ret = weights @ mu
+    vol = np.sqrt(np.einsum("ij,jk,ik->i", weights, cov, weights))
+    return ret, vol, (ret - RISK_FREE_RATE) / vol
+
+def efficient_frontier(mu, cov, n_points=50, warm_start=None):
+    """(gammas, weights) of the long-only frontier from the minimum-volatility
+    portfolio (first row) to the highest-return one (last row), with points
+    roughly evenly spaced in return.
+
+    A coarse sweep over a wide range of risk aversions locates the frontier;
+    the final points interpolate log(gamma) at evenly spaced returns (so
+    they land near those returns, not on them; the top ones may coincide
+    at the highest-return corner) and are
+    warm-started from the nearest coarse solution. warm_start, weights from
+    an earlier call (e.g. before prices moved), seeds the coarse sweep
+    instead of the minimum-volatility portfolio.
+    """
+    mu, cov = np.asarray(mu, dtype=float), np.asarray(cov, dtype=float)
+    n = len(mu)
+    lam_max = np.linalg.eigvalsh(cov)[-1]
+    min_vol = _solve(np.zeros(n), cov, [1.0], np.full(n, 1 / n), lam_max)[0]
+    # Scale risk aversion by the return the frontier can gain per unit of variance
+    spread = max(mu.max() - min_vol @ mu, 1e-12)
+    var_gap = max(cov.diagonal()[mu.argmax()] - min_vol @ cov @ min_vol, 1e-12)
+    coarse = np.geomspace(1e4, 1e-4, 33) * 2 * spread / var_gap
+    coarse_w = _solve(mu, cov, coarse, min_vol if warm_start is None else warm_start, lam_max)
+    coarse_r = np.maximum.accumulate(coarse_w @ mu)
+
+    targets = np.linspace(min_vol @ mu, coarse_r[-1], n_points)[1:]
+    gammas = np.exp(np.interp(targets, coarse_r, np.log(coarse)))
+    nearest = np.abs(np.log(coarse)[None, :] - np.log(gammas)[:, None]).argmin(axis=1)
+    weights = np.vstack([min_vol, _solve(mu, cov, gammas, coarse_w[nearest], lam_max)])
+    return np.concatenate([[np.inf], gammas]), weights
+
+def _max_sharpe(mu, cov, gammas, weights, iterations=30):
+    """Weights of the frontier's maximum Sharpe portfolio, refining the best
+    grid point by golden-section search over log(gamma) between its
+    neighbours, each solve warm-started from the current best."""
+    sharpe = _stats(weights, mu, cov)[2]
+    i = int(np.nanargmax(sharpe))
+    if len(gammas) < 3 or i == 0:
+        return weights[i]
+    lo = np.log(gammas[max(i - 1, 1)])
+    hi = np.log(gammas[min(i + 1, len(gammas) - 1)])
+    best, best_sharpe = weights[i], sharpe[i]
+    lam_max = np.linalg.eigvalsh(cov)[-1]
+    golden = (np.sqrt(5) - 1) / 2
+    for _ in range(iterations):
+        a, b = hi - golden * (hi - lo), lo + golden * (hi - lo)
+        pair = _solve(mu, cov, np.exp([a, b]), best, lam_max)
+        s = _stats(pair, mu, cov)[2]
+        if s.max() > best_sharpe:
+            best, best_sharpe = pair[s.argmax()], s.max()
+        lo, hi = (a, hi) if s[0] < s[1] else (lo, b)
+    return best
+
+def _summary(weights, mu, cov, tickers):
+    ret, vol, sharpe = _stats(weights[None, :], mu, cov)
+    return {"weights": pd.Series(weights, index=tickers),
+            "Return %": float(ret[0] * 100),
+            "Volatility %": float(vol[0] * 100),
+            "Sharpe Ratio": float(sharpe[0])}
+
+def optimize_returns(returns, n_points=50, warm_start=None):
+    """Frontier, maximum Sharpe and minimum volatility portfolios for a
+    frame of daily returns, one column per holding. Returns a dict with:
+        frontier        DataFrame of Return %, Volatility % and Sharpe Ratio per point
+        weights         DataFrame of weights per point (rows) and holding (columns)
+        max_sharpe      {'weights', 'Return %', 'Volatility %', 'Sharpe Ratio'}
+        min_volatility  the same for the minimum-volatility portfolio
+        assets          Return % and Volatility % of each holding alone
+        shrinkage       Ledoit-Wolf shrinkage intensity applied to the covariance
+    """
+    returns = returns.dropna()
+    if returns.shape[1] < 2 or len(returns) < 2:
+        raise ValueError("need at least two holdings with overlapping history")
+    tickers = list(returns.columns)
+    mu = returns.mean().to_numpy() * TRADING_DAYS
+    cov, shrinkage = ledoit_wolf(returns.to_numpy())
+    cov *= TRADING_DAYS
+
+    with stage("optimize", holdings=len(tickers), points=n_points):
+        gammas, weights = efficient_frontier(mu, cov, n_points, warm_start)
+        best = _max_sharpe(mu, cov, gammas, weights)
+    ret, vol, sharpe = _stats(weights, mu, cov)
+    return {"frontier": pd.DataFrame({"Return %": ret * 100, "Volatility %": vol * 100,
+                                      "Sharpe Ratio": sharpe}),
+            "weights": pd.DataFrame(weights, columns=tickers),
+            "max_sharpe": _summary(best, mu, cov, tickers),
+            "min_volatility": _summary(weights[0], mu, cov, tickers),
+            "assets": pd.DataFrame({"Return %": mu * 100,
+                                    "Volatility %": np.sqrt(cov.diagonal()) * 100}, index=tickers),
+            "shrinkage": float(shrinkage)}
+
+def optimize_portfolio(tickers, start_date, n_points=50, warm_start=None, cache=None, provider=None):
+    """optimize_returns over the daily returns of tickers since start_date,
+    fetched in one bulk call and aligned like analyze_portfolio. The result
+    also lists in 'missing' the tickers without data, which are left out."""
+    tickers = list(dict.fromkeys(tickers))
+    end = pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+    frames = load_ohlcv_many(tickers, start_date, end, cache=cache, provider=provider)
+    closes = pd.DataFrame({t: frames[t]['Close'] for t in tickers if not frames[t].empty})
+    missing = [t for t in tickers if t not in closes.columns]
+    if warm_start is not None and missing:
+        warm_start = None
+    result = optimize_returns(closes.ffill().dropna().pct_change(), n_points, warm_start)
+    result["missing"] = missing
+    return result
@@ -0,0 +1,84 @@
+"""Indicators and features for many symbols in one vectorized pass.
+
+Each symbol's own bars are packed left-aligned into (symbol x bar) arrays,
+padded with NaN on the right, and run through the same engine as a single
+series. Every primitive is causal along the bar axis and anchored on the
+row's first value, so the padding never reaches a real bar and each
+symbol's results are identical to compute_indicators / add_features on its
+own frame, whatever its listing date or gaps relative to the others.
+"""
+import numpy as np
+import pandas as pd
+
+from .features import FEATURE_COLUMNS
+from .indicators import indicator_arrays
+from .instrument import stage
+
+OHLCV = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+def _panel_chunks(frames, chunk_size):
+    """Yield (symbols, lengths, OHLCV arrays, indicator arrays) for chunk_size
+    symbols at a time, grouping similar history lengths to keep the padding
+    small."""
+    symbols = sorted((s for s, df in frames.items() if len(df)), key=lambda s: len(frames[s]))
+    for lo in range(0, len(symbols), chunk_size):
+        chunk = symbols[lo:lo + chunk_size]
+        lengths = np.array([len(frames[s]) for s in chunk])
+        cols = [np.full((len(chunk), lengths.max()), np.nan) for _ in OHLCV]
+        for i, symbol in enumerate(chunk):
+            df = frames[symbol]
+            for col, name in zip(cols, OHLCV):
+                col[i, :lengths[i]] = np.asarray(df[name], dtype=float)
+        yield chunk, lengths, cols, indicator_arrays(*cols)
+
+def compute_indicators_panel(frames, chunk_size=64):
+    """{symbol: compute_indicators(frame)} for a {symbol: OHLCV frame} dict.
+    Symbols without any bars are left out."""
+    out = {}
+    with stage("indicators_panel", symbols=len(frames)):
+        for chunk, lengths, _, arrays in _panel_chunks(frames, chunk_size):
+            for i, symbol in enumerate(chunk):
+                n = lengths[i]
+                out[symbol] = pd.DataFrame({name: a[i, :n] for name, a in arrays.items()},
+                                           index=frames[symbol].index)
+    return {s: out[s] for s in frames if s in out}
+
+def add_features_panel(frames, chunk_size=64):
+    """{symbol: add_features(frame)} for a {symbol: OHLCV frame} dict, with the
+    indicators and the NaN filtering done on whole chunks at once. Symbols
+    without any bars are left out."""
+    columns = FEATURE_COLUMNS + ['Target']
+    out = {}
+    with stage("add_features_panel", symbols=len(frames)):
+        for chunk, lengths, cols, arrays in _panel_chunks(frames, chunk_size):
+            complete = ~np.any([np.isnan(a) for a in [arrays[c] for c in columns] + cols], axis=0)
+            for i, symbol in enumerate(chunk):
+                df = frames[symbol]
+                keep = complete[i, :lengths[i]]
+                if df.shape[1] > len(OHLCV):  # add_features also drops NaNs in extra columns
+                    keep = keep & df.notna().all(axis=1).to_numpy()
+                rows = np.flatnonzero(keep)
+                part = df.iloc[rows]
+                features = pd.DataFrame({c: arrays[c][i, rows] for c in columns}, index=part.index)
+                out[symbol] = pd.concat([part, features], axis=1)
+    return {s: out[s] for s in frames if s in out}
+
+def latest_indicators(frames, bars_ago=(0,), columns=None, chunk_size=64):
+    """{k: DataFrame indexed by symbol} of OHLCV and indicator values k bars
+    before each symbol's own last bar, plus that bar's Date. Only these rows
+    are kept, so memory stays flat however many symbols are screened."""
+    parts = {k: [] for k in bars_ago}
+    with stage("latest_indicators", symbols=len(frames)):
+        for chunk, lengths, cols, arrays in _panel_chunks(frames, chunk_size):
+            values = dict(zip(OHLCV, cols), **arrays)
+            names = list(values) if columns is None else list(columns)
+            for k in bars_ago:
+                pos = lengths - 1 - k
+                ok = pos >= 0
+                at = np.maximum(pos, 0)[:, None]
+                data = {name: np.where(ok, np.take_along_axis(values[name], at, axis=-1)[:, 0], np.nan)
+                        for name in names}
+                data['Date'] = [frames[s].index[p] if p >= 0 else pd.NaT for s, p in zip(chunk, pos)]
+                parts[k].append(pd.DataFrame(data, index=pd.Index(chunk, name='Symbol')))
+    return {k: pd.concat(p) if p else pd.DataFrame(index=pd.Index([], name='Symbol'))
+            for k, p in parts.items()}
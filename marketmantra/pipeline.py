@@ -0,0 +1,89 @@
+"""End-to-end prediction for one symbol, shared by the web app and the CLI."""
+import numpy as np
+
+from .data import load_ohlcv
+from .features import FEATURE_COLUMNS, add_features
+from .models import (REFIT_EVERY, UPDATE_WINDOW, train_ensemble, update_ensemble,
+                     evaluate_walk_forward, predict_up_probability)
+from .backtest import oof_signals
+from .store import get_model_store, model_cache_key, model_lineage_key, data_digest
+from .tuning import tuned_models
+
+def _can_update(previous, df_ml):
+    """Whether previous, a stored ensemble, can be updated to df_ml rather
+    than retrained: df_ml only appends up to UPDATE_WINDOW rows to the
+    rows it was trained on, and it is not due a full refit."""
+    n_new = len(df_ml) - previous["rows"]
+    return (previous["updates"] < REFIT_EVERY and 0 < n_new <= UPDATE_WINDOW
+            and _history_digest(df_ml.iloc[:previous["rows"]]) == previous["digest"])
+
+def _history_digest(df_ml):
+    # The last row's Target is about a bar that had not happened yet, so it
+    # changes when that bar arrives; its features and every other row must not.
+    return data_digest(df_ml, FEATURE_COLUMNS, last_target=False)
+
+def load_or_train(symbol, df_ml, store=None, models=None, n_workers=None, n_threads=None, budget_s=None,
+                  incremental=True):
+    """The trained ensemble for symbol's feature frame, from the model store
+    when nothing relevant changed. The models default to tuned_models():
+    the standard or, with budget_s, the budgeted ensemble, with symbol's
+    tuned hyperparameters if it has any. With budget_s, training aims to
+    take at most that many seconds (see train_ensemble). When df_ml only
+    adds bars to the last stored ensemble's, that one is updated instead
+    (see update_ensemble), unless incremental is False or it is due a full
+    refit. Returns (trained, from_store)."""
+    store = store or get_model_store()
+    models = tuned_models(symbol, budget_s) if models is None else models
+    key = model_cache_key(symbol, df_ml, FEATURE_COLUMNS, models, budget_s)
+    trained = store.get(symbol, key)
+    if trained is not None:
+        return trained, True
+    lineage = model_lineage_key(symbol, FEATURE_COLUMNS, models, budget_s)
+    previous = store.latest(symbol, lineage) if incremental else None
+    if previous is not None and _can_update(previous, df_ml):
+        trained = update_ensemble(previous, df_ml[FEATURE_COLUMNS], df_ml['Target'])
+    else:
+        trained = train_ensemble(models, df_ml[FEATURE_COLUMNS], df_ml['Target'],
+                                 n_workers=n_workers, n_threads=n_threads, budget_s=budget_s)
+    trained["digest"] = _history_digest(df_ml)
+    store.put(symbol, key, trained, lineage)
+    return trained, False
+
+def run_prediction(symbol, start_date, end_date, store=None, cache=None, n_workers=None, n_threads=None,
+                   budget_s=None):
+    """Download, engineer features, train (or load) and predict one symbol.
+    Returns a flat result row."""
+    df_ml = add_features(load_ohlcv(symbol, start_date, end_date, cache))
+    if df_ml.empty:
+        raise ValueError(f"not enough data for {symbol} after feature engineering")
+
+    trained, from_store = load_or_train(symbol, df_ml, store, n_workers=n_workers, n_threads=n_threads,
+                                        budget_s=budget_s)
+    evaluation = evaluate_walk_forward(trained, df_ml['Target'])
+    up_prob = predict_up_probability(trained, df_ml[FEATURE_COLUMNS])
+
+    row = {"symbol": symbol,
+           "last_date": df_ml.index[-1],
+           "rows": len(df_ml),
+           "up_probability": up_prob,
+           "prediction": "UP" if up_prob > 0.5 else "DOWN",
+           "ensemble_accuracy": evaluation["ensemble_accuracy"],
+           "baseline": evaluation["baseline"],
+           "from_store": from_store,
+           "full_fit_s": trained["train_s"],
+           "update_s": trained["update_s"],
+           "updates": trained["updates"]}
+    for name, scores in trained["cv_scores"].items():
+        row[f"cv_{name}"] = np.mean(scores) * 100
+    return row
+
+def walk_forward_signals(symbol, start_date, end_date, store=None, cache=None, n_workers=None, n_threads=None,
+                         budget_s=None):
+    """Download, engineer features, train (or load) and return the
+    out-of-fold signal frame of one symbol (see backtest.oof_signals)."""
+    df_ml = add_features(load_ohlcv(symbol, start_date, end_date, cache))
+    if df_ml.empty:
+        raise ValueError(f"not enough data for {symbol} after feature engineering")
+    trained, _ = load_or_train(symbol, df_ml, store, n_workers=n_workers, n_threads=n_threads,
+                               budget_s=budget_s)
+    return oof_signals(df_ml, trained)
@@ -0,0 +1,103 @@
+"""Background warming of the symbols a user is likely to open next."""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class Prefetcher:
+    """Keeps (symbol, start, end) requests warm on a small thread pool.
+
+    warm(symbols, start, end) does the actual work, e.g. a bulk download
+    plus feature engineering into a shared cache; it may return
+    {symbol: error message} for symbols that failed. Clients call request()
+    on every interaction with the symbols they want warm: anything not
+    warmed in the last interval seconds is queued at once, and a scheduler
+    thread re-warms every live request each interval to pick up new bars.
+    Requests a client has not renewed within ttl seconds are dropped.
+    At most max_keys (symbol, start, end) are kept warm across all clients,
+    so the cache warm() fills can be sized to hold every one of them.
+    """
+
+    def __init__(self, warm, max_workers=2, interval=900, ttl=3600, max_keys=None):
+        self._warm = warm
+        self.interval = interval
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._clients = {}   # client -> (symbols, start, end, last seen)
+        self._queued = set()  # (symbol, start, end) queued or running
+        self._warmed = {}    # (symbol, start, end) -> monotonic time warmed
+        self.errors = {}     # (symbol, start, end) -> last error message
+        self._stop = threading.Event()
+        threading.Thread(target=self._schedule, name="prefetch-schedule", daemon=True).start()
+
+    def request(self, client, symbols, start, end):
+        """Register what client wants kept warm; queue what is not warm yet."""
+        symbols = tuple(dict.fromkeys(symbols))
+        with self._lock:
+            self._clients[client] = (symbols, start, end, time.monotonic())
+        return self._submit(symbols, start, end, max_age=self.interval)
+
+    def status(self, symbols, start, end):
+        """{symbol: 'warm' | 'warming' | 'failed' | 'cold'}."""
+        now = time.monotonic()
+        with self._lock:
+            def state(key):
+                if key in self._queued:
+                    return "warming"
+                if key in self.errors:
+                    return "failed"
+                return "warm" if now - self._warmed.get(key, -self.ttl) < self.ttl else "cold"
+            return {symbol: state((symbol, start, end)) for symbol in symbols}
+
+    def _submit(self, symbols, start, end, max_age):
+        now = time.monotonic()
+        with self._lock:
+            batch = [s for s in symbols if (s, start, end) not in self._queued
+                     and now - self._warmed.get((s, start, end), -max_age) >= max_age]
+            if self.max_keys is not None:
+                # Re-warming a kept key is free; new keys only while there is room
+                room = self.max_keys - len(self._queued | self._warmed.keys())
+                new = [s for s in batch if (s, start, end) not in self._warmed][:max(room, 0)]
+                batch = [s for s in batch if (s, start, end) in self._warmed or s in new]
+            self._queued.update((s, start, end) for s in batch)
+        if batch:
+            self._pool.submit(self._run, batch, start, end)
+        return batch
+
+    def _run(self, batch, start, end):
+        try:
+            failed = self._warm(batch, start, end) or {}
+        except Exception as e:
+            failed = dict.fromkeys(batch, f"{type(e).__name__}: {e}")
+        now = time.monotonic()
+        with self._lock:
+            for symbol in batch:
+                key = (symbol, start, end)
+                self._queued.discard(key)
+                if symbol in failed:
+                    self.errors[key] = failed[symbol]
+                else:
+                    self._warmed[key] = now
+                    self.errors.pop(key, None)
+
+    def refresh(self):
+        """Drop expired clients and re-warm everything the others asked for."""
+        now = time.monotonic()
+        with self._lock:
+            self._clients = {c: r for c, r in self._clients.items() if now - r[3] < self.ttl}
+            live = list(self._clients.values())
+            keep = {(s, start, end) for symbols, start, end, _ in live for s in symbols}
+            self._warmed = {k: t for k, t in self._warmed.items() if k in keep}
+            self.errors = {k: e for k, e in self.errors.items() if k in keep}
+        for symbols, start, end, _ in live:
+            # Half an interval, so what request() warmed moments ago is skipped
+            self._submit(symbols, start, end, max_age=self.interval / 2)
+
+    def _schedule(self):
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def shutdown(self, wait=True):
+        self._stop.set()
+        self._pool.shutdown(wait=wait)
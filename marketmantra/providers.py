@@ -0,0 +1,323 @@
+"""Where OHLCV bars come from.
+
+Every provider returns the same normalized frame: a sorted, duplicate-free,
+tz-naive DatetimeIndex named Date and float64 Open/High/Low/Close/Volume
+columns, so df['Close'] is always a Series. Pick one with
+MARKETMANTRA_PROVIDER (or the CLI's --provider):
+
+    yfinance            Yahoo Finance (default)
+    local:/path/to/dir  <SYMBOL>.parquet or <SYMBOL>.csv files, e.g. TCS.NS.csv
+    synthetic[:seed]    seeded random walks, the same bars on every run
+"""
+import os
+import time
+import zlib
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .instrument import stage, frame_stats
+from .lazy import lazy_import
+from .synthetic import synthetic_ohlcv
+
+yf = lazy_import("yfinance")
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def normalize_ohlcv(df):
+    """The canonical OHLCV frame for whatever a data source returned."""
+    if isinstance(df.columns, pd.MultiIndex):
+        # yfinance adds a ticker level, even to single-symbol downloads
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+    if df.empty:
+        return pd.DataFrame({c: pd.Series(dtype=float) for c in OHLCV_COLUMNS},
+                            index=pd.DatetimeIndex([], name="Date"))
+    missing = [c for c in OHLCV_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"OHLCV data is missing columns {missing}")
+
+    df = df.loc[:, ~df.columns.duplicated()][OHLCV_COLUMNS].astype(float)
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = index.rename("Date")
+    if not (index.is_monotonic_increasing and index.is_unique):
+        df = df[~index.duplicated(keep="last")].sort_index()
+    return df
+
+def _slice(df, start, end):
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    return df[(df.index >= start) & (df.index < end)]
+
+class DataProvider:
+    """A source of daily bars. fetch() returns normalize_ohlcv() frames for
+    [start, end); unknown symbols give an empty frame."""
+
+    name = "base"
+    # Subdirectory of the OHLCV cache for this provider's bars, or None when
+    # the source is already local and caching it would only add staleness.
+    cache_namespace = None
+
+    def fetch(self, symbol, start, end):
+        raise NotImplementedError
+
+    def fetch_many(self, symbols, start, end):
+        """{symbol: frame} for several symbols over one range."""
+        return {symbol: self.fetch(symbol, start, end) for symbol in symbols}
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+class _SingleFlight:
+    """One in-flight call per key: concurrent callers asking for the same key
+    wait for the first caller's result instead of repeating the work."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def claim(self, keys):
+        """Split keys into futures this caller must resolve and futures some
+        other caller is already resolving."""
+        lead, follow = {}, {}
+        with self._lock:
+            for key in keys:
+                if key in self._calls:
+                    follow[key] = self._calls[key]
+                else:
+                    lead[key] = self._calls[key] = Future()
+        return lead, follow
+
+    def resolve(self, key, result=None, error=None):
+        with self._lock:
+            future = self._calls.pop(key)
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+def _ticker_frame(data, symbol):
+    """One symbol's bars out of a group_by='ticker' multi-ticker download."""
+    if data is None or data.empty or not isinstance(data.columns, pd.MultiIndex):
+        return normalize_ohlcv(pd.DataFrame())
+    tickers = data.columns.get_level_values(0)
+    if symbol.upper() not in tickers:
+        return normalize_ohlcv(pd.DataFrame())
+    # The batch is aligned on the union of every symbol's dates
+    return normalize_ohlcv(data[symbol.upper()].dropna(how="all"))
+
+def _expects_bars(start, end, min_days=3):
+    """Whether [start, end) holds enough past weekdays that an empty answer
+    means a failed request rather than a holiday or a range in the future."""
+    end = min(pd.Timestamp(end), pd.Timestamp.today().normalize())
+    return len(pd.bdate_range(pd.Timestamp(start), end, inclusive="left")) >= min_days
+
+class YFinanceProvider(DataProvider):
+    """Yahoo Finance over one pooled HTTP session.
+
+    Symbols are fetched in multi-ticker batches, identical concurrent
+    requests (same symbol and range, from any session) share one download,
+    and failed or empty batches are retried with jittered exponential
+    backoff. A symbol that is still empty after every retry is tried only
+    once per request for the next negative_ttl seconds.
+    """
+
+    name = "yfinance"
+    cache_namespace = "ohlcv"
+
+    def __init__(self, retries=2, backoff=0.5, negative_ttl=300):
+        self.retries = retries
+        self.backoff = backoff
+        self.negative_ttl = negative_ttl
+        self._flight = _SingleFlight()
+        self._empty_since = {}  # symbol -> when its retries last came back empty
+        self._empty_lock = threading.Lock()  # fetch_many() runs on many threads
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Shared curl_cffi session, so connections and Yahoo's cookie and
+        crumb survive across downloads. None lets yfinance make its own."""
+        with self._session_lock:
+            if self._session is None:
+                try:
+                    from curl_cffi import requests as curl_requests
+                except ImportError:
+                    return None
+                self._session = curl_requests.Session(impersonate="chrome")
+            return self._session
+
+    def _download(self, symbols, start, end):
+        frames, error = {}, None
+        pending = list(symbols)
+        retry_empty = _expects_bars(start, end)
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(1, 1.5))
+            try:
+                data = yf.download(pending, start=pd.Timestamp(start).strftime('%Y-%m-%d'),
+                                   end=pd.Timestamp(end).strftime('%Y-%m-%d'), group_by="ticker",
+                                   threads=True, progress=False, session=self.session)
+            except Exception as e:
+                error = e
+                continue
+            error = None
+            frames.update((symbol, _ticker_frame(data, symbol)) for symbol in pending)
+            now = time.monotonic()
+            with self._empty_lock:
+                pending = [s for s in pending if frames[s].empty and retry_empty
+                           and now - self._empty_since.get(s, -self.negative_ttl) >= self.negative_ttl]
+            if not pending:
+                break
+
+        now = time.monotonic()
+        with self._empty_lock:
+            for symbol, df in frames.items():
+                if not (df.empty and retry_empty):
+                    self._empty_since.pop(symbol, None)
+                elif now - self._empty_since.get(symbol, -self.negative_ttl) >= self.negative_ttl:
+                    self._empty_since[symbol] = now  # retries were just exhausted
+        if error is not None and len(frames) < len(symbols):
+            raise error
+        return frames
+
+    def fetch_many(self, symbols, start, end):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        symbols = list(dict.fromkeys(symbols))
+        lead, follow = self._flight.claim([(s, start, end) for s in symbols])
+        if lead:
+            batch = [symbol for symbol, _, _ in lead]
+            try:
+                with stage("download", symbols=len(batch)) as record:
+                    frames = self._download(batch, start, end)
+                    record["rows"] = sum(len(df) for df in frames.values())
+            except BaseException as e:
+                for key in lead:
+                    self._flight.resolve(key, error=e)
+                raise
+            for key in lead:
+                self._flight.resolve(key, result=frames[key[0]])
+        return {symbol: (lead.get(key) or follow[key]).result()
+                for symbol, key in ((s, (s, start, end)) for s in symbols)}
+
+    def fetch(self, symbol, start, end):
+        return self.fetch_many([symbol], start, end)[symbol]
+
+@lru_cache(maxsize=64)
+def _read_local(path, mtime):
+    """Parsed file contents; mtime is part of the key so edits are picked up."""
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    date_col = next((c for c in ("Date", "Datetime", "date", "datetime") if c in df.columns), None)
+    if date_col is not None:
+        df = df.set_index(date_col)
+    df.index = pd.to_datetime(df.index)
+    return normalize_ohlcv(df)
+
+class LocalProvider(DataProvider):
+    """A directory mirror of daily bars, one Parquet or CSV file per symbol.
+    CSV files need a Date (or Datetime) column, or the dates in the first one."""
+
+    name = "local"
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, symbol):
+        for ext in (".parquet", ".csv"):
+            path = os.path.join(self.directory, symbol + ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def fetch(self, symbol, start, end):
+        path = self.path(symbol)
+        if path is None:
+            return normalize_ohlcv(pd.DataFrame())
+        with stage("read_local", symbol=symbol) as record:
+            df = _slice(_read_local(path, os.stat(path).st_mtime_ns), start, end)
+            record.update(frame_stats(df))
+        return df
+
+    def __repr__(self):
+        return f"LocalProvider({self.directory!r})"
+
+class SyntheticProvider(DataProvider):
+    """Deterministic random-walk bars for any symbol, for load tests and
+    offline runs. Each symbol gets its own seeded path over a fixed calendar,
+    so a given date always has the same bar; nothing is dated after today."""
+
+    name = "synthetic"
+    ORIGIN, HORIZON = "2000-01-03", "2041-01-01"  # the calendar is [ORIGIN, HORIZON)
+
+    def __init__(self, seed=0, memory_entries=256):
+        self.seed = seed
+        self.memory_entries = memory_entries
+        self._lock = threading.Lock()
+        self._frames = OrderedDict()  # LRU; a path is cheap to regenerate
+
+    def _frame(self, symbol):
+        with self._lock:
+            if symbol in self._frames:
+                self._frames.move_to_end(symbol)
+                return self._frames[symbol]
+        symbol_seed = zlib.crc32(symbol.encode("utf-8")) ^ (self.seed * 0x9E3779B1 & 0xFFFFFFFF)
+        rng = np.random.default_rng(symbol_seed)
+        n_rows = int(np.busday_count(self.ORIGIN, self.HORIZON))
+        df = synthetic_ohlcv(n_rows, seed=symbol_seed, start=self.ORIGIN,
+                             start_price=float(rng.uniform(20, 2000)), freq="B").rename_axis("Date")
+        with self._lock:
+            self._frames[symbol] = df
+            while len(self._frames) > self.memory_entries:
+                self._frames.popitem(last=False)
+        return df
+
+    def fetch(self, symbol, start, end):
+        end = min(pd.Timestamp(end), pd.Timestamp.today().normalize() + pd.Timedelta(days=1))
+        return _slice(self._frame(symbol), start, end)
+
+    def __repr__(self):
+        return f"SyntheticProvider(seed={self.seed})"
+
+def provider_from_spec(spec):
+    """A provider from a 'yfinance', 'local:DIR' or 'synthetic[:SEED]' string."""
+    kind, _, arg = (spec or "yfinance").partition(":")
+    kind = kind.strip().lower()
+    if kind == "yfinance":
+        return YFinanceProvider()
+    if kind == "local":
+        if not arg or not os.path.isdir(arg):
+            raise ValueError(f"local provider needs an existing directory, got {arg!r}")
+        return LocalProvider(arg)
+    if kind == "synthetic":
+        return SyntheticProvider(int(arg) if arg else 0)
+    raise ValueError(f"unknown data provider {spec!r}; expected yfinance, local:DIR or synthetic[:SEED]")
+
+_default_provider = None
+_default_lock = threading.Lock()
+
+def get_provider():
+    """The process-wide provider, from MARKETMANTRA_PROVIDER on first use."""
+    global _default_provider
+    with _default_lock:
+        if _default_provider is None:
+            _default_provider = provider_from_spec(os.environ.get("MARKETMANTRA_PROVIDER"))
+        return _default_provider
+
+def set_provider(provider):
+    """Replace the process-wide provider (a DataProvider or a spec string)."""
+    global _default_provider
+    if isinstance(provider, str):
+        provider = provider_from_spec(provider)
+    with _default_lock:
+        _default_provider = provider
+    return provider
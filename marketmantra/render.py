@@ -0,0 +1,172 @@
+"""Chart rendering shared by the web app: downsampling, figures and a PNG cache.
+
+A chart is a draw(ax, *data, **options) function. render_png() calls it on
+a fresh matplotlib Figure that is never registered with pyplot, so nothing
+keeps it alive once it is saved, and returns PNG bytes, cached in memory
+on the draw function's code, its data and its options. Draw functions
+pass long series through thin(), which downsamples them to the axes'
+width in pixels: largest-triangle-three-buckets (LTTB) for lines, the
+bucket minimum and maximum for bars and anything whose extremes matter.
+"""
+import io
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .lazy import lazy_import
+
+figure = lazy_import("matplotlib.figure")
+
+DPI = 100
+
+def lttb(x, y, n_out):
+    """Indices of the n_out points of (x, y) chosen by largest-triangle-
+    three-buckets; the first and last points are always kept."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Average of the next bucket (or the last point) is the triangle's third vertex
+        nxt_hi = edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[hi:nxt_hi].mean(), y[hi:nxt_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+def minmax(y, n_out):
+    """Sorted indices of each bucket's minimum and maximum, about n_out in all."""
+    n = len(y)
+    buckets = max(1, n_out // 2)
+    if n <= n_out:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(buckets, size)
+    valid = ~np.isnan(blocks).all(axis=1)
+    starts = np.arange(buckets) * size
+    lo = np.nanargmin(np.where(valid[:, None], blocks, 0), axis=1) + starts
+    hi = np.nanargmax(np.where(valid[:, None], blocks, 0), axis=1) + starts
+    return np.unique(np.concatenate([lo[valid], hi[valid], [0, n - 1]]))
+
+def thin(data, ax=None, n_out=None, method="lttb"):
+    """data (Series or DataFrame, x on the index) downsampled to about n_out
+    rows, by default the width of ax in pixels. Rows are picked on the first
+    column with method 'lttb' or 'minmax'; short data comes back unchanged."""
+    n_out = n_out or (int(ax.bbox.width) if ax is not None else 1000)
+    if len(data) <= n_out:
+        return data
+    key = data if isinstance(data, pd.Series) else data.iloc[:, 0]
+    y = key.ffill().bfill().to_numpy(dtype=float)
+    if method == "minmax":
+        idx = minmax(y, n_out)
+    elif method == "lttb":
+        index = data.index
+        x = index.asi8 if isinstance(index, pd.DatetimeIndex) else np.asarray(index, dtype=float)
+        idx = lttb(x, y, n_out)
+    else:
+        raise ValueError(f"method must be 'lttb' or 'minmax', not {method!r}")
+    return data.iloc[idx]
+
+def _fingerprint(h, obj):
+    if isinstance(obj, (pd.Series, pd.DataFrame, pd.Index)):
+        h.update(repr((type(obj).__name__, getattr(obj, "name", None),
+                       list(getattr(obj, "columns", [])))).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(obj, index=not isinstance(obj, pd.Index)).values.tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.dtype.str, obj.shape)).encode("utf-8"))
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}{len(obj)}".encode("utf-8"))
+        for item in obj:
+            _fingerprint(h, item)
+    elif isinstance(obj, dict):
+        for k in sorted(obj, key=repr):
+            h.update(repr(k).encode("utf-8"))
+            _fingerprint(h, obj[k])
+    else:
+        h.update(repr(obj).encode("utf-8"))
+
+def chart_key(draw, data, options):
+    """Fingerprint of a chart: the draw function's code, its data and options."""
+    h = hashlib.sha256(f"{draw.__module__}.{draw.__qualname__}".encode("utf-8"))
+    h.update(draw.__code__.co_code)
+    for const in draw.__code__.co_consts:  # nested code objects repr with their address
+        h.update(const.co_code if hasattr(const, "co_code") else repr(const).encode("utf-8"))
+    _fingerprint(h, data)
+    _fingerprint(h, options)
+    return h.hexdigest()
+
+class RenderCache:
+    """Rendered charts as PNG bytes, evicted least recently used first once
+    they outgrow max_bytes."""
+
+    def __init__(self, max_bytes=64 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            png = self._images.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._images.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key, png):
+        with self._lock:
+            if key in self._images:
+                self._bytes -= len(self._images.pop(key))
+            self._images[key] = png
+            self._bytes += len(png)
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                self._bytes -= len(self._images.popitem(last=False)[1])
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._images), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+def render_png(draw, *data, figsize=(15, 5), dpi=DPI, cache=None, **options):
+    """PNG of draw(ax, *data, **options) on a figsize figure, and whether it
+    came from the cache. Pass cache=False to always redraw."""
+    cache = get_render_cache() if cache is None else cache
+    key = chart_key(draw, data, (figsize, dpi, options)) if cache else None
+    png = cache.get(key) if cache else None
+    if png is not None:
+        return png, True
+    fig = figure.Figure(figsize=figsize, dpi=dpi)
+    draw(fig.subplots(), *data, **options)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight")
+    png = buf.getvalue()
+    if cache:
+        cache.put(key, png)
+    return png, False
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_render_cache():
+    """The process-wide RenderCache."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = RenderCache()
+        return _default_cache
@@ -0,0 +1,123 @@
+"""Return, risk and benchmark analytics for a holding or a whole portfolio."""
+import numpy as np
+import pandas as pd
+
+from .data import load_ohlcv_many
+
+BENCHMARK = "^BSESN"
+RISK_FREE_RATE = 0.06
+TRADING_DAYS = 252
+
+def _weights(tickers, weights):
+    """Weights normalized to sum to 1, equal when none are given."""
+    if weights is None:
+        w = np.ones(len(tickers))
+    elif isinstance(weights, dict):
+        w = np.array([float(weights.get(t, 0.0)) for t in tickers])
+    else:
+        w = np.asarray(weights, dtype=float)
+        if len(w) != len(tickers):
+            raise ValueError(f"got {len(w)} weights for {len(tickers)} tickers")
+    if (w < 0).any() or w.sum() <= 0:
+        raise ValueError("weights must be non-negative and not all zero")
+    return w / w.sum()
+
+def _metrics(values):
+    """Final value, return, CAGR, volatility, Sharpe and max drawdown for each
+    column of a value-over-time frame."""
+    v = values.to_numpy()
+    years = (values.index[-1] - values.index[0]).days / 365
+    final = v[-1]
+    growth = final / v[0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cagr = (growth ** (1 / years) - 1) * 100 if years > 0 else np.full(v.shape[1], np.nan)
+        volatility = np.nanstd(v[1:] / v[:-1] - 1, axis=0, ddof=1) * np.sqrt(TRADING_DAYS) * 100
+        sharpe = (cagr / 100 - RISK_FREE_RATE) / (volatility / 100)
+        drawdown = (v / np.maximum.accumulate(v, axis=0) - 1).min(axis=0) * 100
+    return pd.DataFrame({"Final Value": final,
+                         "Total Return %": (growth - 1) * 100,
+                         "CAGR %": cagr,
+                         "Volatility %": volatility,
+                         "Sharpe Ratio": sharpe,
+                         "Max Drawdown %": drawdown}, index=values.columns)
+
+def analyze_portfolio(tickers, start_date, investment, weights=None, benchmark=BENCHMARK,
+                      cache=None, provider=None):
+    """Buy-and-hold analytics for every holding and for the whole portfolio.
+
+    investment is split by weights (equal by default) on the first date all
+    holdings trade; bars for the holdings and the benchmark come in one bulk
+    fetch. Closes are aligned on the holdings' trading calendar, with gaps
+    (e.g. different exchange holidays) carried forward. Returns None when no
+    holding has data, else a dict with:
+        holdings   DataFrame of metrics per ticker, incl. Weight and Excess Return %
+        portfolio  the same metrics for the aggregate portfolio
+        benchmark  the benchmark's metrics over the same dates, from its
+                   first close if it starts later; None without benchmark
+                   data, and then the Excess Return % fields are left out
+        values     value over time per holding, 'Portfolio' and the benchmark
+                   (scaled to the investment), for growth charts
+        missing    tickers without data, left out of the portfolio
+    """
+    tickers = list(dict.fromkeys(tickers))
+    end = pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+    frames = load_ohlcv_many(tickers + [benchmark], start_date, end, cache=cache, provider=provider)
+
+    closes = pd.DataFrame({t: frames[t]['Close'] for t in tickers if not frames[t].empty})
+    missing = [t for t in tickers if t not in closes.columns]
+    if closes.empty:
+        return None
+    held = list(closes.columns)
+    w = _weights(tickers, weights)
+    w = w[[tickers.index(t) for t in held]]
+    if w.sum() <= 0:
+        raise ValueError("every ticker with data has zero weight")
+    w = w / w.sum()
+
+    # Shared calendar: every day any holding traded, from the first day all of them have a price
+    closes = closes.ffill().dropna()
+    if len(closes) < 2:
+        return None
+    # As-of join: each day takes the benchmark's last close on or before it
+    bench = frames[benchmark]['Close'].reindex(closes.index.union(frames[benchmark].index))
+    bench = bench.ffill().reindex(closes.index)
+
+    units = investment * w / closes.iloc[0].to_numpy()
+    values = closes * units
+    values["Portfolio"] = values.sum(axis=1)
+    metrics = _metrics(values)
+    holdings = metrics.loc[held].assign(Weight=w * 100)
+    portfolio = {k: float(v) for k, v in metrics.loc["Portfolio"].items()}
+
+    # A benchmark that starts later is tracked from its first close
+    bench = bench.loc[bench.first_valid_index():] if bench.notna().any() else bench.iloc[:0]
+    bench_metrics = None
+    if len(bench) >= 2:
+        # Named apart from the holdings, which may include the benchmark itself
+        bench_col = f"Benchmark ({benchmark})"
+        values[bench_col] = bench * (investment / bench.iloc[0])
+        bench_metrics = _metrics(values[[bench_col]].loc[bench.index]).loc[bench_col].to_dict()
+        holdings["Excess Return %"] = holdings["Total Return %"] - bench_metrics["Total Return %"]
+        portfolio["Excess Return %"] = float(portfolio["Total Return %"] - bench_metrics["Total Return %"])
+
+    return {"holdings": holdings,
+            "portfolio": portfolio,
+            "benchmark": bench_metrics,
+            "values": values,
+            "missing": missing}
+
+def calculate_advanced_roi(ticker, start_date, investment, cache=None, provider=None):
+    """ROI, CAGR, volatility and Sharpe of one holding, with the Sensex return
+    over the same dates when there is Sensex data; None without data."""
+    analysis = analyze_portfolio([ticker], start_date, investment, cache=cache, provider=provider)
+    if analysis is None:
+        return None
+    row = analysis["holdings"].loc[ticker]
+    result = {"Final Value": float(row["Final Value"]),
+              "Total Return %": float(row["Total Return %"]),
+              "CAGR %": float(row["CAGR %"]),
+              "Volatility %": float(row["Volatility %"]),
+              "Sharpe Ratio": float(row["Sharpe Ratio"])}
+    if analysis["benchmark"] is not None:
+        result["Sensex Return %"] = float(analysis["benchmark"]["Total Return %"])
+    return result
@@ -0,0 +1,207 @@
+"""Screen a whole universe of symbols on the latest indicator values.
+
+    screen(SENSEX, ["RSI < 30", "Close < Lower_BB"])
+    screen(symbols, ["SMA_10 crosses above SMA_50", "Stoch > 80"], match="any")
+
+A condition compares an indicator with a number or with another indicator
+(any column of compute_indicators, or Open/High/Low/Close/Volume), using
+<, <=, >, >=, 'crosses above' or 'crosses below'; a cross compares the last
+bar with the one before it. Bars come from the OHLCV cache in bulk and the
+indicators from the panel engine, so the definitions are the same ones
+add_features uses.
+"""
+import os
+import re
+import csv
+import threading
+from collections.abc import Mapping
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .data import load_ohlcv_many
+from .instrument import stage
+from .panel import latest_indicators
+
+# Index snapshots; constituents change, so pass your own list (or the CLI's
+# --symbols-file) for the current membership, or add a constituents file.
+SENSEX = [
+    "RELIANCE.NS", "HDFCBANK.NS", "ICICIBANK.NS", "INFY.NS", "TCS.NS", "BHARTIARTL.NS",
+    "ITC.NS", "LT.NS", "SBIN.NS", "HINDUNILVR.NS", "BAJFINANCE.NS", "KOTAKBANK.NS",
+    "AXISBANK.NS", "M&M.NS", "MARUTI.NS", "SUNPHARMA.NS", "HCLTECH.NS", "TITAN.NS",
+    "ULTRACEMCO.NS", "NTPC.NS", "TATAMOTORS.NS", "POWERGRID.NS", "TATASTEEL.NS",
+    "ASIANPAINT.NS", "BAJAJFINSV.NS", "NESTLEIND.NS", "ADANIPORTS.NS", "TECHM.NS",
+    "INDUSINDBK.NS", "JSWSTEEL.NS",
+]
+NIFTY_50 = SENSEX + [
+    "ADANIENT.NS", "APOLLOHOSP.NS", "BAJAJ-AUTO.NS", "BEL.NS", "BPCL.NS", "BRITANNIA.NS",
+    "CIPLA.NS", "COALINDIA.NS", "DRREDDY.NS", "EICHERMOT.NS", "GRASIM.NS", "HDFCLIFE.NS",
+    "HEROMOTOCO.NS", "HINDALCO.NS", "ONGC.NS", "SBILIFE.NS", "SHRIRAMFIN.NS",
+    "TATACONSUM.NS", "TRENT.NS", "WIPRO.NS",
+]
+
+# Larger indices come from constituents files, read on first use: the ones
+# in universes/ (Nifty 500 as of January 2022) and every CSV in
+# $MARKETMANTRA_UNIVERSES_DIR, named after the file ("Nifty Midcap 150"
+# for nifty_midcap_150.csv). A newer file of the same name replaces ours.
+UNIVERSE_FILES_DIR = os.path.join(os.path.dirname(__file__), "universes")
+UNIVERSES_DIR = os.environ.get("MARKETMANTRA_UNIVERSES_DIR")
+
+def load_constituents(path, suffix=".NS"):
+    """Symbols in a constituents file: a CSV with a Symbol column, like the
+    index lists NSE publishes, or one symbol per line. Symbols without an
+    exchange suffix get suffix; NSE lists' non-equity series are skipped."""
+    with open(path, newline="") as f:
+        lines = [line for line in f if line.strip() and not line.startswith("#")]
+    header = [c.strip().lower() for c in next(csv.reader(lines[:1]), [])]
+    if "symbol" in header:
+        rows = csv.DictReader(lines, fieldnames=header)
+        next(rows)
+        symbols = [row["symbol"] for row in rows if (row.get("series") or "EQ").strip().upper() == "EQ"]
+    else:
+        symbols = lines
+    symbols = [s.strip().upper() for s in symbols if s.strip()]
+    return list(dict.fromkeys(s if "." in s or s.startswith("^") else s + suffix for s in symbols))
+
+def _universe_name(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return " ".join(w if any(c.isdigit() for c in w) else w.capitalize() for w in re.split(r"[_\s]+", stem))
+
+class _Universes(Mapping):
+    """Universe name -> symbols: the lists above, then constituents files,
+    each read once."""
+
+    def __init__(self, lists, directories):
+        self._lists = dict(lists)
+        self._files = {}
+        for directory in directories:
+            if directory and os.path.isdir(directory):
+                for name in sorted(os.listdir(directory)):
+                    if name.lower().endswith(".csv"):
+                        self._files[_universe_name(name)] = os.path.join(directory, name)
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        if name in self._lists:
+            return self._lists[name]
+        path = self._files[name]
+        with self._lock:
+            if name not in self._loaded:
+                self._loaded[name] = load_constituents(path)
+        return list(self._loaded[name])
+
+    def __iter__(self):
+        yield from self._lists
+        yield from (name for name in self._files if name not in self._lists)
+
+    def __len__(self):
+        return len(set(self._lists) | set(self._files))
+
+UNIVERSES = _Universes({"Sensex": SENSEX, "Nifty 50": NIFTY_50}, [UNIVERSE_FILES_DIR, UNIVERSES_DIR])
+
+# Presets for the app; any condition string works with screen()
+PRESET_CONDITIONS = {
+    "RSI oversold (RSI < 30)": "RSI < 30",
+    "RSI overbought (RSI > 70)": "RSI > 70",
+    "Below lower Bollinger Band": "Close < Lower_BB",
+    "Above upper Bollinger Band": "Close > Upper_BB",
+    "SMA 10 crosses above SMA 50": "SMA_10 crosses above SMA_50",
+    "SMA 10 crosses below SMA 50": "SMA_10 crosses below SMA_50",
+    "Stochastic overbought (> 80)": "Stoch > 80",
+    "Stochastic oversold (< 20)": "Stoch < 20",
+}
+
+# Enough bars for SMA_200 plus a settled MACD, without paying for all of history
+HISTORY_DAYS = 500
+
+_CONDITION = re.compile(r"^\s*(\w+)\s*(<=|>=|<|>|crosses\s+above|crosses\s+below)\s*(\S+)\s*$", re.I)
+
+def parse_condition(text):
+    """(column, op, operand) for a condition string; operand is a float or a
+    column name. Raises ValueError for anything else."""
+    m = _CONDITION.match(text)
+    if not m:
+        raise ValueError(f"cannot parse condition {text!r}; expected e.g. 'RSI < 30' "
+                         f"or 'SMA_10 crosses above SMA_50'")
+    column, op, operand = m.groups()
+    op = " ".join(op.lower().split())
+    try:
+        operand = float(operand)
+    except ValueError:
+        pass
+    return column, op, operand
+
+def _operand(latest, operand):
+    return operand if isinstance(operand, float) else latest[operand]
+
+def _evaluate(latest, previous, column, op, operand):
+    lhs, rhs = latest[column], _operand(latest, operand)
+    with np.errstate(invalid="ignore"):
+        if op == "<":
+            return lhs < rhs
+        if op == "<=":
+            return lhs <= rhs
+        if op == ">":
+            return lhs > rhs
+        if op == ">=":
+            return lhs >= rhs
+        prev_lhs, prev_rhs = previous[column], _operand(previous, operand)
+        if op == "crosses above":
+            return (lhs > rhs) & (prev_lhs <= prev_rhs)
+        return (lhs < rhs) & (prev_lhs >= prev_rhs)
+
+def screen(symbols, conditions, match="all", sort_by=None, ascending=True,
+           start_date=None, end_date=None, cache=None, provider=None, chunk_size=256):
+    """Symbols whose latest bar meets the conditions, ranked.
+
+    match='all' keeps symbols meeting every condition, 'any' those meeting
+    at least one (ranked by how many they meet first). Rows are sorted by
+    sort_by, by default the first condition's column. The frame has the
+    last bar's Date and Close, every column a condition mentions, and
+    Matched; attrs['missing'] lists symbols without enough data.
+    """
+    parsed = [parse_condition(c) if isinstance(c, str) else tuple(c) for c in conditions]
+    if not parsed:
+        raise ValueError("no conditions given")
+    if match not in ("all", "any"):
+        raise ValueError(f"match must be 'all' or 'any', not {match!r}")
+    end_date = end_date or date.today() + timedelta(days=1)
+    start_date = start_date or pd.Timestamp(end_date) - pd.Timedelta(days=HISTORY_DAYS)
+    symbols = list(dict.fromkeys(symbols))
+
+    frames = load_ohlcv_many(symbols, start_date, end_date, cache=cache, provider=provider)
+    frames = {s: df for s, df in frames.items() if len(df) >= 2}
+    sort_by = sort_by or parsed[0][0]
+    columns = list(dict.fromkeys(
+        ["Close"] + [c for column, _, operand in parsed for c in (column, operand)
+                     if isinstance(c, str)] + [sort_by]))
+
+    with stage("screen", symbols=len(symbols), conditions=len(parsed)):
+        try:
+            bars = latest_indicators(frames, bars_ago=(0, 1), columns=columns, chunk_size=chunk_size)
+        except KeyError as e:
+            raise ValueError(f"unknown indicator {e.args[0]!r}") from None
+        latest, previous = bars[0], bars[1].reindex(bars[0].index)
+        if latest.empty:
+            latest = pd.DataFrame(columns=["Date"] + columns, index=latest.index, dtype=float)
+            previous = latest
+        hits = pd.DataFrame({f"{c} {op} {o:g}" if isinstance(o, float) else f"{c} {op} {o}":
+                             _evaluate(latest, previous, c, op, o) for c, op, o in parsed},
+                            index=latest.index)
+        matched = hits.sum(axis=1)
+        keep = matched == len(parsed) if match == "all" else matched > 0
+
+        result = latest.loc[keep, ["Date"] + columns].assign(Matched=matched[keep])
+        keys = (["Matched"] if match == "any" else []) + [sort_by]
+        result = result.sort_values(keys, ascending=[False] * (len(keys) - 1) + [ascending],
+                                    kind="stable")
+    result.attrs["missing"] = [s for s in symbols if s not in frames]
+    return result
+
+def paginate(df, page, page_size=25):
+    """(rows on 1-based page, number of pages)."""
+    pages = max(1, -(-len(df) // page_size))
+    page = min(max(1, page), pages)
+    return df.iloc[(page - 1) * page_size:page * page_size], pages
@@ -0,0 +1,123 @@
+"""Persistent store of trained ensembles."""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import joblib
+import pandas as pd
+
+from .cache import CACHE_DIR, _cache_name, _evict_cache_dir
+
+# Bump whenever the layout of train_ensemble()'s result changes.
+MODEL_STORE_VERSION = 5
+
+def model_lineage_key(ticker, feature_columns, models, budget_s=None):
+    """Fingerprint of how a ticker's ensemble is built, without its data:
+    the ticker, the feature list, every model's hyperparameters and the
+    training time budget, if any. An ensemble can be updated to new bars
+    from a stored one with the same lineage."""
+    h = hashlib.sha256(f"v{MODEL_STORE_VERSION}:{ticker}:{budget_s}".encode("utf-8"))
+    h.update(json.dumps(list(feature_columns)).encode("utf-8"))
+    for name, model in sorted(models.items()):
+        h.update(name.encode("utf-8"))
+        h.update(repr(sorted(model.get_params().items())).encode("utf-8"))
+    return h.hexdigest()
+
+def data_digest(df_ml, feature_columns, last_target=True):
+    """Fingerprint of df_ml's feature matrix and target; with
+    last_target=False, of every row's features but not the last Target."""
+    target = df_ml['Target'] if last_target else df_ml['Target'].iloc[:-1]
+    h = hashlib.sha256(pd.util.hash_pandas_object(df_ml[list(feature_columns)], index=True).values.tobytes())
+    h.update(pd.util.hash_pandas_object(target, index=True).values.tobytes())
+    return h.hexdigest()
+
+def model_cache_key(ticker, df_ml, feature_columns, models, budget_s=None):
+    """Fingerprint of everything that affects a trained ensemble: its
+    lineage (see model_lineage_key) and the feature matrix and target."""
+    lineage = model_lineage_key(ticker, feature_columns, models, budget_s)
+    return hashlib.sha256(f"{lineage}:{data_digest(df_ml, feature_columns)}".encode("utf-8")).hexdigest()
+
+class ModelStore:
+    """Persistent store of trained ensembles, evicted least recently used
+    first once it outgrows max_bytes. The most recent entries are also kept
+    in memory so reruns do not unpickle them again."""
+
+    def __init__(self, directory=None, max_bytes=2 * 1024 ** 3, memory_entries=8):
+        self.directory = os.path.join(directory or CACHE_DIR, "models")
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _remember(self, path, entry):
+        with self._lock:
+            self._memory[path] = entry
+            self._memory.move_to_end(path)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, ticker, key):
+        return os.path.join(self.directory, f"{_cache_name(ticker)}-{key[:32]}.joblib")
+
+    def get(self, ticker, key):
+        path = self._path(ticker, key)
+        try:
+            os.utime(path)  # mark as recently used for LRU eviction
+            with self._lock:
+                entry = self._memory.get(path)
+            if entry is None:
+                entry = joblib.load(path)
+        except (OSError, EOFError, ValueError):
+            return None
+        self._remember(path, entry)
+        return entry
+
+    def _latest_path(self, ticker, lineage):
+        return os.path.join(self.directory, f"{_cache_name(ticker)}-latest-{lineage[:32]}.key")
+
+    def latest(self, ticker, lineage):
+        """The most recently stored ensemble of ticker with this lineage
+        (see model_lineage_key), or None."""
+        try:
+            with open(self._latest_path(ticker, lineage)) as f:
+                key = f.read().strip()
+        except OSError:
+            return None
+        return self.get(ticker, key)
+
+    def put(self, ticker, key, entry, lineage=None):
+        path = self._path(ticker, key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        joblib.dump(entry, tmp)
+        os.replace(tmp, path)
+        self._remember(path, entry)
+        if lineage is not None:
+            latest = self._latest_path(ticker, lineage)
+            with open(f"{latest}.{os.getpid()}.tmp", "w") as f:
+                f.write(key)
+            os.replace(f"{latest}.{os.getpid()}.tmp", latest)
+        _evict_cache_dir(self.directory, self.max_bytes, float("inf"))
+
+    def invalidate(self, ticker=None):
+        """Drop every stored ensemble, or only those trained for ticker."""
+        prefix = "" if ticker is None else f"{_cache_name(ticker)}-"
+        with self._lock:
+            for path in [p for p in self._memory if os.path.basename(p).startswith(prefix)]:
+                del self._memory[path]
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix):
+                os.remove(os.path.join(self.directory, name))
+
+_default_store = None
+_default_lock = threading.Lock()
+
+def get_model_store():
+    """The process-wide ModelStore."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ModelStore()
+        return _default_store
@@ -0,0 +1,173 @@
+"""Streaming indicators updated in O(1) per bar."""
+from collections import deque
+
+import numpy as np
+
+from .indicators import _close, _ewm
+
+class _RollingWindow:
+    """Fixed-size window with running sums; re-summed exactly once per
+    window length so floating-point drift cannot accumulate."""
+
+    def __init__(self, window, values=()):
+        self.window = window
+        self.values = deque(values, maxlen=window)
+        self._resum()
+
+    def _resum(self):
+        self.ref = self.values[-1] if self.values else 0.0
+        self.sum = sum(v - self.ref for v in self.values)
+        self.sumsq = sum((v - self.ref) ** 2 for v in self.values)
+        self.positives = sum(v > 0 for v in self.values)
+        self._since_resum = 0
+
+    def push(self, value):
+        if len(self.values) == self.window:
+            old = self.values[0]
+            self.sum -= old - self.ref
+            self.sumsq -= (old - self.ref) ** 2
+            self.positives -= old > 0
+        self.values.append(value)
+        self.sum += value - self.ref
+        self.sumsq += (value - self.ref) ** 2
+        self.positives += value > 0
+        self._since_resum += 1
+        if self._since_resum >= self.window:
+            self._resum()
+
+    @property
+    def full(self):
+        return len(self.values) == self.window
+
+    def mean(self):
+        if not self.full:
+            return np.nan
+        return self.sum / self.window + self.ref
+
+    def std(self):
+        if not self.full:
+            return np.nan
+        var = (self.sumsq - self.sum ** 2 / self.window) / (self.window - 1)
+        return float(np.sqrt(max(var, 0.0)))
+
+class _RollingExtreme:
+    """Rolling min (or max) over the last `window` pushes with a monotonic deque."""
+
+    def __init__(self, window, is_max, values=(), start=0):
+        self.window = window
+        self.sign = -1.0 if is_max else 1.0
+        self.count = start  # position of the next push in the full series
+        self._deque = deque()  # (position, signed value), increasing values
+        for v in values:
+            self.push(v)
+
+    def push(self, value):
+        v = self.sign * value
+        while self._deque and self._deque[-1][1] >= v:
+            self._deque.pop()
+        self._deque.append((self.count, v))
+        self.count += 1
+        if self._deque[0][0] <= self.count - 1 - self.window:
+            self._deque.popleft()
+
+    def value(self):
+        if self.count < self.window:
+            return np.nan
+        return self.sign * self._deque[0][1]
+
+class StreamingIndicators:
+    """RSI, MACD, Bollinger Bands and the stochastic oscillator updated in
+    O(1) per bar, matching compute_rsi/compute_macd/compute_bollinger_bands/
+    compute_stochastic on the same series.
+
+    Seed it with from_history(df), then call update() for every new bar.
+    """
+
+    def __init__(self, rsi_window=14, fast=12, slow=26, signal=9, bb_window=20, stoch_window=14):
+        self.alphas = {span: 2.0 / (span + 1) for span in (fast, slow, signal)}
+        self.fast, self.slow, self.signal = fast, slow, signal
+        self.gains = _RollingWindow(rsi_window)
+        self.losses = _RollingWindow(rsi_window)
+        self.closes = _RollingWindow(bb_window)
+        self.lows = _RollingExtreme(stoch_window, is_max=False)
+        self.highs = _RollingExtreme(stoch_window, is_max=True)
+        self.last_close = None
+        self.ema_fast = self.ema_slow = self.ema_signal = None
+        self.latest = {}
+
+    @classmethod
+    def from_history(cls, df, **windows):
+        """Seed the state from an OHLCV frame using the batch engine."""
+        self = cls(**windows)
+        close = _close(df)
+        high, low = np.asarray(df['High'], dtype=float), np.asarray(df['Low'], dtype=float)
+        if len(close) == 0:
+            return self
+
+        delta = np.diff(close)
+        first = [0.0] if len(close) <= self.gains.window else []
+        gains = first + [max(d, 0.0) for d in delta[-self.gains.window:]]
+        losses = first + [max(-d, 0.0) for d in delta[-self.losses.window:]]
+        self.gains = _RollingWindow(self.gains.window, gains)
+        self.losses = _RollingWindow(self.losses.window, losses)
+        self.closes = _RollingWindow(self.closes.window, close[-self.closes.window:])
+        # Keep the true bar positions so short histories report NaN like the batch.
+        start = max(len(close) - self.lows.window, 0)
+        self.lows = _RollingExtreme(self.lows.window, False, low[start:], start)
+        start = max(len(close) - self.highs.window, 0)
+        self.highs = _RollingExtreme(self.highs.window, True, high[start:], start)
+
+        self.last_close = close[-1]
+        self.ema_fast = _ewm(close, self.fast, False)[-1]
+        self.ema_slow = _ewm(close, self.slow, False)[-1]
+        self.ema_signal = _ewm(_ewm(close, self.fast, False) - _ewm(close, self.slow, False),
+                               self.signal, False)[-1]
+        self.latest = self._snapshot(close[-1])
+        return self
+
+    def _ema(self, prev, value, span):
+        return value if prev is None else prev + self.alphas[span] * (value - prev)
+
+    def update(self, high, low, close):
+        """Add one bar and return the indicator values at that bar."""
+        if self.last_close is None:
+            # The batch RSI treats the undefined first change as no change.
+            self.gains.push(0.0)
+            self.losses.push(0.0)
+        else:
+            delta = close - self.last_close
+            self.gains.push(max(delta, 0.0))
+            self.losses.push(max(-delta, 0.0))
+        self.last_close = close
+        self.closes.push(close)
+        self.lows.push(low)
+        self.highs.push(high)
+
+        self.ema_fast = self._ema(self.ema_fast, close, self.fast)
+        self.ema_slow = self._ema(self.ema_slow, close, self.slow)
+        self.ema_signal = self._ema(self.ema_signal, self.ema_fast - self.ema_slow, self.signal)
+        self.latest = self._snapshot(close)
+        return self.latest
+
+    def _snapshot(self, close):
+        # Windows without a single gain (loss) are exactly zero, as in the batch.
+        gain = np.float64(self.gains.mean() if self.gains.positives else 0.0)
+        loss = np.float64(self.losses.mean() if self.losses.positives else 0.0)
+        if not self.gains.full:
+            gain = loss = np.float64(np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rsi = 100 - 100 / (1 + gain / loss)
+            low, high = self.lows.value(), self.highs.value()
+            stoch = 100 * (close - low) / np.float64(high - low)
+        middle, std = self.closes.mean(), self.closes.std()
+        values = {
+            'RSI': rsi,
+            'MACD': self.ema_fast - self.ema_slow,
+            'MACD_signal': self.ema_signal,
+            'Middle_BB': middle,
+            'Std_Dev': std,
+            'Upper_BB': middle + 2 * std,
+            'Lower_BB': middle - 2 * std,
+            'Stoch': stoch,
+        }
+        return {k: float(v) for k, v in values.items()}
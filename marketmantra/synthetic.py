@@ -0,0 +1,56 @@
+"""Seeded synthetic OHLCV data for benchmarks, load tests and offline runs."""
+import numpy as np
+import pandas as pd
+
+# Business days past this many rows would run beyond pandas' Timestamp range.
+_MAX_DAILY_ROWS = 50_000
+# Minute bars in an NSE session, used to scale daily drift/volatility.
+_MINUTES_PER_DAY = 375
+
+def business_days(start, periods):
+    """Same dates as pd.date_range(start, periods=periods, freq="B"), which
+    pandas generates in a Python loop, built from a vectorized daily range."""
+    days = pd.date_range(start, periods=periods * 7 // 5 + 7, freq="D")
+    return days[days.dayofweek < 5][:periods]
+
+def synthetic_ohlcv(n_rows, seed=0, start="2000-01-03", start_price=100.0,
+                    drift=0.0003, volatility=0.015, freq=None):
+    """A geometric random walk with consistent Open/High/Low/Close/Volume.
+
+    drift and volatility are per trading day. The index is business days, or
+    minutes when n_rows is too long for a daily calendar (override with
+    freq), in which case both are scaled down to minute bars. Same
+    arguments, same frame.
+    """
+    rng = np.random.default_rng(seed)
+    if freq is None:
+        freq = "B" if n_rows <= _MAX_DAILY_ROWS else "min"
+    index = business_days(start, n_rows) if freq == "B" else pd.date_range(start, periods=n_rows, freq=freq)
+    if freq == "min":
+        drift /= _MINUTES_PER_DAY
+        volatility /= np.sqrt(_MINUTES_PER_DAY)
+
+    close = start_price * np.exp(np.cumsum(rng.normal(drift, volatility, n_rows)))
+    open_ = np.empty(n_rows)
+    open_[0] = start_price
+    open_[1:] = close[:-1] * (1 + rng.normal(0, volatility / 4, n_rows - 1))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 2, n_rows)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 2, n_rows)))
+    volume = rng.lognormal(13, 0.5, n_rows).round()
+
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close,
+                         "Volume": volume}, index=index)
+
+def synthetic_panel(n_symbols, n_rows, seed=0, listing_spread=0.2):
+    """{symbol: frame} for n_symbols series on one calendar. Each symbol lists
+    at a random point in the first listing_spread of the calendar, so the
+    panel is ragged at the start the way a real universe is."""
+    rng = np.random.default_rng(seed)
+    panel = {}
+    for i in range(n_symbols):
+        frame = synthetic_ohlcv(n_rows, seed=seed * 100_003 + i,
+                                start_price=float(rng.uniform(20, 2000)),
+                                volatility=float(rng.uniform(0.008, 0.03)))
+        listed = int(rng.integers(0, max(1, int(n_rows * listing_spread))))
+        panel[f"SYN{i:04d}"] = frame.iloc[listed:]
+    return panel
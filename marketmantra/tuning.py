@@ -0,0 +1,238 @@
+"""Offline hyperparameter tuning of the prediction ensemble.
+
+tune() searches each member's SEARCH_SPACE by successive halving. Every
+candidate is scored with the same TimeSeriesSplit as train_ensemble(), first
+on the newest rows only; the best 1/factor of them move on to factor times
+the rows, until the survivors are scored on the whole history. A score is
+the fold accuracy averaged over folds and, when a group of symbols (a
+sector, say) shares one configuration, over the group. The current
+hyperparameters are always a candidate and are never eliminated, so a
+tuned model scores at least as well as the default.
+
+The (candidate, symbol, fold) fits run on a process pool. Each one is
+appended to the TuningStore as it finishes, so an interrupted run resumes
+where it stopped and an unchanged rerun is free. The winners are stored per
+symbol, and load_or_train() builds the ensemble from them.
+
+    tune({"RELIANCE.NS": df_ml})
+    tune({s: frames[s] for s in banks}, scope="Banks")
+"""
+import os
+import json
+import math
+import time
+import hashlib
+import threading
+from datetime import datetime
+
+import pandas as pd
+from joblib import Parallel, delayed, parallel_config
+
+from .cache import CACHE_DIR, _cache_name
+from .features import FEATURE_COLUMNS, feature_matrix
+from .instrument import stage
+from .lazy import lazy_import
+from .models import build_models, build_budget_models, fit_cost, score_split
+
+base = lazy_import("sklearn.base")
+model_selection = lazy_import("sklearn.model_selection")
+
+# Bump whenever the scoring changes, so cached evaluations are not reused.
+TUNING_VERSION = 1
+
+# Sizes (n_estimators) are left alone: they trade time for stability rather
+# than fit, and budgeted training chooses its own.
+SEARCH_SPACE = {
+    "Random Forest": {
+        "max_depth": [4, 6, 8, 10],
+        "min_samples_leaf": [5, 10, 20, 50],
+        "max_features": ["sqrt", "log2", 0.5]},
+    "Gradient Boosting": {
+        "learning_rate": [0.02, 0.05, 0.1],
+        "max_depth": [2, 3, 4, 5],
+        "min_samples_leaf": [1, 20, 50]},
+    "XGBoost": {
+        "max_depth": [3, 4, 5, 6],
+        "learning_rate": [0.01, 0.03, 0.1],
+        "min_child_weight": [1, 5, 10, 20],
+        "subsample": [0.6, 0.8, 1.0],
+        "colsample_bytree": [0.6, 0.8, 1.0]},
+    "Decision Tree": {
+        "max_depth": [3, 4, 6, 8, 10],
+        "min_samples_leaf": [1, 10, 20, 50]},
+}
+
+class TuningStore:
+    """Tuning results on disk: every completed evaluation, appended as it
+    finishes, and the winning hyperparameters of each symbol."""
+
+    def __init__(self, directory=None):
+        self.directory = os.path.join(directory or CACHE_DIR, "tuning")
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, name, kind):
+        return os.path.join(self.directory, f"{_cache_name(name)}.{kind}")
+
+    def evaluations(self, scope):
+        """{evaluation key: score} of every evaluation recorded for scope."""
+        scores = {}
+        try:
+            with open(self._path(scope, "evals.jsonl")) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # cut short by an interrupted run
+                    scores[record["key"]] = record["score"]
+        except OSError:
+            pass
+        return scores
+
+    def record(self, scope, key, score):
+        with self._lock, open(self._path(scope, "evals.jsonl"), "a") as f:
+            f.write(json.dumps({"key": key, "score": score}) + "\n")
+
+    def best(self, symbol):
+        """The stored tuning result for symbol, or None."""
+        try:
+            with open(self._path(symbol, "best.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put_best(self, symbol, result):
+        path = self._path(symbol, "best.json")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(result, f, indent=1)
+        os.replace(tmp, path)
+
+_default_store = None
+_default_lock = threading.Lock()
+
+def get_tuning_store():
+    """The process-wide TuningStore."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = TuningStore()
+        return _default_store
+
+def tuned_models(symbol, budget_s=None, store=None):
+    """build_models() (or build_budget_models() with a budget) with the
+    hyperparameters tuned for symbol, where there are any. A member only
+    takes them if it is the estimator they were tuned on: the budgeted
+    Gradient Boosting (a HistGradientBoostingClassifier) keeps its own."""
+    models = build_models() if budget_s is None else build_budget_models()
+    best = (store or get_tuning_store()).best(symbol)
+    for name, params in (best["params"] if best else {}).items():
+        if name in models and best.get("estimators", {}).get(name) == type(models[name]).__name__:
+            models[name].set_params(**params)
+    return models
+
+def _candidates(name, model, n_candidates, seed):
+    """model's current hyperparameters, then up to n_candidates - 1 others
+    sampled from its search space."""
+    space = SEARCH_SPACE.get(name, {})
+    current = {k: model.get_params()[k] for k in space}
+    n_grid = math.prod(len(values) for values in space.values())
+    sampled = model_selection.ParameterSampler(space, n_iter=min(n_candidates, n_grid), random_state=seed)
+    return [current] + [p for p in sampled if p != current][:n_candidates - 1]
+
+def _folds(n, rows, n_splits):
+    """TimeSeriesSplit of the newest rows of n, as slices of the whole."""
+    offset = n - rows
+    return [(slice(offset + train[0], offset + train[-1] + 1), slice(offset + test[0], offset + test[-1] + 1))
+            for train, test in model_selection.TimeSeriesSplit(n_splits=n_splits).split(range(rows))]
+
+def _data_key(df_ml, rows, n_splits):
+    h = hashlib.sha256(f"v{TUNING_VERSION}:{n_splits}".encode("utf-8"))
+    data = df_ml[FEATURE_COLUMNS + ['Target']].iloc[-rows:]
+    h.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    return h.hexdigest()
+
+def _eval_key(data_key, name, params, fold):
+    return hashlib.sha256(json.dumps([data_key, name, sorted(params.items()), fold],
+                                     default=str).encode("utf-8")).hexdigest()
+
+def _evaluate(key, candidate, model, X, y, train, test):
+    """One (candidate, symbol, fold) job; runs in a worker process."""
+    return key, candidate, score_split(model, X, y, train, test)[0]
+
+def tune(frames, scope=None, store=None, n_candidates=16, factor=3, n_splits=5, min_rows=500,
+         n_workers=None, seed=0, deadline=None):
+    """Successive-halving search for the ensemble's hyperparameters.
+
+    frames maps symbol -> feature frame (add_features); with more than one
+    symbol they share one configuration, stored under each of them and
+    recorded as scope. Stops before a round that would start after
+    deadline (a time.time() value) and returns None; rerunning resumes from
+    the stored evaluations. Otherwise returns the stored result: scope,
+    symbols, tuned_at, rows, and per model the estimator class tuned, the
+    winning params, its score and the default hyperparameters' score, plus
+    counts of evaluations run and reused.
+    """
+    if scope is None:
+        if len(frames) != 1:
+            raise ValueError("tuning several symbols together needs a scope name")
+        scope = next(iter(frames))
+    store = store or get_tuning_store()
+    defaults = build_models()
+    candidates = {name: _candidates(name, model, n_candidates, seed) for name, model in defaults.items()}
+    data = {symbol: (feature_matrix(df[FEATURE_COLUMNS]), df['Target'].to_numpy())
+            for symbol, df in frames.items()}
+    cached = store.evaluations(scope)
+    n_rounds = max(1, math.ceil(math.log(max(len(c) for c in candidates.values()), factor)))
+    survivors = {name: list(range(len(c))) for name, c in candidates.items()}
+    counts = {"evaluations": 0, "reused": 0}
+
+    with stage("tune", symbols=len(frames), candidates=n_candidates), \
+            parallel_config(backend="loky", inner_max_num_threads=1), \
+            Parallel(n_jobs=n_workers or os.cpu_count() or 1, return_as="generator_unordered") as pool:
+        for round_ in range(n_rounds):
+            if deadline is not None and time.time() > deadline:
+                return None
+            scale = factor ** (n_rounds - 1 - round_)
+            scores = {(name, i): [] for name, keep in survivors.items() for i in keep}
+            jobs = []
+            for symbol, (X, y) in data.items():
+                rows = min(len(y), max(min_rows, len(y) // scale))
+                data_key = _data_key(frames[symbol], rows, n_splits)
+                for fold, (train, test) in enumerate(_folds(len(y), rows, n_splits)):
+                    for name, i in scores:
+                        key = _eval_key(data_key, name, candidates[name][i], fold)
+                        if key in cached:
+                            scores[name, i].append(cached[key])
+                            counts["reused"] += 1
+                            continue
+                        model = base.clone(defaults[name]).set_params(**candidates[name][i])
+                        jobs.append((key, (name, i), model, X, y, train, test))
+            jobs.sort(key=lambda job: fit_cost(job[2], job[5].stop - job[5].start), reverse=True)
+
+            for key, candidate, score in pool(delayed(_evaluate)(*job) for job in jobs):
+                store.record(scope, key, score)
+                cached[key] = score
+                scores[candidate].append(score)
+                counts["evaluations"] += 1
+
+            means = {candidate: sum(s) / len(s) for candidate, s in scores.items()}
+            for name, keep in survivors.items():
+                ranked = sorted(keep, key=lambda i: (-means[name, i], i))
+                if round_ < n_rounds - 1:
+                    # The default always goes on, as the baseline of the last round
+                    ranked = ranked[:max(1, math.ceil(len(keep) / factor))]
+                    survivors[name] = sorted(set(ranked) | {0})
+                else:
+                    survivors[name] = ranked
+
+    result = {"scope": scope, "symbols": list(frames), "tuned_at": datetime.now().isoformat(timespec="seconds"),
+              "rows": {symbol: len(y) for symbol, (_, y) in data.items()},
+              "params": {name: candidates[name][keep[0]] for name, keep in survivors.items()},
+              "estimators": {name: type(model).__name__ for name, model in defaults.items()},
+              "scores": {name: means[name, keep[0]] for name, keep in survivors.items()},
+              "default_scores": {name: means[name, 0] for name in survivors},
+              **counts}
+    for symbol in frames:
+        store.put_best(symbol, result)
+    return result
@@ -0,0 +1,92 @@
+"""Vectorized backtests against a bar-by-bar reference loop."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketmantra.backtest import METRICS, backtest_signals, oof_signals
+from marketmantra.roi import TRADING_DAYS
+
+def _signals(n, seed):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2020-01-01", periods=n)
+    return pd.DataFrame({"Prob": rng.uniform(0.3, 0.8, n), "Return": rng.normal(0.0005, 0.015, n)}, index=index)
+
+def reference(signals, threshold, cost, allow_short=False):
+    """One symbol, one threshold, one bar at a time."""
+    value, peak, drawdown, prev = 1.0, 1.0, 0.0, 0.0
+    traded = trades = hits = in_market = 0
+    for prob, ret in zip(signals["Prob"], signals["Return"]):
+        pos = 1.0 if prob > threshold else (-1.0 if allow_short and prob < 1 - threshold else 0.0)
+        change = abs(pos - prev)
+        value *= 1 + pos * ret - change * cost
+        peak = max(peak, value)
+        drawdown = min(drawdown, value / peak - 1)
+        traded += change
+        trades += change > 0
+        in_market += pos != 0
+        hits += pos * ret > 0
+        prev = pos
+    years = len(signals) / TRADING_DAYS
+    return {"Total Return %": (value - 1) * 100,
+            "CAGR %": (value ** (1 / years) - 1) * 100,
+            "Max Drawdown %": drawdown * 100,
+            "Hit Rate %": hits / in_market * 100 if in_market else np.nan,
+            "Turnover": traded / years,
+            "Exposure %": in_market / len(signals) * 100,
+            "Trades": trades,
+            "Buy & Hold %": (np.prod(1 + signals["Return"]) - 1) * 100}
+
+@pytest.mark.parametrize("allow_short", [False, True])
+def test_matches_reference(allow_short):
+    signals = {"A": _signals(500, 1), "B": _signals(180, 2)}
+    thresholds = [0.5, 0.55, 0.7]
+    metrics = backtest_signals(signals, thresholds, cost_bps=10, slippage_bps=5,
+                               allow_short=allow_short)["metrics"]
+    assert list(metrics.columns) == METRICS
+    for symbol, frame in signals.items():
+        for th in thresholds:
+            expected = reference(frame, th, 15e-4, allow_short)
+            for key, value in expected.items():
+                assert metrics.loc[(symbol, th), key] == pytest.approx(value, rel=1e-9, nan_ok=True), key
+
+def test_costs_and_slippage_on_every_change_of_position():
+    signals = {"A": pd.DataFrame({"Prob": [0.9, 0.9, 0.1, 0.9, 0.1], "Return": [0.0] * 5},
+                                 index=pd.bdate_range("2020-01-01", periods=5))}
+    long_only = backtest_signals(signals, [0.5], cost_bps=20, slippage_bps=5)["metrics"].iloc[0]
+    # In, out, in, out: four trades of one unit at 25 bps each
+    assert long_only["Trades"] == 4
+    assert long_only["Total Return %"] == pytest.approx(((1 - 0.0025) ** 4 - 1) * 100)
+    long_short = backtest_signals(signals, [0.5], cost_bps=20, slippage_bps=5, allow_short=True)
+    row = long_short["metrics"].iloc[0]
+    # Flipping long to short trades two units
+    assert row["Turnover"] * 5 / TRADING_DAYS == pytest.approx(1 + 2 + 2 + 2)
+    assert row["Total Return %"] == pytest.approx(((1 - 0.0025) * (1 - 0.005) ** 3 - 1) * 100)
+    free = backtest_signals(signals, [0.5], cost_bps=0, slippage_bps=0)["metrics"].iloc[0]
+    assert free["Total Return %"] == 0
+
+def test_chunking_and_symbol_order_do_not_matter():
+    signals = {f"S{i}": _signals(100 + 37 * i, i) for i in range(7)}
+    signals["EMPTY"] = _signals(0, 0)
+    whole = backtest_signals(signals, chunk_size=64, equity=True)
+    chunked = backtest_signals(signals, chunk_size=2, equity=True)
+    pd.testing.assert_frame_equal(whole["metrics"], chunked["metrics"])
+    assert list(whole["metrics"].index.get_level_values("Symbol").unique()) == [f"S{i}" for i in range(7)]
+    for symbol in whole["equity"]:
+        pd.testing.assert_frame_equal(whole["equity"][symbol], chunked["equity"][symbol])
+    curve = whole["equity"]["S3"]
+    assert curve.index.equals(signals["S3"].index)
+    assert curve.iloc[-1, 0] == pytest.approx(1 + whole["metrics"].loc[("S3", 0.5), "Total Return %"] / 100)
+
+def test_no_signals():
+    metrics = backtest_signals({})["metrics"]
+    assert metrics.empty and list(metrics.columns) == METRICS
+
+def test_oof_signals_pair_each_probability_with_the_next_return():
+    index = pd.bdate_range("2020-01-01", periods=6)
+    df_ml = pd.DataFrame({"Close": [100.0, 110, 99, 99, 120, 60]}, index=index)
+    trained = {"oof_index": np.array([2, 3, 4]),
+               "oof_probs": {"a": np.array([0.2, 0.4, 0.6]), "b": np.array([0.4, 0.6, 0.8])}}
+    signals = oof_signals(df_ml, trained)
+    assert signals.index.equals(index[2:5])
+    np.testing.assert_allclose(signals["Prob"], [0.3, 0.5, 0.7])
+    np.testing.assert_allclose(signals["Return"], [0.0, 120 / 99 - 1, -0.5])
@@ -0,0 +1,105 @@
+"""OHLCVCache range merging and cache directory eviction."""
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from marketmantra.cache import OHLCVCache, _evict_cache_dir
+from marketmantra.synthetic import synthetic_ohlcv
+
+BARS = synthetic_ohlcv(1500, seed=8, start="2015-01-01")
+
+class Source:
+    """fetch() over BARS that records every range asked for."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, symbol, start, end):
+        self.calls.append((pd.Timestamp(start), pd.Timestamp(end)))
+        return BARS[(BARS.index >= start) & (BARS.index < end)]
+
+def expected(start, end):
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    return BARS[(BARS.index >= start) & (BARS.index < end)]
+
+@pytest.fixture
+def cache(tmp_path):
+    return OHLCVCache(str(tmp_path))
+
+def test_miss_then_hit(cache):
+    fetch = Source()
+    first = cache.get("STOCK", "2016-01-01", "2017-01-01", fetch)
+    again = cache.get("STOCK", "2016-03-01", "2016-06-01", fetch)
+    pd.testing.assert_frame_equal(first, expected("2016-01-01", "2017-01-01"), check_freq=False)
+    pd.testing.assert_frame_equal(again, expected("2016-03-01", "2016-06-01"), check_freq=False)
+    assert len(fetch.calls) == 1
+    assert cache.stats() == {"hits": 1, "partial_hits": 0, "misses": 1}
+
+def test_head_and_tail_fetch_only_the_missing_ranges(cache):
+    fetch = Source()
+    cache.get("STOCK", "2016-01-01", "2017-01-01", fetch)
+    assert cache.missing("STOCK", "2015-06-01", "2017-06-01") == [
+        (pd.Timestamp("2015-06-01"), pd.Timestamp("2016-01-01")),
+        (pd.Timestamp("2017-01-01"), pd.Timestamp("2017-06-01"))]
+
+    merged = cache.get("STOCK", "2015-06-01", "2017-06-01", fetch)
+    assert fetch.calls[1:] == [(pd.Timestamp("2015-06-01"), pd.Timestamp("2016-01-01")),
+                               (pd.Timestamp("2017-01-01"), pd.Timestamp("2017-06-01"))]
+    pd.testing.assert_frame_equal(merged, expected("2015-06-01", "2017-06-01"), check_freq=False)
+    assert merged.index.is_unique and merged.index.is_monotonic_increasing
+    # The merged span is now cached as one range
+    assert cache.missing("STOCK", "2015-06-01", "2017-06-01") == []
+    assert cache.stats()["partial_hits"] == 1
+
+def test_symbols_are_cached_apart(cache):
+    fetch = Source()
+    cache.get("^BSESN", "2016-01-01", "2017-01-01", fetch)
+    cache.get("BSESN", "2016-01-01", "2017-01-01", fetch)
+    assert len(fetch.calls) == 2
+
+def test_empty_fetch_is_not_cached(cache):
+    calls = []
+    def empty(symbol, start, end):
+        calls.append(symbol)
+        return BARS.iloc[:0]
+    assert cache.get("GONE", "2016-01-01", "2017-01-01", empty).empty
+    assert cache.get("GONE", "2016-01-01", "2017-01-01", empty).empty
+    assert len(calls) == 2
+
+def _entry(directory, stem, size, used):
+    for ext in (".parquet", ".json"):
+        path = os.path.join(directory, stem + ext)
+        with open(path, "wb") as f:
+            f.write(b"x" * (size // 2))
+        os.utime(path, (used, used))
+
+def test_eviction_drops_least_recently_used_first(tmp_path):
+    now = time.time()
+    for i, stem in enumerate(["oldest", "older", "newest"]):
+        _entry(str(tmp_path), stem, 1000, now - 300 + i * 100)
+    _evict_cache_dir(str(tmp_path), max_bytes=2000, max_age=float("inf"))
+    assert sorted(os.listdir(tmp_path)) == ["newest.json", "newest.parquet", "older.json", "older.parquet"]
+
+def test_eviction_drops_entries_past_max_age(tmp_path):
+    now = time.time()
+    _entry(str(tmp_path), "stale", 100, now - 3 * 86400)
+    _entry(str(tmp_path), "fresh", 100, now)
+    _evict_cache_dir(str(tmp_path), max_bytes=10 ** 9, max_age=86400)
+    assert sorted(os.listdir(tmp_path)) == ["fresh.json", "fresh.parquet"]
+
+def test_reading_an_entry_keeps_it(tmp_path):
+    cache = OHLCVCache(str(tmp_path), max_bytes=10 ** 9)
+    fetch = Source()
+    cache.get("A", "2016-01-01", "2017-01-01", fetch)
+    cache.get("B", "2016-01-01", "2017-01-01", fetch)
+    directory = cache.directory
+    for name in os.listdir(directory):
+        os.utime(os.path.join(directory, name), (time.time() - 1000,) * 2)
+    cache.get("A", "2016-01-01", "2017-01-01", fetch)  # a hit marks A as used
+    size = sum(os.path.getsize(os.path.join(directory, n)) for n in os.listdir(directory))
+    cache.max_bytes = size * 5 // 4  # room for two of the three entries, not all three
+    cache.get("C", "2016-01-01", "2017-01-01", fetch)
+    stems = {n.split("-", 1)[0] for n in os.listdir(directory)}
+    assert "A" in stems and "C" in stems and "B" not in stems
@@ -0,0 +1,163 @@
+"""Bulk downloads: batching, single-flight, retries and the negative TTL."""
+import threading
+
+import pandas as pd
+import pytest
+
+from marketmantra import providers
+from marketmantra.cache import OHLCVCache
+from marketmantra.data import load_ohlcv_many
+from marketmantra.providers import DataProvider, SyntheticProvider, YFinanceProvider, _SingleFlight
+from marketmantra.synthetic import synthetic_ohlcv
+
+START, END = pd.Timestamp("2020-01-01"), pd.Timestamp("2020-07-01")
+
+class FakeYahoo:
+    """yf.download() stand-in: group_by='ticker' frames for the symbols it
+    knows, after failing the first `failures` calls."""
+
+    def __init__(self, known, failures=0):
+        self.known = known
+        self.failures = failures
+        self.calls = []
+
+    def download(self, symbols, start, end, **kwargs):
+        self.calls.append(list(symbols))
+        if len(self.calls) <= self.failures:
+            raise ConnectionError("rate limited")
+        frames = {s: synthetic_ohlcv(200, seed=i, start=start) for i, s in enumerate(symbols) if s in self.known}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+@pytest.fixture
+def yahoo(monkeypatch):
+    def install(known, failures=0):
+        fake = FakeYahoo(known, failures)
+        monkeypatch.setattr(providers, "yf", fake)
+        return fake
+    return install
+
+def provider(**kwargs):
+    p = YFinanceProvider(backoff=0, **kwargs)
+    p._session = object()  # not used by the fake; keeps curl_cffi out of the tests
+    return p
+
+def test_single_flight_shares_one_call():
+    flight = _SingleFlight()
+    lead, follow = flight.claim(["a", "b"])
+    lead2, follow2 = flight.claim(["b", "c"])
+    assert set(lead) == {"a", "b"} and not follow
+    assert set(lead2) == {"c"} and set(follow2) == {"b"}
+    flight.resolve("b", result=1)
+    assert follow2["b"].result() == 1
+    flight.resolve("a", error=KeyError("a"))
+    with pytest.raises(KeyError):
+        lead["a"].result()
+    # Resolved keys are free to be claimed again
+    assert set(flight.claim(["a", "b"])[0]) == {"a", "b"}
+
+def test_concurrent_requests_download_once(yahoo, monkeypatch):
+    fake = yahoo({"A.NS", "B.NS"})
+    release = threading.Event()
+    download = fake.download
+    def slow(*args, **kwargs):
+        release.wait(5)
+        return download(*args, **kwargs)
+    monkeypatch.setattr(fake, "download", slow)
+    p = provider()
+    claims = []
+    claim = p._flight.claim
+    def counted(keys):
+        result = claim(keys)
+        claims.append(keys)
+        if len(claims) == 4:
+            release.set()  # every caller has joined the flight
+        return result
+    monkeypatch.setattr(p._flight, "claim", counted)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(p.fetch_many(["A.NS", "B.NS"], START, END)))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(fake.calls) == 1 and sorted(fake.calls[0]) == ["A.NS", "B.NS"]
+    assert all(r["A.NS"].equals(results[0]["A.NS"]) and not r["A.NS"].empty for r in results)
+
+def test_failed_batches_are_retried(yahoo):
+    fake = yahoo({"A.NS"}, failures=2)
+    frames = provider(retries=2).fetch_many(["A.NS"], START, END)
+    assert len(fake.calls) == 3 and not frames["A.NS"].empty
+
+def test_errors_surface_after_the_last_retry(yahoo):
+    yahoo({"A.NS"}, failures=5)
+    with pytest.raises(ConnectionError):
+        provider(retries=1).fetch_many(["A.NS"], START, END)
+
+def test_empty_symbols_are_retried_then_held_back(yahoo):
+    fake = yahoo({"A.NS"})
+    p = provider(retries=2, negative_ttl=300)
+    frames = p.fetch_many(["A.NS", "GONE.NS"], START, END)
+    assert frames["GONE.NS"].empty and not frames["A.NS"].empty
+    # Only the empty symbol is retried, until the retries run out
+    assert fake.calls == [["A.NS", "GONE.NS"], ["GONE.NS"], ["GONE.NS"]]
+    # Within the negative TTL it is asked for once more, not retried
+    fake.calls.clear()
+    p.fetch_many(["GONE.NS"], START, END)
+    assert fake.calls == [["GONE.NS"]]
+
+def test_negative_ttl_is_shared_across_threads(yahoo):
+    fake = yahoo({"A.NS"})
+    p = provider(retries=1, negative_ttl=300)
+    # Different ranges, so every thread downloads rather than joining a flight
+    ranges = [(START + pd.Timedelta(days=i), END) for i in range(8)]
+    errors = []
+    def fetch(start, end):
+        try:
+            p.fetch_many(["A.NS", "GONE.NS"], start, end)
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+    threads = [threading.Thread(target=fetch, args=r) for r in ranges]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors and set(p._empty_since) == {"GONE.NS"}
+    fake.calls.clear()
+    p.fetch_many(["GONE.NS"], START - pd.Timedelta(days=1), END)
+    assert fake.calls == [["GONE.NS"]]
+
+def test_empty_future_ranges_are_not_retried(yahoo):
+    fake = yahoo(set())
+    today = pd.Timestamp.today().normalize()
+    provider(retries=2).fetch_many(["A.NS"], today, today + pd.Timedelta(days=5))
+    assert len(fake.calls) == 1
+
+class CountingProvider(DataProvider):
+    cache_namespace = "counting"
+
+    def __init__(self):
+        self.source = SyntheticProvider()
+        self.batches = []
+
+    def fetch(self, symbol, start, end):
+        self.batches.append([symbol])
+        return self.source.fetch(symbol, start, end)
+
+    def fetch_many(self, symbols, start, end):
+        self.batches.append(list(symbols))
+        return {s: self.source.fetch(s, start, end) for s in symbols}
+
+def test_load_ohlcv_many_batches_by_missing_range(tmp_path):
+    cache, p = OHLCVCache(str(tmp_path)), CountingProvider()
+    load_ohlcv_many(["A"], "2019-01-01", END, cache=cache, provider=p)
+    p.batches.clear()
+    frames = load_ohlcv_many(["A", "B", "C"], START, END, cache=cache, provider=p)
+    # A is cached; B and C miss the same range and come in one request
+    assert p.batches == [["B", "C"]]
+    for symbol, df in frames.items():
+        pd.testing.assert_frame_equal(df, p.source.fetch(symbol, START, END), check_freq=False)
+    p.batches.clear()
+    load_ohlcv_many(["A", "B", "C"], START, END, cache=cache, provider=p)
+    assert p.batches == []
@@ -0,0 +1,61 @@
+"""FeatureCache: shared indicator and feature frames keyed by frame contents."""
+import threading
+
+import pandas as pd
+
+from marketmantra.features import FeatureCache, add_features
+from marketmantra.indicators import compute_indicators
+from marketmantra.synthetic import synthetic_ohlcv
+
+def test_results_match_the_uncached_functions():
+    df = synthetic_ohlcv(600, seed=1)
+    cache = FeatureCache()
+    pd.testing.assert_frame_equal(cache.indicators(df), compute_indicators(df))
+    pd.testing.assert_frame_equal(cache.features(df), add_features(df, compute_indicators(df)))
+
+def test_hits_on_equal_contents_not_identity():
+    df = synthetic_ohlcv(600, seed=1)
+    cache = FeatureCache()
+    first = cache.features(df)
+    assert cache.features(df.copy()) is first
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2}  # features computed the indicators
+
+    changed = df.copy()
+    changed.iloc[-1, changed.columns.get_loc("Close")] += 1.0
+    assert cache.features(changed) is not first
+    assert cache.stats()["entries"] == 2
+
+def test_evicts_least_recently_used_frames():
+    frames = [synthetic_ohlcv(300, seed=s) for s in range(3)]
+    cache = FeatureCache(max_entries=2)
+    kept = cache.indicators(frames[0])
+    cache.indicators(frames[1])
+    cache.indicators(frames[0])  # frames[1] is now the least recently used
+    cache.indicators(frames[2])
+    assert cache.stats()["entries"] == 2
+    assert cache.indicators(frames[0]) is kept
+    misses = cache.stats()["misses"]
+    cache.indicators(frames[1])
+    assert cache.stats()["misses"] == misses + 1
+
+def test_concurrent_warming():
+    frames = [synthetic_ohlcv(400, seed=s) for s in range(4)]
+    cache = FeatureCache(max_entries=8)
+    errors = []
+
+    def warm():
+        try:
+            for df in frames:
+                cache.features(df)
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=warm) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert cache.stats()["entries"] == 4
+    for df in frames:
+        pd.testing.assert_frame_equal(cache.features(df), add_features(df, compute_indicators(df)))
@@ -0,0 +1,93 @@
+"""The NumPy indicator engine against the pandas rolling/ewm definitions it replaced."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketmantra.indicators import (compute_rsi, compute_macd, compute_stochastic,
+                                     compute_bollinger_bands)
+from marketmantra.synthetic import synthetic_ohlcv
+
+def _flat(n_rows, price=100.0):
+    index = pd.bdate_range("2020-01-01", periods=n_rows)
+    return pd.DataFrame({"Open": price, "High": price, "Low": price, "Close": price,
+                         "Volume": 1e6}, index=index)
+
+def _flat_stretch():
+    # Moves, then a flat stretch longer than every window, then moves again
+    df = synthetic_ohlcv(300, seed=3)
+    df.iloc[100:160] = df.iloc[100].to_numpy()
+    df.iloc[100:160, df.columns.get_indexer(["High", "Low"])] = df["Close"].iloc[100]
+    return df
+
+FRAMES = {"random walk": lambda: synthetic_ohlcv(500, seed=7),
+          "short": lambda: synthetic_ohlcv(10, seed=1),
+          "flat": lambda: _flat(120),
+          "flat stretch": _flat_stretch}
+
+def reference_rsi(df, window=14):
+    delta = df['Close'].diff()
+    gain = delta.where(delta > 0, 0.0).rolling(window).mean()
+    loss = (-delta.where(delta < 0, 0.0)).rolling(window).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+def reference_macd(df, fast=12, slow=26, signal=9):
+    macd_line = df['Close'].ewm(span=fast, adjust=False).mean() - df['Close'].ewm(span=slow, adjust=False).mean()
+    return macd_line, macd_line.ewm(span=signal, adjust=False).mean()
+
+def reference_stochastic(df, window=14):
+    low_min = df['Low'].rolling(window=window).min()
+    high_max = df['High'].rolling(window=window).max()
+    return 100 * (df['Close'] - low_min) / (high_max - low_min)
+
+def reference_bollinger(df, window=20):
+    middle = df['Close'].rolling(window=window).mean()
+    std = df['Close'].rolling(window=window).std()
+    return pd.DataFrame({'Middle_BB': middle, 'Std_Dev': std,
+                         'Upper_BB': middle + 2 * std, 'Lower_BB': middle - 2 * std})
+
+def assert_close(actual, expected):
+    # Same NaN positions (warm-up rows, 0/0), same values elsewhere
+    pd.testing.assert_series_equal(actual, expected, check_names=False, rtol=1e-9, atol=1e-9)
+
+@pytest.fixture(params=list(FRAMES))
+def ohlcv(request):
+    return FRAMES[request.param]()
+
+def test_rsi(ohlcv):
+    assert_close(compute_rsi(ohlcv), reference_rsi(ohlcv))
+    assert_close(compute_rsi(ohlcv, window=5), reference_rsi(ohlcv, window=5))
+
+def test_macd(ohlcv):
+    macd, signal = compute_macd(ohlcv)
+    expected_macd, expected_signal = reference_macd(ohlcv)
+    assert_close(macd, expected_macd)
+    assert_close(signal, expected_signal)
+
+def test_stochastic(ohlcv):
+    assert_close(compute_stochastic(ohlcv), reference_stochastic(ohlcv))
+
+def test_bollinger_bands(ohlcv):
+    bands = compute_bollinger_bands(ohlcv)
+    pd.testing.assert_frame_equal(bands[list(ohlcv.columns)], ohlcv)
+    expected = reference_bollinger(ohlcv)
+    for column in expected:
+        assert_close(bands[column], expected[column])
+
+def test_warm_up_rows_are_nan():
+    df = synthetic_ohlcv(60, seed=2)
+    # The first bar has no change, which the reference counts as neither gain nor loss
+    assert compute_rsi(df).iloc[:13].isna().all() and compute_rsi(df).iloc[13:].notna().all()
+    assert compute_stochastic(df).iloc[:13].isna().all() and compute_stochastic(df).iloc[13:].notna().all()
+    bands = compute_bollinger_bands(df)
+    assert bands['Std_Dev'].iloc[:19].isna().all() and bands['Std_Dev'].iloc[19:].notna().all()
+
+def test_flat_prices():
+    df = _flat(60)
+    # No gains and no losses: 0/0, undefined as in pandas
+    assert compute_rsi(df).isna().all()
+    assert compute_stochastic(df).isna().all()
+    bands = compute_bollinger_bands(df)
+    assert (bands['Std_Dev'].iloc[19:] == 0).all()
+    assert (bands['Upper_BB'].iloc[19:] == 100.0).all()
+    macd, signal = compute_macd(df)
+    assert np.allclose(macd, 0, atol=1e-9) and np.allclose(signal, 0, atol=1e-9)
@@ -0,0 +1,39 @@
+"""Cross-validation results must not depend on how the fits are spread out."""
+import numpy as np
+import pytest
+
+from marketmantra.features import FEATURE_COLUMNS, add_features
+from marketmantra.models import build_models, parallel_cross_validate
+from marketmantra.synthetic import synthetic_ohlcv
+
+@pytest.fixture(scope="module")
+def small_problem():
+    df_ml = add_features(synthetic_ohlcv(700, seed=9))
+    models = build_models()
+    for model in models.values():
+        if "n_estimators" in model.get_params():
+            model.set_params(n_estimators=20)
+    return models, df_ml[FEATURE_COLUMNS], df_ml['Target']
+
+def test_worker_count_does_not_change_results(small_problem):
+    models, features, target = small_problem
+    serial_scores, (serial_index, serial_oof), _ = parallel_cross_validate(
+        models, features, target, n_workers=1, n_threads=1)
+    pooled_scores, (pooled_index, pooled_oof), _ = parallel_cross_validate(
+        models, features, target, n_workers=2, n_threads=1)
+
+    assert serial_scores == pooled_scores
+    np.testing.assert_array_equal(serial_index, pooled_index)
+    assert list(serial_oof) == list(models)
+    for name in models:
+        np.testing.assert_array_equal(serial_oof[name], pooled_oof[name])
+
+def test_oof_covers_every_test_fold(small_problem):
+    models, features, target = small_problem
+    scores, (index, oof), timings = parallel_cross_validate(models, features, target, n_workers=1)
+    assert all(len(s) == 5 for s in scores.values())
+    n_test = len(features) // 6  # TimeSeriesSplit(5): six equal blocks, the first only trains
+    np.testing.assert_array_equal(index, np.arange(len(features) - len(index), len(features)))
+    assert len(index) >= 5 * n_test
+    assert all(len(p) == len(index) for p in oof.values())
+    assert len(timings) == 5 * len(models)
@@ -0,0 +1,73 @@
+"""Monte Carlo projections against their closed forms."""
+import numpy as np
+import pytest
+from scipy import stats
+
+from marketmantra.montecarlo import PERCENTILES, project_growth
+from marketmantra.roi import TRADING_DAYS
+
+@pytest.fixture(scope="module")
+def returns():
+    return np.random.default_rng(0).normal(0.0004, 0.012, 2500)
+
+def test_same_seed_same_projection(returns):
+    a = project_growth(returns, 1000, years=2, n_paths=5000, seed=3)
+    b = project_growth(returns, 1000, years=2, n_paths=5000, seed=3)
+    assert a["final"] == b["final"] and a["prob_loss"] == b["prob_loss"]
+    assert a["final"] != project_growth(returns, 1000, years=2, n_paths=5000, seed=4)["final"]
+
+def test_bands_start_at_the_investment_and_are_ordered(returns):
+    result = project_growth(returns, 1000, years=3, n_paths=5000, seed=0)
+    bands = result["bands"]
+    assert list(bands.columns) == [f"P{q}" for q in PERCENTILES]
+    assert bands.index[0] == 0 and (bands.iloc[0] == 1000).all()
+    assert len(bands) == 3 * 12 + 1 and bands.index[-1] == pytest.approx(3, abs=0.01)
+    assert (np.diff(bands.to_numpy(), axis=1) >= 0).all()
+
+@pytest.mark.parametrize("method", ["bootstrap", "parametric"])
+def test_constant_returns_are_deterministic(method):
+    result = project_growth(np.full(100, 0.001), 1000, years=1, n_paths=1000, method=method, seed=0)
+    expected = 1000 * 1.001 ** TRADING_DAYS
+    for value in result["final"].values():
+        assert value == pytest.approx(expected, rel=1e-4)
+    assert result["prob_loss"] == 0
+    assert result["mean_final"] == pytest.approx(expected, rel=1e-4)
+
+@pytest.mark.parametrize("method", ["bootstrap", "parametric"])
+def test_matches_lognormal_closed_form(returns, method):
+    years, days = 5, 5 * TRADING_DAYS
+    log_r = np.log1p(returns)
+    mu, sigma = log_r.mean() * days, log_r.std(ddof=1) * np.sqrt(days)
+    result = project_growth(returns, 1000, years=years, n_paths=40_000, method=method, seed=1)
+    for q, value in result["final"].items():
+        expected = 1000 * np.exp(mu + sigma * stats.norm.ppf(q / 100))
+        assert value == pytest.approx(expected, rel=0.02), q
+    assert result["prob_loss"] == pytest.approx(stats.norm.cdf(-mu / sigma) * 100, abs=1.0)
+    assert result["mean_final"] == pytest.approx(1000 * np.exp(mu + sigma ** 2 / 2), rel=0.02)
+    assert result["median_cagr"] == pytest.approx((np.exp(mu / years) - 1) * 100, abs=0.3)
+
+def test_bootstrap_keeps_the_skew():
+    # Mostly calm days and rare crashes: log growth is skewed to the left,
+    # which the bootstrap keeps and a normal fit with the same moments cannot
+    rng = np.random.default_rng(2)
+    returns = np.where(rng.random(5000) < 0.01, -0.08, rng.normal(0.0012, 0.004, 5000))
+    boot = project_growth(returns, 1000, years=1, n_paths=20_000, method="bootstrap", seed=0)["final"]
+    normal = project_growth(returns, 1000, years=1, n_paths=20_000, method="parametric", seed=0)["final"]
+    assert boot[5] < normal[5] and boot[95] < normal[95]
+    assert boot[50] > normal[50]
+
+def test_bootstrap_keeps_runs_of_returns():
+    # Half-year up and down regimes: a month is mostly one or the other, so
+    # monthly blocks spread far wider than independent days with the same moments
+    log_r = np.tile(np.r_[np.full(126, 0.005), np.full(126, -0.005)], 8)
+    boot = project_growth(np.expm1(log_r), 1000, years=1, n_paths=20_000, method="bootstrap", seed=0)["final"]
+    normal = project_growth(np.expm1(log_r), 1000, years=1, n_paths=20_000, method="parametric", seed=0)["final"]
+    assert np.log(boot[95] / boot[5]) > 2.5 * np.log(normal[95] / normal[5])
+
+def test_rejects_bad_input(returns):
+    with pytest.raises(ValueError):
+        project_growth([0.01], 1000)
+    with pytest.raises(ValueError):
+        project_growth([np.nan, np.inf, -1.5, 0.01], 1000)
+    with pytest.raises(ValueError):
+        project_growth(returns, 1000, method="garch")
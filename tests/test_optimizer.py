@@ -0,0 +1,91 @@
+"""Mean-variance optimizer against scipy's SLSQP on the same problem."""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import optimize
+from sklearn import covariance
+
+from marketmantra.optimizer import _project_simplex, ledoit_wolf, optimize_returns
+from marketmantra.roi import RISK_FREE_RATE, TRADING_DAYS
+
+def _returns(n_assets, n_days=750, seed=0):
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(0.0003, 0.01, (n_days, 1))
+    betas = rng.uniform(0.3, 1.5, n_assets)
+    drift = rng.uniform(-0.0002, 0.001, n_assets)
+    noise = rng.normal(0, rng.uniform(0.005, 0.02, n_assets), (n_days, n_assets))
+    return pd.DataFrame(drift + factor * betas + noise, columns=[f"S{i}" for i in range(n_assets)])
+
+def _problem(returns):
+    mu = returns.mean().to_numpy() * TRADING_DAYS
+    cov = ledoit_wolf(returns.to_numpy())[0] * TRADING_DAYS
+    return mu, cov
+
+def _slsqp(objective, n, constraints=()):
+    simplex = [{"type": "eq", "fun": lambda w: w.sum() - 1}, *constraints]
+    result = optimize.minimize(objective, np.full(n, 1 / n), method="SLSQP", bounds=[(0, 1)] * n,
+                               constraints=simplex, options={"ftol": 1e-14, "maxiter": 1000})
+    assert result.success, result.message
+    return result.x
+
+def test_ledoit_wolf_matches_sklearn():
+    x = _returns(12, n_days=60).to_numpy()
+    cov, shrinkage = ledoit_wolf(x)
+    expected_cov, expected_shrinkage = covariance.ledoit_wolf(x)
+    np.testing.assert_allclose(cov, expected_cov, rtol=1e-10)
+    assert shrinkage == pytest.approx(expected_shrinkage)
+
+def test_project_simplex():
+    v = np.random.default_rng(1).normal(0, 1, (50, 7))
+    w = _project_simplex(v)
+    assert (w >= 0).all()
+    np.testing.assert_allclose(w.sum(axis=1), 1)
+    for row, projected in zip(v[:5], w[:5]):
+        expected = _slsqp(lambda x: ((x - row) ** 2).sum(), len(row))
+        np.testing.assert_allclose(projected, expected, atol=1e-6)
+
+@pytest.mark.parametrize("n_assets", [3, 8, 20])
+def test_matches_slsqp(n_assets):
+    returns = _returns(n_assets, seed=n_assets)
+    mu, cov = _problem(returns)
+    result = optimize_returns(returns, n_points=20)
+    variance = lambda w: w @ cov @ w
+
+    min_vol = _slsqp(variance, n_assets)
+    assert result["min_volatility"]["Volatility %"] == pytest.approx(np.sqrt(variance(min_vol)) * 100, rel=1e-5)
+
+    neg_sharpe = lambda w: -(w @ mu - RISK_FREE_RATE) / np.sqrt(variance(w))
+    best = _slsqp(neg_sharpe, n_assets)
+    assert result["max_sharpe"]["Sharpe Ratio"] == pytest.approx(-neg_sharpe(best), rel=1e-4)
+    assert result["max_sharpe"]["Sharpe Ratio"] >= -neg_sharpe(best) - 1e-6
+
+    # Every frontier point is the least-volatile portfolio for its return
+    weights = result["weights"].to_numpy()
+    assert (weights >= -1e-12).all()
+    np.testing.assert_allclose(weights.sum(axis=1), 1)
+    for w in weights[1::4]:
+        target = w @ mu
+        expected = _slsqp(variance, n_assets, [{"type": "eq", "fun": lambda x, t=target: x @ mu - t}])
+        assert np.sqrt(variance(w)) == pytest.approx(np.sqrt(variance(expected)), rel=1e-4)
+
+def test_frontier_runs_from_min_volatility_to_max_return():
+    returns = _returns(6)
+    mu, _ = _problem(returns)
+    frontier = optimize_returns(returns, n_points=15)["frontier"]
+    assert len(frontier) == 15
+    assert (np.diff(frontier["Return %"]) > -1e-9).all()
+    assert (np.diff(frontier["Volatility %"]) > -1e-9).all()
+    assert frontier["Return %"].iloc[-1] == pytest.approx(mu.max() * 100, rel=1e-3)
+
+def test_warm_start_gives_the_same_frontier():
+    returns = _returns(10)
+    cold = optimize_returns(returns, n_points=20)
+    moved = optimize_returns(returns.iloc[5:], n_points=20)
+    warm = optimize_returns(returns.iloc[5:], n_points=20, warm_start=cold["weights"].iloc[10].to_numpy())
+    np.testing.assert_allclose(warm["frontier"].to_numpy(), moved["frontier"].to_numpy(), rtol=1e-5)
+
+def test_needs_two_holdings():
+    with pytest.raises(ValueError):
+        optimize_returns(_returns(1))
+    with pytest.raises(ValueError):
+        optimize_returns(_returns(3).iloc[:1])
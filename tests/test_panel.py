@@ -0,0 +1,50 @@
+"""Panel indicators and features against the single-symbol functions."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketmantra.features import add_features
+from marketmantra.indicators import compute_indicators
+from marketmantra.panel import add_features_panel, compute_indicators_panel
+from marketmantra.synthetic import synthetic_ohlcv, synthetic_panel
+
+def ragged_frames():
+    frames = synthetic_panel(7, 900, seed=5, listing_spread=0.6)
+    # Misaligned calendars: holidays of its own, a late listing and a delisting
+    gappy = synthetic_ohlcv(900, seed=21)
+    frames["GAPS"] = gappy.drop(gappy.index[np.random.default_rng(0).choice(900, 120, replace=False)])
+    frames["LATE"] = synthetic_ohlcv(400, seed=22, start="2002-06-03")
+    frames["DELISTED"] = synthetic_ohlcv(900, seed=23).iloc[:350]
+    frames["SHORT"] = synthetic_ohlcv(40, seed=24)  # fewer bars than SMA_50 needs
+    frames["EMPTY"] = synthetic_ohlcv(10, seed=25).iloc[:0]
+    return frames
+
+def assert_same(actual, expected):
+    pd.testing.assert_frame_equal(actual, expected, rtol=1e-9, atol=1e-9)
+
+def test_single_symbol_features():
+    df = synthetic_ohlcv(1200, seed=4)
+    panel = add_features_panel({"ONE": df})
+    assert list(panel) == ["ONE"]
+    assert_same(panel["ONE"], add_features(df))
+
+def test_single_symbol_indicators():
+    df = synthetic_ohlcv(1200, seed=4)
+    assert_same(compute_indicators_panel({"ONE": df})["ONE"], compute_indicators(df))
+
+@pytest.mark.parametrize("chunk_size", [64, 3])
+def test_ragged_histories(chunk_size):
+    frames = ragged_frames()
+    features = add_features_panel(frames, chunk_size=chunk_size)
+    indicators = compute_indicators_panel(frames, chunk_size=chunk_size)
+    expected = [s for s in frames if len(frames[s])]
+    assert list(features) == expected and list(indicators) == expected
+    for symbol in expected:
+        assert_same(features[symbol], add_features(frames[symbol]))
+        assert_same(indicators[symbol], compute_indicators(frames[symbol]))
+    assert features["SHORT"].empty
+
+def test_extra_columns_with_gaps():
+    df = synthetic_ohlcv(600, seed=6)
+    df["Dividend"] = np.where(np.arange(600) % 50 == 0, np.nan, 0.0)
+    assert_same(add_features_panel({"DIV": df})["DIV"], add_features(df))
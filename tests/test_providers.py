@@ -0,0 +1,91 @@
+"""Data providers: the normalized frame, local files and synthetic bars."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketmantra.data import load_ohlcv
+from marketmantra.providers import (OHLCV_COLUMNS, LocalProvider, SyntheticProvider, YFinanceProvider,
+                                    normalize_ohlcv, provider_from_spec)
+from marketmantra.synthetic import synthetic_ohlcv
+
+def assert_normalized(df):
+    assert list(df.columns) == OHLCV_COLUMNS
+    assert (df.dtypes == np.float64).all()
+    assert isinstance(df.index, pd.DatetimeIndex) and df.index.name == "Date" and df.index.tz is None
+    assert df.index.is_unique and df.index.is_monotonic_increasing
+
+def test_normalize_ohlcv():
+    bars = synthetic_ohlcv(30, seed=1)
+    raw = bars.iloc[::-1].copy()
+    raw["Adj Close"] = raw["Close"]
+    raw.index = raw.index.tz_localize("Asia/Kolkata")
+    raw.columns = pd.MultiIndex.from_product([raw.columns, ["TCS.NS"]])
+    raw = pd.concat([raw, raw.iloc[:2]])  # duplicate dates
+    df = normalize_ohlcv(raw)
+    assert_normalized(df)
+    np.testing.assert_array_equal(df.to_numpy(), bars.to_numpy())
+
+def test_normalize_empty_and_incomplete():
+    empty = normalize_ohlcv(pd.DataFrame())
+    assert_normalized(empty)
+    assert empty.empty
+    with pytest.raises(ValueError, match="Volume"):
+        normalize_ohlcv(synthetic_ohlcv(5).drop(columns="Volume"))
+
+@pytest.mark.parametrize("ext", ["csv", "parquet"])
+def test_local_provider(tmp_path, ext):
+    bars = synthetic_ohlcv(300, seed=2, start="2020-01-01").rename_axis("Date")
+    path = os.path.join(tmp_path, f"TCS.NS.{ext}")
+    if ext == "csv":
+        bars.to_csv(path)
+    else:
+        bars.to_parquet(path)
+    provider = LocalProvider(str(tmp_path))
+
+    df = provider.fetch("TCS.NS", "2020-03-01", "2020-06-01")
+    assert_normalized(df)
+    expected = bars[(bars.index >= "2020-03-01") & (bars.index < "2020-06-01")]
+    np.testing.assert_allclose(df.to_numpy(), expected.to_numpy())
+    assert df.index.equals(pd.DatetimeIndex(expected.index, name="Date"))
+    assert provider.fetch("INFY.NS", "2020-03-01", "2020-06-01").empty
+
+def test_local_provider_rereads_edited_files(tmp_path):
+    path = os.path.join(tmp_path, "A.csv")
+    synthetic_ohlcv(50, seed=3, start="2020-01-01").rename_axis("Date").to_csv(path)
+    provider = LocalProvider(str(tmp_path))
+    assert len(provider.fetch("A", "2020-01-01", "2021-01-01")) == 50
+    synthetic_ohlcv(80, seed=3, start="2020-01-01").rename_axis("Date").to_csv(path)
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert len(provider.fetch("A", "2020-01-01", "2021-01-01")) == 80
+
+def test_local_provider_bypasses_the_cache(tmp_path):
+    synthetic_ohlcv(50, seed=3, start="2020-01-01").rename_axis("Date").to_csv(os.path.join(tmp_path, "A.csv"))
+    class NoCache:
+        def get(self, *args):
+            raise AssertionError("local bars must not be cached")
+    assert len(load_ohlcv("A", "2020-01-01", "2021-01-01", cache=NoCache(),
+                          provider=LocalProvider(str(tmp_path)))) == 50
+
+def test_synthetic_provider_is_deterministic_and_stops_today():
+    a, b = SyntheticProvider(seed=1), SyntheticProvider(seed=1)
+    first = a.fetch("X", "2010-01-01", "2011-01-01")
+    assert_normalized(first)
+    pd.testing.assert_frame_equal(first, b.fetch("X", "2010-01-01", "2011-01-01"))
+    # A bar's value does not depend on the range asked for
+    pd.testing.assert_frame_equal(first.loc["2010-06-01":"2010-06-30"],
+                                  a.fetch("X", "2010-06-01", "2010-07-01"), check_freq=False)
+    assert not first.equals(a.fetch("Y", "2010-01-01", "2011-01-01"))
+    assert not first.equals(SyntheticProvider(seed=2).fetch("X", "2010-01-01", "2011-01-01"))
+    future = a.fetch("X", "2020-01-01", "2040-01-01")
+    assert future.index[-1] <= pd.Timestamp.today().normalize()
+
+def test_provider_from_spec(tmp_path):
+    assert isinstance(provider_from_spec(None), YFinanceProvider)
+    assert isinstance(provider_from_spec("yfinance"), YFinanceProvider)
+    assert provider_from_spec("synthetic:7").seed == 7
+    assert provider_from_spec(f"local:{tmp_path}").directory == str(tmp_path)
+    for bad in ["local:/does/not/exist", "local", "stooq"]:
+        with pytest.raises(ValueError):
+            provider_from_spec(bad)
@@ -0,0 +1,93 @@
+"""Downsampling and the chart render cache."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketmantra.render import RenderCache, chart_key, lttb, minmax, render_png, thin
+
+def _walk(n, seed=0):
+    return np.cumsum(np.random.default_rng(seed).normal(0, 1, n))
+
+@pytest.mark.parametrize("n, n_out", [(10_000, 500), (1_001, 1_000), (50, 3)])
+def test_lttb_keeps_endpoints_and_count(n, n_out):
+    y = _walk(n)
+    idx = lttb(np.arange(n), y, n_out)
+    assert len(idx) == n_out
+    assert idx[0] == 0 and idx[-1] == n - 1
+    assert (np.diff(idx) > 0).all()
+
+def test_lttb_keeps_spikes():
+    y = np.sin(np.linspace(0, 20, 20_000))
+    y[7_321], y[15_002] = 50.0, -50.0
+    idx = lttb(np.arange(len(y)), y, 300)
+    assert 7_321 in idx and 15_002 in idx
+    # The envelope survives: the thinned series spans the same range
+    assert y[idx].max() == y.max() and y[idx].min() == y.min()
+
+def test_lttb_short_input_is_untouched():
+    np.testing.assert_array_equal(lttb(np.arange(5), np.arange(5.0), 10), np.arange(5))
+
+def test_minmax_keeps_every_bucket_extreme():
+    y = _walk(10_000, seed=1)
+    y[[1234, 8765]] = np.nan
+    idx = minmax(y, 200)
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert (np.diff(idx) > 0).all() and len(idx) <= 202
+    assert np.nanargmax(y) in idx and np.nanargmin(y) in idx
+    size = -(-len(y) // 100)
+    for start in range(0, len(y), size):
+        block = y[start:start + size]
+        assert start + np.nanargmax(block) in idx and start + np.nanargmin(block) in idx
+
+def test_thin_series_and_frames():
+    index = pd.bdate_range("2000-01-03", periods=5_000)
+    close = pd.Series(_walk(5_000) + 100, index=index, name="Close")
+    thinned = thin(close, n_out=400)
+    assert len(thinned) == 400 and thinned.index[0] == index[0] and thinned.index[-1] == index[-1]
+    assert thinned.name == "Close" and (thinned == close.loc[thinned.index]).all()
+
+    frame = pd.DataFrame({"Close": close, "SMA": close.rolling(50).mean()})
+    rows = thin(frame, n_out=400, method="minmax")
+    assert list(rows.columns) == ["Close", "SMA"] and rows.index.isin(index).all()
+    assert close.idxmax() in rows.index and close.idxmin() in rows.index
+    short = close.iloc[:300]
+    assert thin(short, n_out=400) is short
+    with pytest.raises(ValueError):
+        thin(close, n_out=400, method="every_nth")
+
+def _draw(ax, series, color="C0"):
+    ax.plot(series.index, series.to_numpy(), color=color)
+
+def test_chart_key_tracks_data_and_options():
+    s = pd.Series(_walk(100))
+    key = chart_key(_draw, (s,), {"color": "C0"})
+    assert key == chart_key(_draw, (s.copy(),), {"color": "C0"})
+    changed = s.copy()
+    changed.iloc[50] += 1
+    assert key != chart_key(_draw, (changed,), {"color": "C0"})
+    assert key != chart_key(_draw, (s,), {"color": "C1"})
+    assert key != chart_key(lambda ax, series, color="C0": ax.bar(series.index, series), (s,), {"color": "C0"})
+
+def test_render_png_caches_and_leaves_no_pyplot_figures():
+    import matplotlib.pyplot as plt
+    cache = RenderCache()
+    s = pd.Series(_walk(200))
+    png, cached = render_png(_draw, s, figsize=(4, 2), cache=cache)
+    assert png.startswith(b"\x89PNG") and not cached
+    again, cached = render_png(_draw, s, figsize=(4, 2), cache=cache)
+    assert again == png and cached
+    _, cached = render_png(_draw, s, figsize=(4, 2), cache=cache, color="C3")
+    assert not cached
+    assert cache.stats()["entries"] == 2 and cache.stats()["hits"] == 1
+    assert plt.get_fignums() == []
+
+def test_render_cache_evicts_least_recently_used():
+    cache = RenderCache(max_bytes=25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+    cache.get("a")
+    cache.put("c", b"x" * 10)
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("c") is not None
+    # A single oversized image is still kept
+    cache.put("big", b"x" * 100)
+    assert cache.get("big") is not None and cache.stats()["entries"] == 1
@@ -0,0 +1,102 @@
+"""Portfolio analytics against the original single-holding ROI calculation."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketmantra.providers import SyntheticProvider
+from marketmantra.roi import BENCHMARK, analyze_portfolio, calculate_advanced_roi
+
+START = "2015-01-01"
+
+def baseline_roi(close, bench_close, investment):
+    """The app's original calculate_advanced_roi, on close series."""
+    shares = investment / close.iloc[0]
+    final_value = shares * close.iloc[-1]
+    years = (close.index[-1] - close.index[0]).days / 365
+    cagr = ((final_value / investment) ** (1 / years) - 1) * 100
+    volatility = close.pct_change().dropna().std() * np.sqrt(252) * 100
+    return {"Final Value": final_value,
+            "Total Return %": (final_value - investment) / investment * 100,
+            "CAGR %": cagr,
+            "Volatility %": volatility,
+            "Sharpe Ratio": (cagr / 100 - 0.06) / (volatility / 100),
+            "Sensex Return %": (bench_close.iloc[-1] - bench_close.iloc[0]) / bench_close.iloc[0] * 100}
+
+class TrimmedProvider(SyntheticProvider):
+    """Synthetic bars, with the benchmark starting late or missing."""
+
+    def __init__(self, bench_from=None):
+        super().__init__()
+        self.bench_from = bench_from
+
+    def fetch(self, symbol, start, end):
+        df = super().fetch(symbol, start, end)
+        if symbol == BENCHMARK and self.bench_from is not None:
+            return df[df.index >= self.bench_from]
+        return df
+
+@pytest.fixture
+def provider():
+    return SyntheticProvider()
+
+def _close(provider, symbol):
+    return provider.fetch(symbol, START, pd.Timestamp.today() + pd.Timedelta(days=1))['Close']
+
+def test_single_holding_matches_baseline(provider):
+    result = calculate_advanced_roi("TCS.NS", START, 100_000, provider=provider)
+    expected = baseline_roi(_close(provider, "TCS.NS"), _close(provider, BENCHMARK), 100_000)
+    assert result.keys() == expected.keys()
+    for key, value in expected.items():
+        assert result[key] == pytest.approx(value, rel=1e-9), key
+
+def test_portfolio_is_the_weighted_sum_of_holdings(provider):
+    tickers = ["TCS.NS", "INFY.NS", "HDFCBANK.NS"]
+    analysis = analyze_portfolio(tickers, START, 80_000, weights={"TCS.NS": 2, "INFY.NS": 1, "HDFCBANK.NS": 1},
+                                  provider=provider)
+    values = analysis["values"]
+    assert analysis["holdings"]["Weight"].tolist() == pytest.approx([50, 25, 25])
+    assert values[tickers].iloc[0].tolist() == pytest.approx([40_000, 20_000, 20_000])
+    np.testing.assert_allclose(values["Portfolio"], values[tickers].sum(axis=1))
+    for ticker in tickers:
+        expected = baseline_roi(_close(provider, ticker), _close(provider, BENCHMARK), 1)
+        assert analysis["holdings"].loc[ticker, "Total Return %"] == pytest.approx(expected["Total Return %"])
+        assert analysis["holdings"].loc[ticker, "Excess Return %"] == pytest.approx(
+            expected["Total Return %"] - expected["Sensex Return %"])
+    final = values["Portfolio"].iloc[-1]
+    assert analysis["portfolio"]["Total Return %"] == pytest.approx((final / 80_000 - 1) * 100)
+
+def test_bad_weights(provider):
+    with pytest.raises(ValueError):
+        analyze_portfolio(["TCS.NS", "INFY.NS"], START, 1000, weights=[1], provider=provider)
+    with pytest.raises(ValueError):
+        analyze_portfolio(["TCS.NS"], START, 1000, weights=[-1], provider=provider)
+
+def test_missing_tickers_are_left_out(provider, monkeypatch):
+    fetch = provider.fetch
+    monkeypatch.setattr(provider, "fetch", lambda s, a, b: fetch(s, a, b).iloc[:0] if s == "GONE.NS" else fetch(s, a, b))
+    analysis = analyze_portfolio(["TCS.NS", "GONE.NS"], START, 1000, provider=provider)
+    assert analysis["missing"] == ["GONE.NS"]
+    assert list(analysis["holdings"].index) == ["TCS.NS"]
+    assert analyze_portfolio(["GONE.NS"], START, 1000, provider=provider) is None
+
+def test_late_benchmark_starts_at_its_first_close():
+    provider = TrimmedProvider(bench_from=pd.Timestamp("2018-01-01"))
+    analysis = analyze_portfolio(["TCS.NS"], START, 1000, provider=provider)
+    bench = analysis["values"][f"Benchmark ({BENCHMARK})"]
+    assert bench.loc[:"2017-12-31"].isna().all()
+    assert bench.dropna().iloc[0] == pytest.approx(1000)
+    expected = baseline_roi(_close(provider, "TCS.NS"), _close(provider, BENCHMARK), 1000)
+    assert analysis["benchmark"]["Total Return %"] == pytest.approx(expected["Sensex Return %"])
+    # The holding is still measured over its whole history
+    assert analysis["holdings"].loc["TCS.NS", "Total Return %"] == pytest.approx(expected["Total Return %"])
+
+def test_no_benchmark_data_keeps_the_holding_metrics():
+    provider = TrimmedProvider(bench_from=pd.Timestamp("2100-01-01"))
+    analysis = analyze_portfolio(["TCS.NS"], START, 1000, provider=provider)
+    assert analysis["benchmark"] is None
+    assert "Excess Return %" not in analysis["portfolio"]
+    assert "Excess Return %" not in analysis["holdings"]
+    result = calculate_advanced_roi("TCS.NS", START, 1000, provider=provider)
+    assert "Sensex Return %" not in result
+    assert result["Total Return %"] == pytest.approx(
+        baseline_roi(_close(provider, "TCS.NS"), _close(provider, "TCS.NS"), 1000)["Total Return %"])
@@ -0,0 +1,39 @@
+"""Screener universes: the built-in lists and constituents files."""
+import pytest
+
+from marketmantra.screener import NIFTY_50, SENSEX, UNIVERSES, _Universes, load_constituents
+
+NSE_LIST = """Company Name,Industry,Symbol,Series,ISIN Code
+Reliance Industries Ltd.,Oil Gas & Consumable Fuels,RELIANCE,EQ,INE002A01018
+Mahindra & Mahindra Ltd.,Automobile and Auto Components,M&M,EQ,INE101A01026
+Some Fund,Financial Services,SOMEFUND,BE,INE000000000
+Tata Consultancy Services Ltd.,Information Technology,TCS,EQ,INE467B01029
+"""
+
+def test_nse_constituents_csv(tmp_path):
+    path = tmp_path / "ind_list.csv"
+    path.write_text(NSE_LIST)
+    assert load_constituents(path) == ["RELIANCE.NS", "M&M.NS", "TCS.NS"]
+    assert load_constituents(path, suffix=".BO")[0] == "RELIANCE.BO"
+
+def test_one_symbol_per_line(tmp_path):
+    path = tmp_path / "mine.txt"
+    path.write_text("# my picks\ninfy\n\nTCS.NS\n^BSESN\ninfy\n")
+    assert load_constituents(path) == ["INFY.NS", "TCS.NS", "^BSESN"]
+    assert load_constituents(path, suffix="") == ["INFY", "TCS.NS", "^BSESN"]
+
+def test_bundled_nifty_500():
+    assert list(UNIVERSES)[:2] == ["Sensex", "Nifty 50"] and "Nifty 500" in UNIVERSES
+    nifty_500 = UNIVERSES["Nifty 500"]
+    assert len(nifty_500) == len(set(nifty_500)) == 501
+    assert all(s.endswith(".NS") for s in nifty_500)
+    assert UNIVERSES["Nifty 500"] is not nifty_500  # callers get their own list
+
+def test_universes_from_a_directory(tmp_path):
+    (tmp_path / "nifty_midcap_150.csv").write_text(NSE_LIST)
+    (tmp_path / "notes.txt").write_text("not a universe")
+    universes = _Universes({"Sensex": SENSEX, "Nifty 50": NIFTY_50}, [tmp_path, None])
+    assert list(universes) == ["Sensex", "Nifty 50", "Nifty Midcap 150"] and len(universes) == 3
+    assert universes["Nifty Midcap 150"] == ["RELIANCE.NS", "M&M.NS", "TCS.NS"]
+    with pytest.raises(KeyError):
+        universes["Notes"]
@@ -0,0 +1,85 @@
+"""ModelStore keys, persistence, invalidation and in-memory LRU."""
+import os
+
+import pytest
+
+from marketmantra.features import FEATURE_COLUMNS, add_features
+from marketmantra.models import build_models
+from marketmantra.store import ModelStore, data_digest, model_cache_key, model_lineage_key
+from marketmantra.synthetic import synthetic_ohlcv
+
+@pytest.fixture(scope="module")
+def df_ml():
+    return add_features(synthetic_ohlcv(400, seed=1))
+
+def test_cache_key_tracks_everything_that_affects_training(df_ml):
+    models = build_models()
+    key = model_cache_key("STOCK", df_ml, FEATURE_COLUMNS, models)
+    assert key == model_cache_key("STOCK", df_ml.copy(), FEATURE_COLUMNS, build_models())
+
+    changed = df_ml.copy()
+    changed.iloc[10, changed.columns.get_loc("RSI")] += 1.0
+    retuned = build_models()
+    retuned["Decision Tree"].set_params(max_depth=3)
+    for other in [model_cache_key("OTHER", df_ml, FEATURE_COLUMNS, models),
+                  model_cache_key("STOCK", changed, FEATURE_COLUMNS, models),
+                  model_cache_key("STOCK", df_ml, FEATURE_COLUMNS[:-1], models),
+                  model_cache_key("STOCK", df_ml, FEATURE_COLUMNS, retuned),
+                  model_cache_key("STOCK", df_ml, FEATURE_COLUMNS, models, budget_s=30)]:
+        assert other != key
+
+def test_lineage_ignores_the_data(df_ml):
+    models = build_models()
+    lineage = model_lineage_key("STOCK", FEATURE_COLUMNS, models)
+    assert lineage == model_lineage_key("STOCK", FEATURE_COLUMNS, build_models())
+    assert lineage != model_lineage_key("STOCK", FEATURE_COLUMNS, models, budget_s=30)
+    assert (model_cache_key("STOCK", df_ml, FEATURE_COLUMNS, models)
+            != model_cache_key("STOCK", df_ml.iloc[:-1], FEATURE_COLUMNS, models))
+
+def test_history_digest_ignores_only_the_last_target(df_ml):
+    revised = df_ml.copy()
+    revised.iloc[-1, revised.columns.get_loc("Target")] ^= 1
+    assert data_digest(revised, FEATURE_COLUMNS, last_target=False) == data_digest(df_ml, FEATURE_COLUMNS,
+                                                                                   last_target=False)
+    assert data_digest(revised, FEATURE_COLUMNS) != data_digest(df_ml, FEATURE_COLUMNS)
+    revised.iloc[-1, revised.columns.get_loc("Lag1")] += 1.0
+    assert data_digest(revised, FEATURE_COLUMNS, last_target=False) != data_digest(df_ml, FEATURE_COLUMNS,
+                                                                                   last_target=False)
+
+def test_put_get_and_latest(tmp_path):
+    store = ModelStore(str(tmp_path))
+    assert store.get("STOCK", "a" * 64) is None
+    store.put("STOCK", "a" * 64, {"rows": 1}, lineage="l" * 64)
+    store.put("STOCK", "b" * 64, {"rows": 2}, lineage="l" * 64)
+    # A fresh store reads them back from disk
+    reopened = ModelStore(str(tmp_path))
+    assert reopened.get("STOCK", "a" * 64) == {"rows": 1}
+    assert reopened.latest("STOCK", "l" * 64) == {"rows": 2}
+    assert reopened.latest("STOCK", "m" * 64) is None
+
+def test_invalidate_one_ticker_or_all(tmp_path):
+    store = ModelStore(str(tmp_path))
+    store.put("A", "a" * 64, {"rows": 1}, lineage="l" * 64)
+    store.put("B", "b" * 64, {"rows": 2})
+    store.invalidate("A")
+    assert store.get("A", "a" * 64) is None and store.latest("A", "l" * 64) is None
+    assert store.get("B", "b" * 64) == {"rows": 2}
+    store.invalidate()
+    assert store.get("B", "b" * 64) is None
+    assert os.listdir(store.directory) == []
+
+def test_memory_keeps_the_most_recent_entries(tmp_path):
+    store = ModelStore(str(tmp_path), memory_entries=2)
+    for i, key in enumerate(["a", "b", "c"]):
+        store.put("STOCK", key * 64, {"rows": i})
+    store.get("STOCK", "b" * 64)  # b is now the most recent, then c
+    assert list(store._memory) == [store._path("STOCK", key * 64) for key in ["c", "b"]]
+    # Memory is a cache of the disk, not a replacement for it
+    assert store.get("STOCK", "a" * 64) == {"rows": 0}
+    assert len(store._memory) == 2
+
+def test_eviction_to_max_bytes(tmp_path):
+    store = ModelStore(str(tmp_path), max_bytes=1)
+    store.put("STOCK", "a" * 64, {"rows": list(range(1000))})
+    store.put("STOCK", "b" * 64, {"rows": list(range(1000))})
+    assert len(os.listdir(store.directory)) <= 1
@@ -0,0 +1,46 @@
+"""StreamingIndicators fed bar by bar against the batch engine."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketmantra.features import add_features
+from marketmantra.indicators import compute_indicators
+from marketmantra.streaming import StreamingIndicators
+from marketmantra.synthetic import synthetic_ohlcv
+
+COLUMNS = ['RSI', 'MACD', 'MACD_signal', 'Middle_BB', 'Std_Dev', 'Upper_BB', 'Lower_BB', 'Stoch']
+
+def stream(df, seed_rows=0):
+    """One row of streamed values per bar of df, the first seed_rows of
+    them from the state seeded with from_history."""
+    state = StreamingIndicators.from_history(df.iloc[:seed_rows])
+    rows = [dict.fromkeys(COLUMNS, np.nan)] * seed_rows
+    if seed_rows:
+        rows[-1] = state.latest
+    for bar in df.iloc[seed_rows:].itertuples():
+        rows.append(state.update(bar.High, bar.Low, bar.Close))
+    return pd.DataFrame(rows, index=df.index)
+
+@pytest.mark.parametrize("seed_rows", [0, 5, 300])
+def test_stream_matches_compute_indicators(seed_rows):
+    df = synthetic_ohlcv(1500, seed=11)
+    streamed = stream(df, seed_rows)
+    expected = compute_indicators(df)[COLUMNS]
+    start = max(seed_rows - 1, 0)
+    pd.testing.assert_frame_equal(streamed.iloc[start:], expected.iloc[start:], rtol=1e-7, atol=1e-7)
+
+def test_stream_matches_add_features():
+    df = synthetic_ohlcv(1500, seed=12)
+    streamed = stream(df)
+    features = add_features(df)
+    streamed = streamed.loc[features.index]
+    pd.testing.assert_series_equal(streamed['RSI'], features['RSI'], rtol=1e-7, atol=1e-7)
+    pd.testing.assert_series_equal(streamed['Stoch'], features['Stoch'], rtol=1e-7, atol=1e-7)
+    bb_position = (features['Close'] - streamed['Lower_BB']) / (4 * streamed['Std_Dev'])
+    pd.testing.assert_series_equal(bb_position, features['BB_position'], check_names=False,
+                                   rtol=1e-6, atol=1e-6)
+
+def test_stream_through_flat_prices():
+    df = synthetic_ohlcv(200, seed=13)
+    df.iloc[80:120, df.columns.get_indexer(['Open', 'High', 'Low', 'Close'])] = df['Close'].iloc[80]
+    pd.testing.assert_frame_equal(stream(df), compute_indicators(df)[COLUMNS], rtol=1e-7, atol=1e-7)
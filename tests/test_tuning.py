@@ -0,0 +1,61 @@
+"""Hyperparameter tuning: its scoring unit, resumption and where the results apply."""
+import numpy as np
+
+from marketmantra.features import FEATURE_COLUMNS, add_features, feature_matrix
+from marketmantra.models import build_models, parallel_cross_validate, score_split
+from marketmantra.synthetic import synthetic_ohlcv
+from marketmantra.tuning import TuningStore, tune, tuned_models
+
+def _store(tmp_path):
+    store = TuningStore(str(tmp_path))
+    store.put_best("STOCK", {
+        "scope": "STOCK", "symbols": ["STOCK"], "tuned_at": "2026-01-01T00:00:00",
+        "params": {"Gradient Boosting": {"max_depth": 2, "learning_rate": 0.1, "min_samples_leaf": 50},
+                   "Decision Tree": {"max_depth": 3, "min_samples_leaf": 10}},
+        "estimators": {name: type(model).__name__ for name, model in build_models().items()}})
+    return store
+
+def test_standard_models_take_tuned_params(tmp_path):
+    models = tuned_models("STOCK", store=_store(tmp_path))
+    assert models["Gradient Boosting"].get_params()["max_depth"] == 2
+    assert models["Gradient Boosting"].get_params()["min_samples_leaf"] == 50
+    assert models["Decision Tree"].get_params()["max_depth"] == 3
+
+def test_budget_models_keep_params_tuned_on_another_estimator(tmp_path):
+    models = tuned_models("STOCK", budget_s=30, store=_store(tmp_path))
+    hgb = models["Gradient Boosting"].get_params()
+    assert (hgb["max_depth"], hgb["learning_rate"], hgb["min_samples_leaf"]) == (5, 0.05, 20)
+    # Same estimator in both ensembles, so its tuning still applies
+    assert models["Decision Tree"].get_params()["max_depth"] == 3
+
+def test_untuned_symbol_gets_defaults(tmp_path):
+    models = tuned_models("OTHER", store=_store(tmp_path))
+    defaults = build_models()
+    assert all(models[n].get_params() == defaults[n].get_params() for n in ("Decision Tree", "Random Forest"))
+
+def test_score_split_is_the_cross_validation_unit():
+    df_ml = add_features(synthetic_ohlcv(400, seed=3))
+    X, y = feature_matrix(df_ml[FEATURE_COLUMNS]), df_ml['Target'].to_numpy()
+    models = {"Decision Tree": build_models()["Decision Tree"]}
+    cv_scores, (index, oof), _ = parallel_cross_validate(models, df_ml[FEATURE_COLUMNS], df_ml['Target'],
+                                                         n_splits=2, n_workers=1)
+    train, test = slice(0, index[0]), slice(index[0], index[0] + len(index) // 2)
+    score, proba, fit = score_split(models["Decision Tree"], X, y, train, test)
+    assert score == cv_scores["Decision Tree"][0] and fit == {}
+    np.testing.assert_array_equal(proba, oof["Decision Tree"][:len(proba)])
+    # Index arrays work like slices, and the estimator passed in stays unfitted
+    rows = np.arange(train.stop), np.arange(test.start, test.stop)
+    assert score_split(models["Decision Tree"], X, y, *rows)[0] == score
+    assert not hasattr(models["Decision Tree"], "tree_")
+
+def test_tune_resumes_from_stored_evaluations(tmp_path):
+    frames = {"STOCK": add_features(synthetic_ohlcv(330, seed=4))}
+    store = TuningStore(str(tmp_path))
+    first = tune(frames, store=store, n_candidates=2, n_splits=2, min_rows=100, n_workers=1)
+    assert first["evaluations"] > 0 and first["reused"] == 0
+    assert store.best("STOCK")["params"] == first["params"]
+    again = tune(frames, store=store, n_candidates=2, n_splits=2, min_rows=100, n_workers=1)
+    assert again["evaluations"] == 0 and again["reused"] == first["evaluations"]
+    assert again["params"] == first["params"] and again["scores"] == first["scores"]
+    for name, score in first["scores"].items():
+        assert score >= first["default_scores"][name]
@@ -0,0 +1,96 @@
+"""Incremental ensemble updates against full refits."""
+import numpy as np
+import pytest
+
+from marketmantra.features import FEATURE_COLUMNS, add_features
+from marketmantra.models import (REFIT_EVERY, build_models, feature_matrix, needs_scaling,
+                                 predict_up_probability, train_ensemble, update_ensemble)
+from marketmantra.pipeline import load_or_train
+from marketmantra.store import ModelStore
+from marketmantra.synthetic import synthetic_ohlcv
+
+def small_models():
+    models = build_models()
+    for model in models.values():
+        if "n_estimators" in model.get_params():
+            model.set_params(n_estimators=60)
+    return models
+
+@pytest.fixture(scope="module")
+def df_ml():
+    return add_features(synthetic_ohlcv(1600, seed=5))
+
+@pytest.fixture(scope="module")
+def trained(df_ml):
+    old = df_ml.iloc[:-5]
+    return train_ensemble(small_models(), old[FEATURE_COLUMNS], old['Target'], n_workers=1)
+
+def _proba(trained, X):
+    return {name: model.predict_proba(trained["scaler"].transform(X) if needs_scaling(model) else X)[:, 1]
+            for name, model in trained["models"].items()}
+
+def test_update_extends_the_walk_forward_predictions(df_ml, trained):
+    updated = update_ensemble(trained, df_ml[FEATURE_COLUMNS], df_ml['Target'])
+    assert trained["rows"] == len(df_ml) - 5 and trained["updates"] == 0  # the stored copy is untouched
+    assert updated["rows"] == len(df_ml) and updated["updates"] == 1 and updated["new_rows"] == 5
+    np.testing.assert_array_equal(updated["oof_index"][-5:], np.arange(len(df_ml) - 5, len(df_ml)))
+    # The new rows are predicted by the models from before the update: out of sample
+    before = _proba(trained, feature_matrix(df_ml[FEATURE_COLUMNS].iloc[-5:]))
+    for name, proba in updated["oof_probs"].items():
+        assert len(proba) == len(updated["oof_index"])
+        np.testing.assert_allclose(proba[-5:], before[name], rtol=1e-6)
+    assert updated["cv_scores"] == trained["cv_scores"]
+    assert set(updated["update_report"]) == set(trained["models"])
+
+def test_update_stays_close_to_a_full_refit(df_ml, trained):
+    updated = update_ensemble(trained, df_ml[FEATURE_COLUMNS], df_ml['Target'])
+    full = train_ensemble(small_models(), df_ml[FEATURE_COLUMNS], df_ml['Target'], n_workers=1)
+    X = feature_matrix(df_ml[FEATURE_COLUMNS].iloc[-200:])
+    got, expected = _proba(updated, X), _proba(full, X)
+    for name in expected:
+        assert np.abs(got[name] - expected[name]).mean() < 0.06, name
+    assert predict_up_probability(updated, df_ml[FEATURE_COLUMNS]) == pytest.approx(
+        predict_up_probability(full, df_ml[FEATURE_COLUMNS]), abs=0.05)
+
+def test_load_or_train_updates_only_appended_bars(tmp_path):
+    bars = synthetic_ohlcv(1200, seed=6)
+    store = ModelStore(str(tmp_path))
+    first, _ = load_or_train("STOCK", add_features(bars.iloc[:-3]), store, models=small_models(), n_workers=1)
+    assert first["updates"] == 0
+
+    appended, from_store = load_or_train("STOCK", add_features(bars.iloc[:-2]), store, models=small_models())
+    assert not from_store and appended["updates"] == 1
+    again, from_store = load_or_train("STOCK", add_features(bars.iloc[:-2]), store, models=small_models())
+    assert from_store and again["updates"] == 1
+
+    # A revised bar in the history means the stored models saw other data
+    revised = bars.iloc[:-1].copy()
+    revised.iloc[-300, revised.columns.get_loc("Close")] *= 1.05
+    refit, _ = load_or_train("STOCK", add_features(revised), store, models=small_models(), n_workers=1)
+    assert refit["updates"] == 0
+
+def test_full_refit_after_refit_every_updates(tmp_path):
+    bars = synthetic_ohlcv(900, seed=7)
+    store = ModelStore(str(tmp_path))
+    n = len(bars) - REFIT_EVERY - 1
+    for i in range(REFIT_EVERY + 1):
+        trained, _ = load_or_train("STOCK", add_features(bars.iloc[:n + i]), store, models=small_models(),
+                                   n_workers=1)
+        assert trained["updates"] == i
+    trained, _ = load_or_train("STOCK", add_features(bars.iloc[:n + REFIT_EVERY + 1]), store,
+                               models=small_models(), n_workers=1)
+    assert trained["updates"] == 0
+
+def test_updates_keep_the_configured_hyperparameters(df_ml, trained):
+    configured = {name: model.get_params() for name, model in trained["models"].items()}
+    updated = update_ensemble(trained, df_ml[FEATURE_COLUMNS].iloc[:-2], df_ml['Target'].iloc[:-2])
+    updated = update_ensemble(updated, df_ml[FEATURE_COLUMNS], df_ml['Target'])
+    for name, model in updated["models"].items():
+        assert model.get_params() == configured[name], name
+    # The boosters still grew, and predict with every stage they have
+    gb = updated["models"]["Gradient Boosting"]
+    assert gb.n_estimators_ == trained["models"]["Gradient Boosting"].n_estimators_ + 2 * 3
+    X = feature_matrix(df_ml[FEATURE_COLUMNS].iloc[-50:])
+    staged = list(gb.staged_predict_proba(X))
+    assert len(staged) == gb.n_estimators_
+    np.testing.assert_allclose(gb.predict_proba(X), staged[-1])